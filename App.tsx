@@ -1,5 +1,5 @@
 
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import Dashboard from './components/Dashboard';
 import VPDashboard from './components/VPDashboard';
 import ResumeScanner from './components/ResumeScanner';
@@ -20,6 +20,9 @@ const App: React.FC = () => {
   const [authToken, setAuthToken] = useState<string | null>(localStorage.getItem('hireai_token'));
   
   const [candidates, setCandidates] = useState<Candidate[]>([]);
+  // Latest list for the live-update listener, which is created once per token
+  const candidatesRef = useRef<Candidate[]>(candidates);
+  candidatesRef.current = candidates;
   const [activeCandidateId, setActiveCandidateId] = useState<string | null>(null);
   const [isPracticeMode, setIsPracticeMode] = useState(false);
   const [practiceRole, setPracticeRole] = useState('');
@@ -30,9 +33,11 @@ const App: React.FC = () => {
     setView('apply');
   }, []);
 
+  const isServerToken = !!authToken && !authToken.startsWith('local-') && !authToken.startsWith('admin-bypass') && !authToken.startsWith('vp-bypass');
+
   useEffect(() => {
     const loadInitialData = async () => {
-      if (authToken && !authToken.startsWith('local-') && !authToken.startsWith('admin-bypass') && !authToken.startsWith('vp-bypass')) {
+      if (isServerToken) {
         try {
           const res = await fetch('/api/candidates', {
             headers: { 'Authorization': `Bearer ${authToken}` }
@@ -53,6 +58,49 @@ const App: React.FC = () => {
     loadInitialData();
   }, [authToken]);
 
+  // Live updates: apply pushed status changes in place instead of re-fetching on a timer
+  useEffect(() => {
+    if (!isServerToken || typeof EventSource === 'undefined') return;
+
+    const source = new EventSource(`/api/candidates/stream?token=${encodeURIComponent(authToken!)}`);
+
+    // Candidates created elsewhere are fetched once; ids already being fetched are skipped
+    const fetching = new Set<string>();
+    const fetchCandidate = async (id: string) => {
+      fetching.add(id);
+      try {
+        const res = await fetch(`/api/candidates/${encodeURIComponent(id)}`, { headers: { 'Authorization': `Bearer ${authToken}` } });
+        if (res.ok) {
+          const candidate = await res.json() as Candidate;
+          setCandidates(prev => prev.some(c => c.id === candidate.id)
+            ? prev.map(c => c.id === candidate.id ? candidate : c)
+            : [candidate, ...prev]);
+        }
+      } catch (e) { console.log("Candidate fetch failed."); }
+      finally { fetching.delete(id); }
+    };
+
+    source.addEventListener('candidate', (e) => {
+      const change = JSON.parse((e as MessageEvent).data) as { id: string; status: string | null; op: string };
+      if (change.op === 'delete') {
+        setCandidates(prev => prev.filter(c => c.id !== change.id));
+      } else if (!candidatesRef.current.some(c => c.id === change.id)) {
+        if (!fetching.has(change.id)) fetchCandidate(change.id);
+      } else if (change.status) {
+        setCandidates(prev => prev.map(c => c.id === change.id ? { ...c, status: change.status as Candidate['status'] } : c));
+      }
+    });
+
+    source.addEventListener('resync', async () => {
+      try {
+        const res = await fetch('/api/candidates', { headers: { 'Authorization': `Bearer ${authToken}` } });
+        if (res.ok) setCandidates(await res.json());
+      } catch (e) { console.log("Resync failed."); }
+    });
+
+    return () => source.close();
+  }, [authToken, isServerToken]);
+
   useEffect(() => {
     if (candidates.length > 0) {
       try {
@@ -5,7 +5,7 @@ import plotly.express as px
 import os
 import json
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date, time as dt_time
 import random
 import string
 import uuid
@@ -15,7 +15,14 @@ from google import genai
 from google.genai import types
 from dotenv import load_dotenv  # Import dotenv
 import database  # Import the shared database module
-import email_service # Import email service
+import email_outbox # Background email dispatcher
+import email_templates # Email template registry (shared with the dispatcher)
+import reminders # T-24h / T-1h / T-5m interview & exam reminders
+import scheduling # Interval indexes for recruiter / exam slot conflicts
+import reports # Vectorized report generation
+import metrics # Shared metrics registry (scraped via main.py /metrics)
+import profiling # Opt-in per-rerun profiling (HIREAI_PROFILE=1, or ?profile=1 for the admin)
+from candidate_index import CandidateIndex # Per-session candidate buckets (status, archived, recruiter, role)
 
 # --- LOAD ENVIRONMENT VARIABLES ---
 # This ensures it works on local machines, VPS, and hosting panels using .env files
@@ -70,12 +77,31 @@ def apply_custom_styles():
 
 apply_custom_styles()
 
+# Opt-in profiling for this rerun (None unless enabled); ?profile=1 only counts for the admin
+rerun_profile = profiling.start_rerun(
+    allow_query=bool(st.session_state.get('hr_authenticated')) and st.session_state.get('hr_username') == "admin"
+)
+
 # --- INITIALIZATION ---
-database.init_db()
-# Load candidates from DB. 
-candidates = database.get_candidates()
-# Load jobs from DB
-jobs = database.get_jobs()
+with profiling.phase("load_data"):
+    database.init_db()
+    # Once per process: periodically publish this process's metrics for /metrics
+    metrics.start_flusher("streamlit")
+    # Once per process: background thread that drains the email outbox
+    email_outbox.start_dispatcher()
+    # Once per process: background thread that fires interview/exam reminders
+    reminders.start_scheduler()
+    # Candidates and their secondary indexes, kept per session and only patched with what
+    # the change feed reports since the last rerun (a full load on the first run)
+    if 'candidate_index' not in st.session_state:
+        st.session_state.candidate_index = CandidateIndex.load()
+    else:
+        st.session_state.candidate_index = st.session_state.candidate_index.refresh()
+    index = st.session_state.candidate_index
+    # Which change feed rev this run's data reflects
+    loaded_rev = index.rev
+    # Load jobs from DB
+    jobs = database.get_jobs()
 
 if 'active_user' not in st.session_state:
     st.session_state.active_user = None
@@ -254,6 +280,9 @@ def get_test_duration():
     except:
         return 20
 
+# Bookings are re-checked under the write lock with the limits the Scheduler uses
+database.set_booking_rules(scheduling.INTERVIEW_MINUTES * 60, get_test_duration() * 60, scheduling.EXAM_SLOT_CAPACITY)
+
 def save_uploaded_doc(uploaded_file, candidate_id, doc_type):
     """Saves uploaded documents to a local uploads folder."""
     if not os.path.exists("uploads"):
@@ -274,10 +303,11 @@ def extract_text_from_file(uploaded_file):
         
         # Handle PDF
         if file_type == "application/pdf":
-            reader = PdfReader(uploaded_file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+            with metrics.timer("pdf_extract_seconds", "Resume PDF text extraction time"):
+                reader = PdfReader(uploaded_file)
+                text = ""
+                for page in reader.pages:
+                    text += page.extract_text() + "\n"
             return text
         
         # Handle Text/Plain
@@ -286,213 +316,117 @@ def extract_text_from_file(uploaded_file):
     except Exception as e:
         return f"Error extracting text: {str(e)}"
 
-def resend_candidate_email(c):
+def build_status_email(c, force=False):
     """
-    Reconstructs and resends the last relevant email based on candidate status.
-    Returns: (success: bool, msg: str)
+    Outbox email for the candidate's current status.
+    Returns: (email dict, None), or (None, reason) when nothing should be sent.
     """
-    subject = ""
-    body = ""
-    status = c.get('status', 'Screening')
-    
-    if status == 'Screening':
-        subject = f"Application Received: {c['role']}"
-        body = f"""
-Dear {c['name']},
-
-Thank you for applying for the position of {c['role']} at HireAI.
-
-Your application has been received and screened by our AI system.
-To track your status or take assessments, please login to the Candidate Portal.
-
-Your Access Key: {c.get('access_key', 'N/A')}
-
-Best regards,
-HireAI Recruiting Team
-"""
-    elif status == 'Aptitude Scheduled':
-        subject = "Aptitude Assessment Scheduled - HireAI"
-        body = f"""
-Dear {c['name']},
-
-You have been shortlisted for the Aptitude Assessment for the {c['role']} position.
-
-Date: {c.get('aptitudeDate', 'TBD')}
-Time: {c.get('aptitudeTime', 'TBD')}
-
-Please login to the Candidate Portal using your Access Key: {c.get('access_key', 'N/A')}
-
-Best regards,
-HireAI Recruiting Team
-"""
-    elif status == 'Aptitude Completed':
-        score = c.get('aptitude_score', 0)
-        if score >= 50:
-            subject = "Aptitude Test Passed - HireAI"
-            body = f"Dear {c['name']},\n\nCongratulations! You have passed the aptitude assessment with a score of {score}%.\n\nOur team will review your profile and schedule the final interview shortly.\n\nBest regards,\nHireAI Recruiting Team"
-        else:
-            subject = "Application Update - HireAI"
-            body = f"Dear {c['name']},\n\nThank you for completing the aptitude assessment.\n\nUnfortunately, your score of {score}% did not meet the required threshold for this role.\n\nWe encourage you to apply again after 6 months.\n\nBest regards,\nHireAI Recruiting Team"
-    
-    elif status == 'Interview Scheduled':
-        round_num = c.get('interview_round', 1)
-        round_name = "First Round" if round_num == 1 else "Second Round"
-        subject = f"{round_name} Interview - HireAI"
-        body = f"""
-Dear {c['name']},
-
-We are pleased to invite you to the {round_name} Interview for the {c['role']} position.
-
-Date: {c.get('round2Date', 'TBD')}
-Time: {c.get('round2Time', 'TBD')}
-Meeting Link: {c.get('round2Link', '#')}
-
-Please join the link at the scheduled time.
-
-Best regards,
-HireAI Recruiting Team
-"""
-    elif status == 'VP Approval':
-        return False, "No email for VP Approval stage."
-
-    elif status == 'Offer Signed':
-        return False, "No email for Offer Signed stage."
-
-    elif status == 'Offer Sent':
-        subject = "Official Offer Letter - HireAI"
-        body = f"""
-Dear {c['name']},
-
-We are pleased to offer you the position of {c['role']} at HireAI!
-
-Your offer letter has been approved and signed.
-
-Please login to the Candidate Portal to view and accept your offer.
-You have 3 days to accept this offer.
-
-Access Key: {c.get('access_key', 'N/A')}
-
-Best regards,
-HireAI HR Team
-"""
-
-    elif status == 'Offer Accepted':
-        subject = "Offer Acceptance Confirmed - HireAI"
-        body = f"""
-Dear {c['name']},
-
-Thank you for accepting our offer! We are thrilled to have you join us.
-
-Please login to the candidate portal and submit the following documents for verification:
-1. Valid Government ID Proof (Passport/Aadhaar/Driver's License)
-2. Current Address Proof
-
-Once verified, we will issue your formal Joining Letter.
-
-Best regards,
-HireAI HR Team
-"""
-
-    elif status == 'Selected':
-        subject = "Congratulations! You have been Selected - HireAI"
-        body = f"""
-Dear {c['name']},
-
-Congratulations! We are pleased to inform you that you have cleared the final interview round for the position of {c['role']}.
-
-We are currently preparing your formal offer. A confirmation letter will be shared with you shortly.
-
-Action Required:
-Please login to the candidate portal and submit the following documents for verification:
-1. Valid Government ID Proof (Passport/Aadhaar/Driver's License)
-2. Current Address Proof
-
-Once verified, we will issue your formal Joining Letter.
-
-Best regards,
-HireAI HR Team
-"""
-    elif status == 'Joining Scheduled':
-        subject = "Official Joining Letter - HireAI"
-        body = f"""
-Dear {c['name']},
-
-We are delighted to formally offer you the position of {c['role']} at HireAI!
-
-We have verified your documents and everything looks in order.
-
-**Joining Date:** {c.get('joining_date', 'To Be Discussed')}
-
-Please arrive at our office by 9:30 AM on your joining date for orientation.
-We are excited to have you onboard.
-
-Welcome to the family!
-
-Best regards,
-HireAI HR Team
-"""
-    elif status == 'Training':
-        subject = "Welcome to HireAI - Training Portal Access"
-        body = f"""
-Dear {c['name']},
-
-Welcome aboard! We are excited to have you start your journey with us.
-
-Your Employee ID has been generated. Please use this to access the Training Portal.
-You must complete the mandatory training modules to finalize your onboarding.
-
-**New Employee ID:** {c.get('access_key', 'N/A')}
-
-Please login to the Candidate Portal using this new ID.
-
-Best regards,
-HireAI HR Team
-"""
-
-    elif status == 'Employee Confirmed':
-        subject = "Training Completed - You are officially Hired!"
-        body = f"""
-Dear {c['name']},
-
-Congratulations on successfully completing the mandatory training!
-
-You are now officially a permanent employee of HireAI.
-We wish you a successful career with us.
-
-Best regards,
-HireAI HR Team
-"""
+    template, reason = email_templates.for_candidate(c)
+    if template is None:
+        return None, reason
 
-    elif status == 'Rejected':
-        round_num = c.get('interview_round', 1)
-        round_name = "First Round" if round_num == 1 else "Second Round"
-        subject = "Update on your Application - HireAI"
-        body = f"""
-Dear {c['name']},
-
-Thank you for giving us the opportunity to get to know you during the {round_name} of interviews for the {c['role']} position.
-
-We appreciate the time and effort you put into the process. However, after careful consideration, we have decided to move forward with other candidates who more closely match our current requirements for this specific role.
-
-We encourage you to apply again after 6 months as our needs and roles continue to evolve.
+    # Validate now so a bad context is reported here instead of dead-lettered later
+    context = email_templates.candidate_context(c)
+    try:
+        template.validate(context)
+    except email_templates.TemplateError as e:
+        return None, str(e)
 
-We wish you the very best in your future endeavors.
+    return {
+        'to': c['email'], 'template': template.name, 'context': context,
+        'idempotency_key': email_outbox.idempotency_key(c['id'], c.get('status'), template, context) if 'id' in c else None,
+        'dedupe_window': 0 if force else email_outbox.DEDUPE_WINDOW_SECONDS,
+    }, None
 
-Best regards,
-HireAI Recruiting Team
-"""
+def patch_candidate(c, changes):
+    """
+    Write only `changes` to the stored candidate (json_set) and refresh the in-memory copy.
+    Raises database.ConflictError if someone else changed one of these fields since `c` was loaded.
+    """
+    fresh = database.patch_candidate(c['id'], changes, expected_version=getattr(c, 'version', None))
+    if fresh is None:
+        return
+    if isinstance(c, database.Candidate):
+        c.reset(fresh, fresh.version)
     else:
-        return False, "No email template found for current status."
+        c.update(fresh)
 
-    # Send
-    email_sent, email_msg = email_service.send_email(c['email'], subject, body)
-    
-    # Update DB with new email status
-    c['email_status'] = "Sent" if email_sent else "Failed"
-    c['email_error'] = email_msg if not email_sent else None
-    database.save_candidate(c)
-    
-    return email_sent, email_msg
+def bulk_update_candidates(selected, changes_for, notify=True):
+    """
+    Apply `changes_for(c)` (the fields to set, or None to skip `c`) to every selected
+    candidate in ONE transaction, queueing the email for each candidate's new status in
+    the same transaction (unless `notify` is False). Raises database.ConflictError, and
+    saves nothing, if someone else changed one of these fields since this page loaded.
+    Returns: (candidates updated, emails queued)
+    """
+    patches = []
+    for c in selected:
+        changes = changes_for(c)
+        if changes is None:
+            continue
+        email = build_status_email({**c, **changes})[0] if notify else None
+        patches.append((c['id'], changes, email, getattr(c, 'version', None)))
+    if not patches:
+        return 0, 0
+    database.bulk_patch_candidates(patches)
+    reminders.wake()
+    queued = sum(1 for _, _, email, _ in patches if email and email['message_id'])
+    if queued:
+        email_outbox.wake()
+    return len(patches), queued
+
+def sign_offers(selected):
+    """
+    VP sign-off for several candidates in one transaction. Raises database.ConflictError
+    (nothing signed) if someone else changed one of them since this page loaded.
+    """
+    changes = {
+        'status': 'Offer Signed',
+        'offer_signed_by': 'VP',
+        'offer_signed_date': datetime.now().strftime("%Y-%m-%d"),
+    }
+    bulk_update_candidates(selected, lambda c: changes, notify=False)
+
+def resend_candidate_email(c, force=False):
+    """
+    Saves the candidate and queues the email for its current status in one
+    transaction; the outbox dispatcher sends it in the background.
+    The same status email is not queued twice within the dedupe window unless `force`.
+    Callers should NOT save the candidate themselves beforehand.
+    Returns: (queued: bool, msg: str)
+    """
+    email, reason = build_status_email(c, force)
+    database.save_candidate(c, email=email)
+    reminders.wake()
+    if email is None:
+        return False, reason
+    if not email['message_id']:
+        metrics.inc("email_duplicates_suppressed_total", help="Status emails skipped because an identical one was recently queued")
+        return False, "This email was already sent recently. Tick 'Force' to send it again."
+    email_outbox.wake()
+    return True, f"Email queued for {c['email']}"
+
+def get_scheduler():
+    """Interval indexes over every booked interview/exam (built from the indexed scheduled_events table)."""
+    return scheduling.Scheduler.from_database(get_test_duration())
+
+def interview_conflict(c, recruiter, date_value, time_value):
+    """None if `recruiter` is free, else an error message with the next free slots."""
+    sched = get_scheduler()
+    start = scheduling.to_timestamp(date_value, time_value)
+    if not sched.interview_conflicts(recruiter, start, c['id']):
+        return None
+    free = sched.suggest_interview(recruiter, start, count=3, candidate_id=c['id'])
+    return f"{recruiter} already has an interview at that time. Free slots: {', '.join(scheduling.describe(t) for t in free) or 'none in the next weeks'}"
+
+def exam_conflict(c, date_value, time_value):
+    """None if the exam slot has a free seat, else an error message with the next open slots."""
+    sched = get_scheduler()
+    start = scheduling.to_timestamp(date_value, time_value)
+    if not sched.exam_is_full(start, c['id']):
+        return None
+    free = sched.suggest_exam(start, count=3, candidate_id=c['id'])
+    return f"That exam slot is full ({sched.exam_capacity} seats). Open slots: {', '.join(scheduling.describe(t) for t in free) or 'none in the next weeks'}"
 
 # --- AI LOGIC ---
 def screen_resume_ai(text, role_title, job_description, skills_required, min_experience):
@@ -545,6 +479,7 @@ def screen_resume_ai(text, role_title, job_description, skills_required, min_exp
 
     for attempt in range(max_retries):
         try:
+            gemini_start = time.perf_counter()
             response = client.models.generate_content(
                 model='gemini-3-flash-preview',
                 contents=prompt,
@@ -564,13 +499,16 @@ def screen_resume_ai(text, role_title, job_description, skills_required, min_exp
                     }
                 )
             )
+            metrics.observe("gemini_call_seconds", time.perf_counter() - gemini_start, "Gemini API call latency", operation="screen_resume", outcome="ok")
             return json.loads(response.text)
         except Exception as e:
             error_msg = str(e)
+            metrics.observe("gemini_call_seconds", time.perf_counter() - gemini_start, "Gemini API call latency", operation="screen_resume", outcome="error")
             if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
                 if attempt < max_retries - 1:
                     wait_time = base_delay * (attempt + 1)
                     print(f"Quota exceeded (Attempt {attempt+1}/{max_retries}). Retrying in {wait_time}s...")
+                    metrics.inc("gemini_retries_total", help="Gemini calls retried after quota errors", operation="screen_resume")
                     st.toast(f"High AI Traffic. Retrying in {wait_time}s...", icon="⏳")
                     time.sleep(wait_time)
                     continue
@@ -599,6 +537,7 @@ def generate_aptitude_questions(role):
 
     for attempt in range(max_retries):
         try:
+            gemini_start = time.perf_counter()
             response = client.models.generate_content(
                 model='gemini-3-flash-preview',
                 contents=prompt,
@@ -620,19 +559,40 @@ def generate_aptitude_questions(role):
                     }
                 )
             )
+            metrics.observe("gemini_call_seconds", time.perf_counter() - gemini_start, "Gemini API call latency", operation="aptitude_questions", outcome="ok")
             return json.loads(response.text)
         except Exception as e:
             error_msg = str(e)
+            metrics.observe("gemini_call_seconds", time.perf_counter() - gemini_start, "Gemini API call latency", operation="aptitude_questions", outcome="error")
             if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
                 if attempt < max_retries - 1:
                     wait_time = base_delay * (attempt + 1)
                     print(f"Quota exceeded (Attempt {attempt+1}/{max_retries}). Retrying in {wait_time}s...")
+                    metrics.inc("gemini_retries_total", help="Gemini calls retried after quota errors", operation="aptitude_questions")
                     st.toast(f"High AI Traffic. Retrying in {wait_time}s...", icon="⏳")
                     time.sleep(wait_time)
                     continue
             raise e
 
 # --- UI COMPONENTS ---
+def flash(message, kind="toast", icon=None):
+    """
+    Show `message` on the next run, so a handler can st.rerun() right away instead of
+    sleeping to keep it on screen (which holds a script thread for nothing).
+    kind: "toast", "success", "info", "warning", "error" or "balloons" (message ignored).
+    """
+    st.session_state.setdefault('flash_messages', []).append((kind, message, icon))
+
+def show_flash_messages():
+    """Render (once) the messages queued with flash()."""
+    for kind, message, icon in st.session_state.pop('flash_messages', []):
+        if kind == "toast":
+            st.toast(message, icon=icon)
+        elif kind == "balloons":
+            st.balloons()
+        else:
+            getattr(st, kind)(message, icon=icon)
+
 def render_candidate_details(c):
     """
     Renders a detailed view of the candidate inside a Popover/Expander.
@@ -684,7 +644,139 @@ def render_candidate_details(c):
     if c.get('email_error'):
         st.error(f"Error: {c['email_error']}")
 
+    # 6. Status History (audit log; only queried when opened)
+    if st.toggle("📜 Status History", key=f"hist_{c['id']}"):
+        events = database.get_candidate_events(c['id'])
+        if events:
+            st.dataframe(pd.DataFrame([{
+                "When": datetime.fromtimestamp(e['at']).strftime("%Y-%m-%d %H:%M"),
+                "From": e['from_status'] or "—",
+                "To": e['to_status'],
+                "By": e['actor'],
+            } for e in events]), hide_index=True, use_container_width=True)
+        else:
+            st.caption("No status changes recorded.")
+
+def can_act_on(c, current_hr, is_super_admin):
+    """Unassigned candidates, your own, or any for the super admin."""
+    assigned = c.get('recruiter')
+    return not assigned or assigned == current_hr or is_super_admin
+
+def bulk_checkbox(stage, c):
+    """Row checkbox that selects `c` for the stage's Bulk Actions panel."""
+    st.checkbox("Select for bulk action", key=f"bulk_{stage}_{c['id']}")
+
+def _set_bulk_selection(stage, ids):
+    for cid in ids:
+        st.session_state[f"bulk_{stage}_{cid}"] = st.session_state[f"bulk_all_{stage}"]
+
+def render_bulk_actions(stage, pool, current_hr, is_super_admin):
+    """
+    Bulk Actions panel for one pipeline stage. The chosen action is applied to every
+    candidate ticked in the list below in one transaction, with their emails queued in
+    it, and the page reruns once instead of once per candidate.
+    `pool`: the stage's candidates this recruiter may act on (see can_act_on).
+    """
+    if not pool:
+        return
+    selected = [c for c in pool if st.session_state.get(f"bulk_{stage}_{c['id']}")]
+    with st.expander(f"☑️ Bulk Actions ({len(selected)} selected)"):
+        st.checkbox(f"Select all {len(pool)}", key=f"bulk_all_{stage}", on_change=_set_bulk_selection, args=(stage, [c['id'] for c in pool]))
+
+        actions = {
+            'screening': ["📅 Schedule (exams for juniors, interviews for seniors)"],
+            'aptitude': ["🤝 Schedule Round 1 (passed candidates)"],
+            'interview': ["✅ Pass & Send to VP (round 2)", "❌ Reject"],
+            'offers': ["✉️ Send Offer Letters", "🚀 Onboard & Start Training"],
+        }[stage] + (["👤 Reassign Recruiter"] if is_super_admin else []) + ["🗄️ Archive (No Email)"]
+        action = st.selectbox("Action", actions, key=f"bulk_action_{stage}")
+
+        # Inputs for the chosen action, and the fields it sets per candidate (None = not applicable)
+        notify, changes_for = True, None
+        if action.startswith("📅") or action.startswith("🤝"):
+            bc1, bc2 = st.columns(2)
+            bulk_date = bc1.date_input("Earliest Date", key=f"bulk_d_{stage}")
+            bulk_time = bc2.time_input("Earliest Time", key=f"bulk_t_{stage}")
+            st.caption("Books the earliest free slots: exam slots up to their capacity, interviews in your own calendar (you become the assigned recruiter).")
+        elif action.startswith("✅"):
+            notice_p = st.selectbox("Notice Period", ["Immediate", "1 Month", "2 Months", "3 Months"], key=f"bulk_np_{stage}")
+            notify = False
+            changes_for = lambda c: {'status': 'VP Approval', 'notice_period': notice_p} if c.get('interview_round', 1) == 2 else None
+        elif action.startswith("❌"):
+            rej_reason = st.text_area("Internal Rejection Reason", key=f"bulk_rej_{stage}")
+            st.info("The candidates will be notified and archived.")
+            changes_for = lambda c: {'status': 'Rejected', 'rejection_reason': rej_reason, 'archived': True}
+        elif action.startswith("✉️"):
+            today = datetime.now().strftime("%Y-%m-%d")
+            changes_for = lambda c: {'status': 'Offer Sent', 'offer_sent_date': today} if c['status'] == 'Offer Signed' else None
+        elif action.startswith("🚀"):
+            changes_for = lambda c: {'status': 'Training', 'access_key': generate_employee_id(c['name']), 'training_progress': {}} if c['status'] == 'Joining Scheduled' else None
+        elif action.startswith("👤"):
+            all_users = [u['username'] for u in database.get_users()]
+            new_owner = st.selectbox("Assign to", all_users, key=f"bulk_owner_{stage}")
+            notify = False
+            changes_for = lambda c: {'recruiter': new_owner}
+        else:
+            notify = False
+            changes_for = lambda c: {'archived': True}
+
+        if st.button(f"Apply to {len(selected)} selected", key=f"bulk_apply_{stage}", type="primary", disabled=not selected):
+            if action.startswith("❌") and not rej_reason:
+                st.error("Please provide a reason for internal reference.")
+                return
+            if action.startswith("📅") or action.startswith("🤝"):
+                not_before = scheduling.to_timestamp(bulk_date, bulk_time)
+                sched = get_scheduler()
+                if action.startswith("📅"):
+                    exams = [c['id'] for c in selected if (c.years_experience or 0) <= 2]
+                    interviews = [c['id'] for c in selected if (c.years_experience or 0) > 2]
+                else:
+                    exams = []
+                    interviews = [c['id'] for c in selected if c['status'] == 'Aptitude Completed' and (c.get('aptitude_score') or 0) >= 50]
+                exam_slots = sched.bulk_assign_exams(exams, not_before)
+                interview_slots = sched.bulk_assign_interviews(current_hr, interviews, not_before)
+
+                def slot_changes(c):
+                    if c['id'] in exam_slots:
+                        d, t = scheduling.as_date_time(exam_slots[c['id']])
+                        return {'aptitudeDate': d, 'aptitudeTime': t, 'status': 'Aptitude Scheduled'}
+                    if c['id'] in interview_slots:
+                        d, t = scheduling.as_date_time(interview_slots[c['id']])
+                        return {
+                            'round2Date': d, 'round2Time': t, 'round2Link': generate_meeting_link(),
+                            'status': 'Interview Scheduled', 'interview_round': 1,
+                            'recruiter': current_hr,  # CLAIM OWNERSHIP
+                        }
+                    return None
+                changes_for = slot_changes
+            updated, queued = bulk_update_candidates(selected, changes_for, notify=notify)
+            skipped = len(selected) - updated
+            flash(f"Updated {updated} candidates, {queued} emails queued" + (f" ({skipped} skipped: not applicable or no free slot)" if skipped else ""))
+            st.rerun()
+
+# Changes read per watcher tick; a longer backlog reruns the page without looking further
+LIVE_CHANGE_LIMIT = 200
+
+@st.fragment(run_every=5)
+def live_change_watcher():
+    """
+    Checks the candidate change feed (one indexed range read) every few seconds
+    and reruns the page only when another session has actually written data.
+    The outbox dispatcher's email_status/email_error updates alone do not rerun it;
+    they are picked up with the next rerun.
+    """
+    seen = max(st.session_state.get('live_seen_rev', 0), loaded_rev)
+    changes = database.get_changes_since(seen, LIVE_CHANGE_LIMIT)
+    if not changes:
+        return
+    if len(changes) == LIVE_CHANGE_LIMIT or any(
+        not ch['fields'] or not set(ch['fields']) <= database.CONFLICT_EXEMPT_FIELDS for ch in changes
+    ):
+        st.rerun()
+    st.session_state.live_seen_rev = changes[-1]['rev']
+
 # --- VIEWS ---
+@profiling.profiled
 def sidebar_nav():
     with st.sidebar:
         col_logo, col_title = st.columns([1, 4])
@@ -707,21 +799,25 @@ def sidebar_nav():
             st.markdown("📧 **Email Service**: :red[Mock Mode]")
             st.caption("Set SENDGRID_API_KEY in .env")
 
+        if st.session_state.hr_authenticated:
+            outbox = database.get_outbox_stats()
+            st.caption(f"📤 Outbox: {outbox.get('pending', 0) + outbox.get('sending', 0)} queued · {outbox.get('dead', 0)} failed")
+
         if choice == "HR Dashboard" and st.session_state.hr_authenticated:
-            upcoming_meetings = []
-            now = datetime.now()
-            for c in candidates:
-                if c.get('round2Date') and c.get('round2Time'):
-                    try:
-                        meeting_dt = datetime.strptime(f"{c['round2Date']} {c['round2Time']}", "%Y-%m-%d %H:%M")
-                        diff = meeting_dt - now
-                        if timedelta(minutes=0) < diff <= timedelta(minutes=5):
-                            upcoming_meetings.append(c['name'])
-                    except:
-                        pass
-            
+            # Range seek on the scheduled_events index instead of parsing every candidate's date
+            now_ts = time.time()
+            upcoming_meetings = database.get_upcoming_events(now_ts, now_ts + 5 * 60, kind='interview')
             if upcoming_meetings:
-                 st.error(f"🔔 Meeting Starting: {', '.join(upcoming_meetings)}")
+                 st.error(f"🔔 Meeting Starting: {', '.join(e['name'] for e in upcoming_meetings)}")
+
+            # Reminders fired by the scheduler for this recruiter (or unassigned candidates)
+            notes = database.get_notifications(st.session_state.hr_username, now_ts - 24 * 60 * 60)
+            if notes:
+                for n in notes[:5]:
+                    st.warning(f"⏰ {n['message']}")
+                if st.button("Dismiss reminders", key="dismiss_notes"):
+                    database.mark_notifications_seen([n['id'] for n in notes])
+                    st.rerun()
 
         if st.session_state.hr_authenticated:
             st.markdown(f"👤 **{st.session_state.hr_username}**")
@@ -731,6 +827,7 @@ def sidebar_nav():
                 
     return choice
 
+@profiling.profiled
 def view_candidate_portal():
     st.title("Join HireAI Pipeline")
     st.markdown("Submit your profile for instant AI screening.")
@@ -810,7 +907,6 @@ def view_candidate_portal():
                                 "access_key": access_key,
                                 "date": datetime.now().strftime("%Y-%m-%d"),
                                 "aptitude_score": None,
-                                "aptitude_details": None,
                                 "aptitudeDate": None,
                                 "aptitudeTime": None,
                                 "round2Date": None,
@@ -825,21 +921,14 @@ def view_candidate_portal():
                                 "documents": {}
                             }
                             
-                            database.save_candidate(new_candidate) # Save first to use helper
-                            email_sent, email_msg = resend_candidate_email(new_candidate)
-                            
-                            # Reload to get updated status
-                            new_candidate['email_status'] = "Sent" if email_sent else "Failed"
-                            new_candidate['email_error'] = email_msg if not email_sent else None
+                            # Saves the candidate and queues the confirmation email in one transaction
+                            email_queued, email_msg = resend_candidate_email(new_candidate)
                             
                             st.balloons()
-                            if email_sent:
-                                if "Simulated" in email_msg:
-                                    st.warning(f"Profile Screened! {email_msg} - Credentials logged to Console")
-                                else:
-                                    st.success(f"Profile Screened! Email sent to {email}")
+                            if email_queued:
+                                st.success(f"Profile Screened! Confirmation email is on its way to {email}")
                             else:
-                                st.error(f"Profile Screened, but email failed: {email_msg}")
+                                st.error(f"Profile Screened, but email could not be queued: {email_msg}")
                             
                             st.session_state.last_submitted = new_candidate
                             st.session_state.submission_time = time.time()
@@ -857,42 +946,47 @@ def view_candidate_portal():
 
     with col2:
         if 'last_submitted' in st.session_state:
-            if 'submission_time' not in st.session_state:
-                del st.session_state.last_submitted
-                st.rerun()
-                return
+            credentials_countdown()
 
-            elapsed = time.time() - st.session_state.submission_time
-            if elapsed > 60:
-                del st.session_state.last_submitted
-                if 'submission_time' in st.session_state:
-                    del st.session_state.submission_time
-                st.rerun()
-                return
+@st.fragment(run_every=1)
+def credentials_countdown():
+    """
+    The new candidate's access key, shown for 60 seconds. The browser reruns just this
+    fragment every second, so no script thread sleeps while the countdown runs.
+    """
+    if 'last_submitted' not in st.session_state:
+        return
+    if 'submission_time' not in st.session_state:
+        del st.session_state.last_submitted
+        st.rerun()
+
+    elapsed = time.time() - st.session_state.submission_time
+    if elapsed > 60:
+        del st.session_state.last_submitted
+        del st.session_state.submission_time
+        st.rerun()
+
+    c = st.session_state.last_submitted
+    remaining = int(60 - elapsed)
+
+    with st.container(border=True):
+        st.info("Please save your credentials")
+        st.markdown(f"## {c['access_key']}")
+        st.caption("Use this Access Key to login to the interview portal.")
+        st.markdown(f"**Role:** {c['role']}")
+        st.markdown(f"**Experience:** {c.get('years_experience', 0)} Years")
+        st.markdown(f"**AI Score:** {c['score']}/100")
 
-            c = st.session_state.last_submitted
-            remaining = int(60 - elapsed)
-            
-            with st.container(border=True):
-                st.info("Please save your credentials")
-                st.markdown(f"## {c['access_key']}")
-                st.caption("Use this Access Key to login to the interview portal.")
-                st.markdown(f"**Role:** {c['role']}")
-                st.markdown(f"**Experience:** {c.get('years_experience', 0)} Years")
-                st.markdown(f"**AI Score:** {c['score']}/100")
-                
-                st.divider()
-                st.error(f"This screen will close in {remaining} seconds.")
-                
-                if st.button("✅ I have copied the secret code", type="primary"):
-                     del st.session_state.last_submitted
-                     if 'submission_time' in st.session_state:
-                        del st.session_state.submission_time
-                     st.rerun()
-            
-            time.sleep(1)
+        st.divider()
+        st.error(f"This screen will close in {remaining} seconds.")
+
+        if st.button("✅ I have copied the secret code", type="primary"):
+            del st.session_state.last_submitted
+            if 'submission_time' in st.session_state:
+                del st.session_state.submission_time
             st.rerun()
 
+@profiling.profiled
 def view_vp_dashboard():
     if not st.session_state.get('vp_authenticated', False):
         st.title("VP Login")
@@ -908,7 +1002,7 @@ def view_vp_dashboard():
                         if username == "vp" and password == "vp123":
                             st.session_state.vp_authenticated = True
                             st.session_state.vp_username = username
-                            st.toast(f"Welcome VP!", icon="👋")
+                            flash(f"Welcome VP!", icon="👋")
                             st.rerun()
                         else:
                             st.error("Invalid credentials.")
@@ -925,23 +1019,38 @@ def view_vp_dashboard():
     with col_vp_2:
         if st.button("🔄 Refresh Data", key="refresh_vp"):
             st.rerun()
-
-    # Filter candidates for VP Approval
-    vp_candidates = [c for c in candidates if c.get('status') == 'VP Approval']
-    
-    # Sort by score (descending) and take top 5
-    vp_candidates.sort(key=lambda x: x.get('score', 0), reverse=True)
-    top_5_candidates = vp_candidates[:5]
+    live_change_watcher()
+
+    # One page of the approval queue, best score first (indexed query: only this page is loaded)
+    page_size = st.session_state.get('vp_page_size', 5)
+    page = st.session_state.get('vp_page', 0)
+    vp_candidates, pending = database.get_candidate_queue('VP Approval', limit=page_size, offset=page * page_size)
+    if not vp_candidates and page > 0:
+        # The page emptied (e.g. its offers were signed): go back to the last one
+        st.session_state.vp_page = max(0, (pending - 1) // page_size)
+        st.rerun()
+
+    st.markdown(f"### Pending Approvals ({pending})")
     
-    st.markdown(f"### Pending Approvals ({len(vp_candidates)})")
-    
-    if not top_5_candidates:
+    if not vp_candidates:
         st.info("No candidates pending approval.")
         return
 
-    for c in top_5_candidates:
+    # Batch sign-off: every ticked offer is signed in one transaction
+    selected = [c for c in vp_candidates if st.session_state.get(f"vp_sel_{c['id']}")]
+    col_b1, col_b2 = st.columns([2, 6])
+    with col_b1:
+        if st.button(f"✍️ Sign Selected ({len(selected)})", key="sign_selected", type="primary", disabled=not selected):
+            sign_offers(selected)
+            flash(f"Signed {len(selected)} offers", "success")
+            st.rerun()
+
+    for c in vp_candidates:
         with st.container(border=True):
-            col1, col2, col3, col4 = st.columns([2, 2, 2, 2])
+            col0, col1, col2, col3, col4 = st.columns([0.5, 2, 2, 2, 2])
+
+            with col0:
+                st.checkbox("Select", key=f"vp_sel_{c['id']}", label_visibility="collapsed")
             
             with col1:
                 st.markdown(f"**{c['name']}**")
@@ -958,14 +1067,32 @@ def view_vp_dashboard():
             
             with col4:
                 if st.button("✍️ Sign Offer Letter", key=f"sign_{c['id']}", type="primary"):
-                    c['status'] = 'Offer Signed'
-                    c['offer_signed_by'] = 'VP'
-                    c['offer_signed_date'] = datetime.now().strftime("%Y-%m-%d")
-                    database.save_candidate(c)
-                    st.success(f"Offer signed for {c['name']}")
-                    time.sleep(1)
+                    sign_offers([c])
+                    flash(f"Offer signed for {c['name']}", "success")
                     st.rerun()
 
+    # Paging
+    pages = (pending + page_size - 1) // page_size
+    col_p1, col_p2, col_p3, col_p4 = st.columns([1, 2, 1, 2])
+    with col_p1:
+        if st.button("◀ Previous", key="vp_prev", disabled=page == 0):
+            st.session_state.vp_page = page - 1
+            st.rerun()
+    with col_p2:
+        st.caption(f"Page {page + 1} of {pages}")
+    with col_p3:
+        if st.button("Next ▶", key="vp_next", disabled=page + 1 >= pages):
+            st.session_state.vp_page = page + 1
+            st.rerun()
+    with col_p4:
+        sizes = [5, 10, 25, 50, 100]
+        new_size = st.selectbox("Per page", sizes, index=sizes.index(page_size), key="vp_page_size_select")
+        if new_size != page_size:
+            st.session_state.vp_page_size = new_size
+            st.session_state.vp_page = 0
+            st.rerun()
+
+@profiling.profiled
 def view_hr_dashboard():
     if not st.session_state.hr_authenticated:
         st.title("Recruiter Login")
@@ -981,7 +1108,7 @@ def view_hr_dashboard():
                         if database.login_user(username, password):
                             st.session_state.hr_authenticated = True
                             st.session_state.hr_username = username
-                            st.toast(f"Welcome back, {username}!", icon="👋")
+                            flash(f"Welcome back, {username}!", icon="👋")
                             st.rerun()
                         else:
                             st.error("Invalid username or password.")
@@ -1000,38 +1127,35 @@ def view_hr_dashboard():
     with col_hr_2:
         if st.button("🔄 Refresh Data", key="refresh_hr"):
             st.rerun()
+    live_change_watcher()
     
     current_hr = st.session_state.hr_username
     is_super_admin = current_hr == "admin"
     
     # Filter candidates
-    all_active = [c for c in candidates if not c.get('archived')]
-    permanent_employees = [c for c in all_active if c.get('status') == 'Employee Confirmed']
-    pipeline_candidates = [c for c in all_active if c.get('status') != 'Employee Confirmed']
-    archived_candidates = [c for c in candidates if c.get('archived')]
+    permanent_employees = index.with_status('Employee Confirmed')
+    pipeline_candidates = index.without_status('Employee Confirmed')
+    archived_candidates = index.by_archived[True]
     
-    tab_pipeline, tab_employees, tab_jobs, tab_team, tab_archived, tab_reports = st.tabs([
+    tab_pipeline, tab_employees, tab_jobs, tab_team, tab_archived, tab_reports, tab_analytics = st.tabs([
         f"Active Pipeline ({len(pipeline_candidates)})", 
         f"Permanent Employees ({len(permanent_employees)})",
         "Manage Jobs / JDs",
         "Manage Team",
         f"Archived ({len(archived_candidates)})",
-        "📊 Reports"
+        "📊 Reports",
+        "📈 Analytics"
     ])
     
     with tab_pipeline:
-        df_active = pd.DataFrame(pipeline_candidates)
         m1, m2, m3 = st.columns(3)
         with m1:
             with st.container(border=True):
                 st.metric("Candidates in Pipeline", len(pipeline_candidates))
         with m2:
             with st.container(border=True):
-                if not df_active.empty and 'aptitude_score' in df_active.columns:
-                    aptitude_takers = df_active[df_active['aptitude_score'].notnull()]
-                    avg_apt = int(aptitude_takers['aptitude_score'].mean()) if not aptitude_takers.empty else 0
-                else:
-                    avg_apt = 0
+                aptitude_scores = [c.aptitude_score for c in pipeline_candidates if c.aptitude_score is not None]
+                avg_apt = int(sum(aptitude_scores) / len(aptitude_scores)) if aptitude_scores else 0
                 st.metric("Avg Aptitude Score", f"{avg_apt}%")
         with m3:
             with st.container(border=True):
@@ -1046,11 +1170,11 @@ def view_hr_dashboard():
         if not pipeline_candidates:
             st.info("No active candidates in the pipeline.")
         else:
-            stage_screening = [c for c in pipeline_candidates if c['status'] == 'Screening']
-            stage_aptitude = [c for c in pipeline_candidates if c['status'] in ['Aptitude Scheduled', 'Aptitude Completed']]
-            stage_interview = [c for c in pipeline_candidates if c['status'] == 'Interview Scheduled']
+            stage_screening = index.with_status('Screening')
+            stage_aptitude = index.with_status('Aptitude Scheduled', 'Aptitude Completed')
+            stage_interview = index.with_status('Interview Scheduled')
             # Removed 'Employee Confirmed' from here as they are now in separate tab
-            stage_selected = [c for c in pipeline_candidates if c['status'] in ['VP Approval', 'Offer Signed', 'Offer Sent', 'Offer Accepted', 'Joining Scheduled', 'Selected', 'Training', 'Training Failed']]
+            stage_selected = index.with_status('VP Approval', 'Offer Signed', 'Offer Sent', 'Offer Accepted', 'Joining Scheduled', 'Selected', 'Training', 'Training Failed')
             
             subtab_1, subtab_2, subtab_3, subtab_4 = st.tabs([
                 f"📋 Screening ({len(stage_screening)})",
@@ -1064,6 +1188,8 @@ def view_hr_dashboard():
                 if not stage_screening:
                     st.info("No candidates pending screening.")
                 else:
+                    render_bulk_actions('screening', [c for c in stage_screening if can_act_on(c, current_hr, is_super_admin)], current_hr, is_super_admin)
+
                     with st.container(border=True):
                         c1, c2, c3 = st.columns([3, 2, 2])
                         c1.markdown("**Candidate**")
@@ -1074,6 +1200,8 @@ def view_hr_dashboard():
                         with st.container(border=True):
                             c1, c2, c3 = st.columns([3, 2, 2])
                             with c1:
+                                if can_act_on(c, current_hr, is_super_admin):
+                                    bulk_checkbox('screening', c)
                                 st.markdown(f"**{c['name']}**")
                                 st.caption(f"{c['role']}")
                                 exp_years = c.get('years_experience', 0)
@@ -1088,11 +1216,11 @@ def view_hr_dashboard():
                                 is_owner = not assigned or assigned == current_hr or is_super_admin
                                 
                                 if is_owner:
+                                    force = st.checkbox("Force", key=f"force_rs_{c['id']}", help="Send again even if this email went out in the last few minutes")
                                     if st.button("🔄 Resend Email", key=f"rs_{c['id']}"):
-                                        sent, msg = resend_candidate_email(c)
-                                        if sent: st.toast(f"Email resent to {c['email']}")
-                                        else: st.error(f"Failed: {msg}")
-                                        time.sleep(1)
+                                        sent, msg = resend_candidate_email(c, force=force)
+                                        if sent: flash(f"Email queued for {c['email']}")
+                                        else: flash(f"Failed: {msg}", "error")
                                         st.rerun()
                                 else:
                                     st.caption(f"🔒 Locked by {assigned}")
@@ -1112,7 +1240,7 @@ def view_hr_dashboard():
                                 if not is_owner:
                                     st.warning(f"Owned by {assigned}")
                                 else:
-                                    exp_years = c.get('years_experience', 0)
+                                    exp_years = c.years_experience or 0
                                     if exp_years > 2:
                                         st.success("Senior Candidate")
                                         with st.popover("Schedule Interview"):
@@ -1128,40 +1256,45 @@ def view_hr_dashboard():
                                                 st.button("⚡ Generate", key=f"btn_gen_s_{c['id']}", on_click=set_generated_link_callback, args=(f"lnk_s_{c['id']}",))
                                             
                                             if st.button("Confirm Interview", key=f"btn_int_s_{c['id']}", type="primary"):
-                                                final_link = meet_link if meet_link else generate_meeting_link()
+                                                conflict = interview_conflict(c, current_hr, r2d, r2t)
+                                                if conflict:
+                                                    st.error(conflict)
+                                                else:
+                                                    final_link = meet_link if meet_link else generate_meeting_link()
                                                 
-                                                c['round2Date'] = r2d.strftime("%Y-%m-%d")
-                                                c['round2Time'] = r2t.strftime("%H:%M")
-                                                c['round2Link'] = final_link
-                                                c['status'] = 'Interview Scheduled'
-                                                c['interview_round'] = 1
-                                                c['recruiter'] = current_hr # CLAIM OWNERSHIP
-                                                database.save_candidate(c)
+                                                    c['round2Date'] = r2d.strftime("%Y-%m-%d")
+                                                    c['round2Time'] = r2t.strftime("%H:%M")
+                                                    c['round2Link'] = final_link
+                                                    c['status'] = 'Interview Scheduled'
+                                                    c['interview_round'] = 1
+                                                    c['recruiter'] = current_hr # CLAIM OWNERSHIP
                                                 
-                                                # Send Email
-                                                resend_candidate_email(c)
-                                                st.toast(f"Interview Scheduled. You are now the assigned recruiter.")
-                                                st.rerun()
+                                                    # Send Email
+                                                    resend_candidate_email(c)
+                                                    flash(f"Interview Scheduled. You are now the assigned recruiter.")
+                                                    st.rerun()
                                     else:
                                         with st.popover("Schedule Exam"):
                                             st.info("Junior: Aptitude Mandatory")
                                             d = st.date_input("Date", key=f"d_{c['id']}")
                                             t = st.time_input("Time", key=f"t_{c['id']}")
                                             if st.button("Confirm Schedule", key=f"btn_{c['id']}", type="primary"):
-                                                c['aptitudeDate'] = d.strftime("%Y-%m-%d")
-                                                c['aptitudeTime'] = t.strftime("%H:%M")
-                                                c['status'] = 'Aptitude Scheduled'
-                                                # Aptitude doesn't strictly lock ownership yet, but scheduling interview will
-                                                database.save_candidate(c)
+                                                conflict = exam_conflict(c, d, t)
+                                                if conflict:
+                                                    st.error(conflict)
+                                                else:
+                                                    c['aptitudeDate'] = d.strftime("%Y-%m-%d")
+                                                    c['aptitudeTime'] = t.strftime("%H:%M")
+                                                    c['status'] = 'Aptitude Scheduled'
+                                                    # Aptitude doesn't strictly lock ownership yet, but scheduling interview will
                                                 
-                                                # Send Email
-                                                resend_candidate_email(c)
-                                                st.toast(f"Scheduled for {c['name']}")
-                                                st.rerun()
+                                                    # Send Email
+                                                    resend_candidate_email(c)
+                                                    flash(f"Scheduled for {c['name']}")
+                                                    st.rerun()
                                     
                                     if st.button("Archive", key=f"arc_{c['id']}"):
-                                        c['archived'] = True
-                                        database.save_candidate(c)
+                                        patch_candidate(c, {'archived': True})
                                         st.rerun()
             
             # --- APTITUDE TAB ---
@@ -1169,6 +1302,8 @@ def view_hr_dashboard():
                 if not stage_aptitude:
                     st.info("No candidates in aptitude stage.")
                 else:
+                    render_bulk_actions('aptitude', [c for c in stage_aptitude if can_act_on(c, current_hr, is_super_admin)], current_hr, is_super_admin)
+
                     with st.container(border=True):
                         c1, c2, c3, c4 = st.columns([2.5, 1.5, 1, 2])
                         c1.markdown("**Candidate**")
@@ -1180,6 +1315,8 @@ def view_hr_dashboard():
                         with st.container(border=True):
                             c1, c2, c3, c4 = st.columns([2.5, 1.5, 1, 2])
                             with c1:
+                                if can_act_on(c, current_hr, is_super_admin):
+                                    bulk_checkbox('aptitude', c)
                                 st.markdown(f"**{c['name']}**")
                                 st.caption(c['role'])
                                 
@@ -1191,11 +1328,11 @@ def view_hr_dashboard():
                                 is_owner = not assigned or assigned == current_hr or is_super_admin
 
                                 if is_owner:
+                                    force = st.checkbox("Force", key=f"force_rs_apt_{c['id']}", help="Send again even if this email went out in the last few minutes")
                                     if st.button("🔄 Resend Email", key=f"rs_apt_{c['id']}"):
-                                        sent, msg = resend_candidate_email(c)
-                                        if sent: st.toast(f"Email resent to {c['email']}")
-                                        else: st.error(f"Failed: {msg}")
-                                        time.sleep(1)
+                                        sent, msg = resend_candidate_email(c, force=force)
+                                        if sent: flash(f"Email queued for {c['email']}")
+                                        else: flash(f"Failed: {msg}", "error")
                                         st.rerun()
                                 else:
                                     st.caption(f"🔒 Locked by {assigned}")
@@ -1241,29 +1378,30 @@ def view_hr_dashboard():
                                                     st.button("⚡ Generate", key=f"btn_gen_a_{c['id']}", on_click=set_generated_link_callback, args=(f"lnk_a_{c['id']}",))
 
                                                 if st.button("Send Invite", key=f"inv_{c['id']}", type="primary"):
-                                                    final_link = meet_link if meet_link else generate_meeting_link()
+                                                    conflict = interview_conflict(c, current_hr, r2d, r2t)
+                                                    if conflict:
+                                                        st.error(conflict)
+                                                    else:
+                                                        final_link = meet_link if meet_link else generate_meeting_link()
                                                     
-                                                    c['round2Date'] = r2d.strftime("%Y-%m-%d")
-                                                    c['round2Time'] = r2t.strftime("%H:%M")
-                                                    c['round2Link'] = final_link
-                                                    c['status'] = 'Interview Scheduled'
-                                                    c['interview_round'] = 1
-                                                    c['recruiter'] = current_hr # CLAIM OWNERSHIP
-                                                    database.save_candidate(c)
+                                                        c['round2Date'] = r2d.strftime("%Y-%m-%d")
+                                                        c['round2Time'] = r2t.strftime("%H:%M")
+                                                        c['round2Link'] = final_link
+                                                        c['status'] = 'Interview Scheduled'
+                                                        c['interview_round'] = 1
+                                                        c['recruiter'] = current_hr # CLAIM OWNERSHIP
                                                     
-                                                    # Send Email
-                                                    resend_candidate_email(c)
-                                                    st.toast(f"Invite Sent! Assigned to you.", icon="📨")
-                                                    time.sleep(1)
-                                                    st.rerun()
+                                                        # Send Email
+                                                        resend_candidate_email(c)
+                                                        flash(f"Invite Sent! Assigned to you.", icon="📨")
+                                                        st.rerun()
                                         else:
                                             st.error("Low Score")
                                     else:
                                         st.caption("Waiting for exam...")
                                     
                                     if st.button("Archive", key=f"arc_{c['id']}_apt"):
-                                        c['archived'] = True
-                                        database.save_candidate(c)
+                                        patch_candidate(c, {'archived': True})
                                         st.rerun()
 
             # --- INTERVIEW TAB ---
@@ -1271,6 +1409,8 @@ def view_hr_dashboard():
                 if not stage_interview:
                     st.info("No candidates scheduled for interviews.")
                 else:
+                    render_bulk_actions('interview', [c for c in stage_interview if can_act_on(c, current_hr, is_super_admin)], current_hr, is_super_admin)
+
                     with st.container(border=True):
                         c1, c2, c3 = st.columns([3, 3, 2])
                         c1.markdown("**Candidate**")
@@ -1281,6 +1421,8 @@ def view_hr_dashboard():
                          with st.container(border=True):
                             c1, c2, c3 = st.columns([3, 3, 2])
                             with c1:
+                                if can_act_on(c, current_hr, is_super_admin):
+                                    bulk_checkbox('interview', c)
                                 st.markdown(f"**{c['name']}**")
                                 st.caption(c['role'])
                                 
@@ -1293,11 +1435,11 @@ def view_hr_dashboard():
                                 st.markdown(f"📧 Email: :{color}[{email_status}]")
                                 
                                 if is_owner:
+                                    force = st.checkbox("Force", key=f"force_rs_int_{c['id']}", help="Send again even if this email went out in the last few minutes")
                                     if st.button("🔄 Resend Email", key=f"rs_int_{c['id']}"):
-                                        sent, msg = resend_candidate_email(c)
-                                        if sent: st.toast(f"Email resent to {c['email']}")
-                                        else: st.error(f"Failed: {msg}")
-                                        time.sleep(1)
+                                        sent, msg = resend_candidate_email(c, force=force)
+                                        if sent: flash(f"Email queued for {c['email']}")
+                                        else: flash(f"Failed: {msg}", "error")
                                         st.rerun()
                                 else:
                                     st.caption(f"🔒 Locked by {assigned}")
@@ -1336,17 +1478,16 @@ def view_hr_dashboard():
                                             
                                         new_owner = st.selectbox("Assign Interviewer", all_users, index=current_idx, key=f"own_{c['id']}")
                                         if st.button("Reassign Ownership", key=f"btn_own_{c['id']}"):
-                                            c['recruiter'] = new_owner
-                                            database.save_candidate(c)
-                                            st.toast(f"Reassigned to {new_owner}")
+                                            patch_candidate(c, {'recruiter': new_owner})
+                                            flash(f"Reassigned to {new_owner}")
                                             st.rerun()
                                         
                                         st.divider()
                                         
                                         # 2. Force Reschedule / Update Link
                                         st.markdown("**Force Reschedule / Update Link**")
-                                        admin_date = st.date_input("Date", value=datetime.strptime(c['round2Date'], "%Y-%m-%d"), key=f"ad_d_{c['id']}")
-                                        admin_time = st.time_input("Time", value=datetime.strptime(c['round2Time'], "%H:%M"), key=f"ad_t_{c['id']}")
+                                        admin_date = st.date_input("Date", value=c.round2Date, key=f"ad_d_{c['id']}")
+                                        admin_time = st.time_input("Time", value=c.round2Time, key=f"ad_t_{c['id']}")
                                         
                                         col_l1, col_l2 = st.columns([3, 1.5])
                                         with col_l1:
@@ -1361,16 +1502,19 @@ def view_hr_dashboard():
                                             )
 
                                         if st.button("Update & Notify Candidate", type="primary", key=f"ad_upd_{c['id']}"):
-                                            c['round2Date'] = admin_date.strftime("%Y-%m-%d")
-                                            c['round2Time'] = admin_time.strftime("%H:%M")
-                                            # Use the value from the text input state if available
-                                            c['round2Link'] = st.session_state.get(f"ad_l_{c['id']}", c.get('round2Link', ''))
-                                            database.save_candidate(c)
+                                            conflict = interview_conflict(c, c.get('recruiter') or current_hr, admin_date, admin_time)
+                                            if conflict:
+                                                st.error(conflict)
+                                            else:
+                                                c['round2Date'] = admin_date.strftime("%Y-%m-%d")
+                                                c['round2Time'] = admin_time.strftime("%H:%M")
+                                                # Use the value from the text input state if available
+                                                c['round2Link'] = st.session_state.get(f"ad_l_{c['id']}", c.get('round2Link', ''))
                                             
-                                            # Send Email
-                                            resend_candidate_email(c)
-                                            st.toast("Updated & Email Sent!")
-                                            st.rerun()
+                                                # Send Email
+                                                resend_candidate_email(c)
+                                                flash("Updated & Email Sent!")
+                                                st.rerun()
 
                                 # Actions restricted to owner (or admin who is now also an owner effectively)
                                 assigned = c.get('recruiter')
@@ -1395,23 +1539,25 @@ def view_hr_dashboard():
                                                 st.button("⚡ Generate", key=f"btn_gen_r2_{c['id']}", on_click=set_generated_link_callback, args=(f"lnk_r2_{c['id']}",))
                                             
                                             if st.button("Confirm Round 2", key=f"btn_r3_{c['id']}", type="primary"):
-                                                # Use input link if provided, otherwise generate random
-                                                new_link = meet_link if meet_link else generate_meeting_link()
+                                                conflict = interview_conflict(c, c.get('recruiter') or current_hr, r3d, r3t)
+                                                if conflict:
+                                                    st.error(conflict)
+                                                else:
+                                                    # Use input link if provided, otherwise generate random
+                                                    new_link = meet_link if meet_link else generate_meeting_link()
                                                 
-                                                c['round2Date'] = r3d.strftime("%Y-%m-%d")
-                                                c['round2Time'] = r3t.strftime("%H:%M")
-                                                c['round2Link'] = new_link
-                                                c['interview_round'] = 2
-                                                # Only set recruiter if not already set, or if admin is taking over normal flow
-                                                if not c.get('recruiter'):
-                                                    c['recruiter'] = current_hr 
-                                                database.save_candidate(c)
+                                                    c['round2Date'] = r3d.strftime("%Y-%m-%d")
+                                                    c['round2Time'] = r3t.strftime("%H:%M")
+                                                    c['round2Link'] = new_link
+                                                    c['interview_round'] = 2
+                                                    # Only set recruiter if not already set, or if admin is taking over normal flow
+                                                    if not c.get('recruiter'):
+                                                        c['recruiter'] = current_hr 
                                                 
-                                                # Send Email
-                                                resend_candidate_email(c)
-                                                st.toast(f"Round 2 Scheduled!")
-                                                time.sleep(1)
-                                                st.rerun()
+                                                    # Send Email
+                                                    resend_candidate_email(c)
+                                                    flash(f"Round 2 Scheduled!")
+                                                    st.rerun()
                                     
                                     # --- Selection Action for Round 2 ---
                                     if current_round == 2:
@@ -1421,11 +1567,8 @@ def view_hr_dashboard():
                                             notice_p = st.selectbox("Notice Period", ["Immediate", "1 Month", "2 Months", "3 Months"], key=f"np_{c['id']}")
                                             
                                             if st.button("Confirm & Send", key=f"btn_vp_{c['id']}", type="primary"):
-                                                c['status'] = 'VP Approval'
-                                                c['notice_period'] = notice_p
-                                                database.save_candidate(c)
-                                                st.success("Sent to VP for Approval")
-                                                time.sleep(1)
+                                                patch_candidate(c, {'status': 'VP Approval', 'notice_period': notice_p})
+                                                flash("Sent to VP for Approval", "success")
                                                 st.rerun()
 
                                     st.divider()
@@ -1441,20 +1584,17 @@ def view_hr_dashboard():
                                                 c['status'] = 'Rejected'
                                                 c['rejection_reason'] = rej_reason
                                                 c['archived'] = True
-                                                database.save_candidate(c)
                                                 
                                                 # Send Rejection Email (Generic, no reason included)
                                                 resend_candidate_email(c)
-                                                st.toast("Candidate Rejected & Archived")
-                                                time.sleep(1)
+                                                flash("Candidate Rejected & Archived")
                                                 st.rerun()
                                             else:
                                                 st.error("Please provide a reason for internal reference.")
 
                                     # Simple Archive (No email trigger, just hide)
                                     if st.button("Archive (No Email)", key=f"arc_{c['id']}_int"):
-                                        c['archived'] = True
-                                        database.save_candidate(c)
+                                        patch_candidate(c, {'archived': True})
                                         st.rerun()
 
             # --- OFFERS & JOINING TAB ---
@@ -1462,6 +1602,8 @@ def view_hr_dashboard():
                 if not stage_selected:
                     st.info("No candidates in Offer/Joining stage.")
                 else:
+                    render_bulk_actions('offers', [c for c in stage_selected if can_act_on(c, current_hr, is_super_admin)], current_hr, is_super_admin)
+
                     with st.container(border=True):
                         c1, c2, c3 = st.columns([3, 3, 2])
                         c1.markdown("**Candidate**")
@@ -1472,6 +1614,8 @@ def view_hr_dashboard():
                          with st.container(border=True):
                             c1, c2, c3 = st.columns([3, 3, 2])
                             with c1:
+                                if can_act_on(c, current_hr, is_super_admin):
+                                    bulk_checkbox('offers', c)
                                 st.markdown(f"**{c['name']}**")
                                 st.caption(c['role'])
                                 
@@ -1527,10 +1671,8 @@ def view_hr_dashboard():
                                         if st.button("✉️ Send Offer Letter", key=f"snd_off_{c['id']}", type="primary"):
                                             c['status'] = 'Offer Sent'
                                             c['offer_sent_date'] = datetime.now().strftime("%Y-%m-%d")
-                                            database.save_candidate(c)
                                             resend_candidate_email(c)
-                                            st.toast("Offer Letter Sent!")
-                                            time.sleep(1)
+                                            flash("Offer Letter Sent!")
                                             st.rerun()
                                     
                                     elif c['status'] == 'Offer Accepted':
@@ -1549,17 +1691,16 @@ def view_hr_dashboard():
                                             if st.button("Confirm & Send Letter", key=f"btn_join_{c['id']}", type="primary", disabled=btn_disabled):
                                                 c['joining_date'] = j_date.strftime("%Y-%m-%d")
                                                 c['status'] = 'Joining Scheduled'
-                                                database.save_candidate(c)
                                                 
                                                 # Send Joining Email
                                                 resend_candidate_email(c)
-                                                st.toast(f"Joining Letter Sent!")
-                                                time.sleep(1)
+                                                flash(f"Joining Letter Sent!")
                                                 st.rerun()
                                     elif c['status'] == 'Joining Scheduled':
+                                        force = st.checkbox("Force", key=f"force_rs_join_{c['id']}", help="Send again even if this email went out in the last few minutes")
                                         if st.button("🔄 Resend Letter", key=f"rs_join_{c['id']}"):
-                                            sent, msg = resend_candidate_email(c)
-                                            if sent: st.toast("Joining Letter Resent")
+                                            sent, msg = resend_candidate_email(c, force=force)
+                                            if sent: st.toast("Joining Letter queued for resend")
                                             else: st.error(f"Failed: {msg}")
                                         
                                         st.divider()
@@ -1569,14 +1710,12 @@ def view_hr_dashboard():
                                             c['access_key'] = new_emp_id # Update Key
                                             c['status'] = 'Training'
                                             c['training_progress'] = {} # Init progress
-                                            database.save_candidate(c)
                                             
                                             # Send Email with new ID
                                             resend_candidate_email(c)
                                             
-                                            st.success(f"Onboarded! New Employee ID: {new_emp_id}")
-                                            st.info("Candidate notified to start training.")
-                                            time.sleep(2)
+                                            flash(f"Onboarded! New Employee ID: {new_emp_id}", "success")
+                                            flash("Candidate notified to start training.", "info")
                                             st.rerun()
                                     
                                     elif c['status'] == 'Training':
@@ -1598,13 +1737,13 @@ def view_hr_dashboard():
 
                                         if st.button("🔄 Reset Training (Keep History)", key=f"rst_trn_{c['id']}"):
                                             # Reset progress and attempts count to allow retake
-                                            c['training_progress'] = {}
-                                            c['training_attempts'] = {} 
                                             # We DO NOT clear 'training_history'
-                                            
-                                            c['hr_training_resets'] = c.get('hr_training_resets', 0) + 1
-                                            database.save_candidate(c)
-                                            st.success("Training Reset. Candidate can start over.")
+                                            patch_candidate(c, {
+                                                'training_progress': {},
+                                                'training_attempts': {},
+                                                'hr_training_resets': c.get('hr_training_resets', 0) + 1,
+                                            })
+                                            flash("Training Reset. Candidate can start over.", "success")
                                             st.rerun()
 
                                     elif c['status'] == 'Training Failed':
@@ -1617,13 +1756,14 @@ def view_hr_dashboard():
                                                 st.dataframe(pd.DataFrame(history))
 
                                         if st.button("🔄 Reset & Allow Retry", key=f"rst_fail_{c['id']}"):
-                                            c['status'] = 'Training'
-                                            c['training_progress'] = {}
-                                            c['training_attempts'] = {}
                                             # Keep history
-                                            c['hr_training_resets'] = c.get('hr_training_resets', 0) + 1
-                                            database.save_candidate(c)
-                                            st.success("Training Reset. Candidate can try again.")
+                                            patch_candidate(c, {
+                                                'status': 'Training',
+                                                'training_progress': {},
+                                                'training_attempts': {},
+                                                'hr_training_resets': c.get('hr_training_resets', 0) + 1,
+                                            })
+                                            flash("Training Reset. Candidate can try again.", "success")
                                             st.rerun()
                                     
                                     elif c['status'] == 'Employee Confirmed':
@@ -1662,8 +1802,7 @@ def view_hr_dashboard():
                             render_candidate_details(c)
                         
                         if st.button("Archive Employee", key=f"arc_emp_{c['id']}"):
-                            c['archived'] = True
-                            database.save_candidate(c)
+                            patch_candidate(c, {'archived': True})
                             st.rerun()
 
     # --- JOB MANAGEMENT TAB ---
@@ -1753,7 +1892,7 @@ def view_hr_dashboard():
                             
                             if st.button("Update Job", key=f"btn_upd_{job['id']}", type="primary"):
                                 database.update_job(job['id'], edit_title, edit_desc, edit_skills, edit_exp)
-                                st.success("Job updated!")
+                                flash("Job updated!", "success")
                                 st.rerun()
 
                         if st.button("Delete", key=f"del_job_{job['id']}"):
@@ -1782,32 +1921,19 @@ def view_hr_dashboard():
                     if st.form_submit_button("Create User & Send Email", type="primary"):
                         if st.session_state.new_u_input and st.session_state.new_p_input and st.session_state.new_e_input:
                             if database.create_user(st.session_state.new_u_input, st.session_state.new_p_input, st.session_state.new_e_input):
-                                email_body = f"""
-Hello {st.session_state.new_u_input},
-
-You have been granted recruiter access to the HireAI platform.
-
-Username: {st.session_state.new_u_input}
-Password: {st.session_state.new_p_input}
-
-Please login securely at the HR Portal.
-
-Best regards,
-HireAI Admin
-"""
-                                sent, msg = email_service.send_email(st.session_state.new_e_input, "HireAI Recruiter Access", email_body)
+                                database.enqueue_email(
+                                    st.session_state.new_e_input, template="recruiter_access",
+                                    context={'username': st.session_state.new_u_input, 'password': st.session_state.new_p_input}
+                                )
+                                email_outbox.wake()
                                 
-                                st.success(f"User '{st.session_state.new_u_input}' created successfully.")
-                                if sent:
-                                    st.toast(f"📧 Credentials sent to {st.session_state.new_e_input}", icon="✅")
-                                else:
-                                    st.error(f"Failed to send email: {msg}")
+                                flash(f"User '{st.session_state.new_u_input}' created successfully.", "success")
+                                flash(f"📧 Credentials email queued for {st.session_state.new_e_input}", icon="✅")
                                 
                                 del st.session_state.new_u_input
                                 del st.session_state.new_e_input
                                 del st.session_state.new_p_input
                                 
-                                time.sleep(1)
                                 st.rerun()
                             else:
                                 st.error(f"Username '{st.session_state.new_u_input}' already exists.")
@@ -1841,7 +1967,7 @@ HireAI Admin
                                 if st.button("Update", key=f"upd_{u['username']}"):
                                     final_pass = ed_pass if ed_pass else u['password']
                                     database.update_user(u['username'], ed_email, final_pass)
-                                    st.success("Updated!")
+                                    flash("Updated!", "success")
                                     st.rerun()
                         
                         with col_b:
@@ -1894,17 +2020,14 @@ HireAI Admin
                     delete_pressed = st.form_submit_button("Delete Selected (Permanent)", type="primary")
 
                 if restore_pressed and selected_for_delete:
-                    for cid in selected_for_delete:
-                        cand = next((x for x in candidates if x['id'] == cid), None)
-                        if cand:
-                            cand['archived'] = False
-                            database.save_candidate(cand)
-                    st.success(f"Restored {len(selected_for_delete)} candidates.")
+                    restored = [index.by_id[cid] for cid in selected_for_delete if cid in index.by_id]
+                    bulk_update_candidates(restored, lambda c: {'archived': False}, notify=False)
+                    flash(f"Restored {len(selected_for_delete)} candidates.", "success")
                     st.rerun()
                 
                 if delete_pressed and selected_for_delete:
                      database.bulk_delete_candidates(selected_for_delete)
-                     st.success(f"Permanently deleted {len(selected_for_delete)} records.")
+                     flash(f"Permanently deleted {len(selected_for_delete)} records.", "success")
                      st.rerun()
 
     # --- REPORTS TAB ---
@@ -1912,103 +2035,87 @@ HireAI Admin
         st.subheader("📊 Candidate Reports")
         st.caption("Generate detailed reports based on application date range.")
         
-        col_r1, col_r2 = st.columns(2)
+        col_r1, col_r2, col_r3 = st.columns(3)
         with col_r1:
             start_date = st.date_input("From Date", value=datetime.now() - timedelta(days=30))
         with col_r2:
             end_date = st.date_input("To Date", value=datetime.now())
+        with col_r3:
+            export_format = st.selectbox("Export Format", list(reports.EXPORT_FORMATS), format_func=lambda f: reports.EXPORT_FORMATS[f][0])
             
         if st.button("Generate Report", type="primary"):
-            # Filter candidates
-            report_data = []
-            
-            # Combine all lists - we use the main 'candidates' list which has everything
-            all_candidates_for_report = candidates 
-            
-            for c in all_candidates_for_report:
-                # Parse date
-                try:
-                    c_date = datetime.strptime(c['date'], "%Y-%m-%d").date()
-                except:
-                    continue # Skip invalid dates
-                
-                if start_date <= c_date <= end_date:
-                    # Collect Data
-                    
-                    # Training Progress
-                    train_prog = c.get('training_progress', {})
-                    train_avg = sum(train_prog.values()) / len(TRAINING_MODULES) if train_prog and len(TRAINING_MODULES) > 0 else 0
-                    
-                    # Aptitude Status Logic
-                    apt_score = c.get('aptitude_score')
-                    apt_status = "Pending"
-                    if apt_score is not None:
-                        apt_status = "Passed" if apt_score >= 50 else "Failed"
-                    
-                    # Interview Logic
-                    r_date = c.get('round2Date', 'N/A')
-                    r_round = c.get('interview_round', 0)
-                    
-                    r1_val = "N/A"
-                    r2_val = "N/A"
-                    
-                    if r_round == 1:
-                        r1_val = r_date
-                    elif r_round >= 2:
-                        r1_val = "Completed" # Date overwritten in system
-                        r2_val = r_date
-
-                    row = {
-                        "Candidate ID": c['id'],
-                        "Name": c['name'],
-                        "Email": c['email'],
-                        "Role": c['role'],
-                        "Current Status": c['status'],
-                        "Application Date": c['date'],
-                        "AI Screening Score": c.get('score', 0),
-                        "Experience (Years)": c.get('years_experience', 0),
-                        "Recruiter": c.get('recruiter', 'Unassigned'),
-                        
-                        # Aptitude
-                        "Aptitude Score": apt_score if apt_score is not None else 'N/A',
-                        "Aptitude Status": apt_status,
-                        "Aptitude Date": c.get('aptitudeDate', 'N/A'),
-                        
-                        # Interview
-                        "Round 1 Date": r1_val,
-                        "Round 2 Date": r2_val,
-                        
-                        # Offer
-                        "Offer Sent": "Yes" if c.get('status') in ['Offer Sent', 'Offer Signed', 'Offer Accepted', 'Joining Scheduled', 'Employee Confirmed'] else "No",
-                        "Offer Signed Date": c.get('offer_signed_date', 'N/A'),
-                        
-                        # Training
-                        "Training Status": "Completed" if train_avg >= 80 else "In Progress" if train_prog else "Not Started",
-                        "Training Avg Score": f"{train_avg:.1f}%",
-                        "Training Attempts": sum(c.get('training_attempts', {}).values()),
-                        
-                        # Joining
-                        "Joined Company": "Yes" if c.get('status') == 'Employee Confirmed' else "No",
-                        "Employee ID": c.get('access_key') if c.get('status') == 'Employee Confirmed' else 'N/A'
-                    }
-                    report_data.append(row)
-            
-            if not report_data:
+            # Indexed date-range query + column-wise pandas (no per-candidate Python loop)
+            with profiling.phase("pandas"):
+                df_report = reports.candidate_report(start_date, end_date, len(TRAINING_MODULES))
+
+            if df_report.empty:
                 st.warning("No records found for the selected date range.")
             else:
-                df_report = pd.DataFrame(report_data)
-                st.success(f"Found {len(report_data)} records.")
+                st.success(f"Found {len(df_report)} records.")
                 st.dataframe(df_report, use_container_width=True)
                 
-                # CSV Download
-                csv = df_report.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="📥 Download Report as CSV",
-                    data=csv,
-                    file_name=f"candidate_report_{start_date}_{end_date}.csv",
-                    mime="text/csv",
-                )
+                # Export: written in chunks to a temp file, reused until the data changes
+                with profiling.phase("export"):
+                    export_path = reports.export_report(start_date, end_date, len(TRAINING_MODULES), export_format)
+                label, mime = reports.EXPORT_FORMATS[export_format]
+                with open(export_path, "rb") as f:
+                    st.download_button(
+                        label=f"📥 Download Report as {label}",
+                        data=f,
+                        file_name=f"candidate_report_{start_date}_{end_date}.{export_format}",
+                        mime=mime,
+                    )
+
+    # --- ANALYTICS TAB ---
+    with tab_analytics:
+        st.subheader("📈 Hiring Analytics")
+        st.caption("Funnel, throughput and conversion from daily status rollups (updated on every status change).")
+
+        roles, recruiters = database.get_rollup_dimensions()
+        col_a1, col_a2, col_a3, col_a4 = st.columns(4)
+        with col_a1:
+            a_start = st.date_input("From", value=datetime.now() - timedelta(days=90), key="an_start")
+        with col_a2:
+            a_end = st.date_input("To", value=datetime.now(), key="an_end")
+        with col_a3:
+            a_role = st.selectbox("Role", ["All"] + roles, key="an_role")
+        with col_a4:
+            a_recruiter = st.selectbox("Recruiter", ["All"] + recruiters, key="an_recruiter")
+
+        with profiling.phase("pandas"):
+            analytics = reports.hiring_analytics(
+                a_start, a_end,
+                role=None if a_role == "All" else a_role,
+                recruiter=None if a_recruiter == "All" else a_recruiter,
+            )
+
+        if analytics is None:
+            st.info("No status changes in the selected range.")
+        else:
+            funnel = analytics["funnel"]
+            k1, k2, k3 = st.columns(3)
+            k1.metric("New Applications", int(funnel["Candidates"].iloc[0]))
+            k2.metric("Employees Confirmed", int(funnel["Candidates"].iloc[-1]))
+            k3.metric("Rejected", analytics["rejected"])
+
+            col_f, col_c = st.columns(2)
+            with col_f:
+                st.plotly_chart(px.funnel(funnel, x="Candidates", y="Stage", title="Hiring Funnel"), use_container_width=True)
+            with col_c:
+                st.plotly_chart(px.bar(analytics["conversion"], x="Conversion (%)", y="Step", orientation="h", title="Stage Conversion"), use_container_width=True)
+
+            st.plotly_chart(px.bar(analytics["throughput"], x="Day", y="Transitions", color="Status", title="Daily Throughput"), use_container_width=True)
+
+            col_t, col_s = st.columns(2)
+            with col_t:
+                if analytics["time_in_stage"].empty:
+                    st.caption("Time in stage appears once candidates move on from a tracked stage.")
+                else:
+                    st.plotly_chart(px.bar(analytics["time_in_stage"], x="Stage", y="Avg Days", title="Average Time in Stage"), use_container_width=True)
+            with col_s:
+                st.dataframe(analytics["scores"], use_container_width=True, hide_index=True)
 
+@profiling.profiled
 def view_interview_room():
     if not st.session_state.active_user:
         st.title("Candidate / Employee Login")
@@ -2017,8 +2124,8 @@ def view_interview_room():
             with st.container(border=True):
                 key_input = st.text_input("Access Key / Employee ID", placeholder="Enter your Access Key or 12-digit Employee ID")
                 if st.button("Login to Portal", type="primary"):
-                    match = next((c for c in candidates if c.get('access_key') == key_input and not c.get('archived')), None)
-                    if match:
+                    match = index.by_access_key.get(key_input)
+                    if match and not match.get('archived'):
                         st.session_state.active_user = match
                         st.rerun()
                     else:
@@ -2038,8 +2145,8 @@ def view_interview_room():
                 # Reload active user data from fresh DB fetch
                 if st.session_state.active_user:
                     current_id = st.session_state.active_user['id']
-                    # candidates global var is already fresh from this run
-                    fresh_user = next((c for c in candidates if c['id'] == current_id), None)
+                    # the index is already fresh from this run
+                    fresh_user = index.by_id.get(current_id)
                     if fresh_user:
                         st.session_state.active_user = fresh_user
                 st.rerun()
@@ -2154,7 +2261,7 @@ def view_interview_room():
             st.sidebar.divider()
             st.sidebar.markdown("### 🏆 Leaderboard")
             
-            all_cands = database.get_candidates()
+            all_cands = index.candidates
             leaderboard = []
             for c in all_cands:
                 prog = c.get('training_progress', {})
@@ -2256,29 +2363,26 @@ def view_interview_room():
                                     'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                                 })
                                 
-                                database.save_candidate(user)
+                                patch_candidate(user, {k: user[k] for k in ('training_attempts', 'training_progress', 'training_history')})
                                 
                                 # Pass/Fail Logic
                                 passed_now = percentage >= 80
                                 
                                 if passed_now:
-                                    st.balloons()
-                                    st.success(f"Quiz Submitted! Score: {percentage}%")
+                                    flash(None, "balloons")
+                                    flash(f"Quiz Submitted! Score: {percentage}%", "success")
                                     
                                     # Auto-advance logic
                                     next_id = module['id'] + 1
                                     if next_id <= len(TRAINING_MODULES):
-                                        st.info(f"Passed! Advancing to Chapter {next_id}...")
-                                        time.sleep(2)
+                                        flash(f"Passed! Moving on to Chapter {next_id}.", "info")
                                         st.session_state.training_active_id = next_id
                                         st.session_state.training_force_update = True
                                     else:
-                                        st.success("All modules completed!")
-                                        time.sleep(2)
+                                        flash("All modules completed!", "success")
                                 else:
-                                    st.error(f"Quiz Submitted. Score: {percentage}%")
-                                    st.warning("You did not pass (80% required). Please retake the quiz.")
-                                    time.sleep(2)
+                                    flash(f"Quiz Submitted. Score: {percentage}%", "error")
+                                    flash("You did not pass (80% required). Please retake the quiz.", "warning")
                                     
                                 st.rerun()
             else:
@@ -2303,7 +2407,6 @@ def view_interview_room():
                 st.success("🎉 Congratulations! You have passed the mandatory training.")
                 if st.button("Claim Permanent Status"):
                     user['status'] = 'Employee Confirmed'
-                    database.save_candidate(user)
                     resend_candidate_email(user)
                     st.rerun()
 
@@ -2320,13 +2423,11 @@ def view_interview_room():
         # --- OFFER STAGE ---
         if user.get('status') == 'Offer Sent':
             # Check expiration
-            sent_date_str = user.get('offer_sent_date')
-            if sent_date_str:
+            sent_date = user.offer_sent_date
+            if sent_date:
                 try:
-                    sent_date = datetime.strptime(sent_date_str, "%Y-%m-%d")
-                    if (datetime.now() - sent_date).days > 3:
-                        user['status'] = 'Offer Expired'
-                        database.save_candidate(user)
+                    if (datetime.now().date() - sent_date).days > 3:
+                        patch_candidate(user, {'status': 'Offer Expired'})
                         st.error("🚫 Offer Expired")
                         st.info("The validity period for this offer has ended.")
                         return
@@ -2357,17 +2458,13 @@ def view_interview_room():
                 
                 if st.button("✅ ACCEPT OFFER", type="primary", use_container_width=True):
                     user['status'] = 'Offer Accepted'
-                    database.save_candidate(user)
                     resend_candidate_email(user)
-                    st.success("Offer Accepted!")
+                    flash("Offer Accepted!", "success")
                     st.rerun()
                 
                 if st.button("❌ Decline Offer", type="secondary", use_container_width=True):
-                    user['status'] = 'Rejected'
-                    user['rejection_reason'] = 'Candidate Declined Offer'
-                    user['archived'] = True
-                    database.save_candidate(user)
-                    st.warning("Offer Declined.")
+                    patch_candidate(user, {'status': 'Rejected', 'rejection_reason': 'Candidate Declined Offer', 'archived': True})
+                    flash("Offer Declined.", "warning")
                     st.rerun()
             return
 
@@ -2399,15 +2496,12 @@ def view_interview_room():
                         p1 = save_uploaded_doc(id_proof, user['id'], "ID_Proof")
                         p2 = save_uploaded_doc(addr_proof, user['id'], "Address_Proof")
                         
-                        user['documents'] = {
-                            "id_proof": p1,
-                            "address_proof": p2
-                        }
-                        user['documents_uploaded'] = True
-                        database.save_candidate(user)
+                        patch_candidate(user, {
+                            'documents': {"id_proof": p1, "address_proof": p2},
+                            'documents_uploaded': True,
+                        })
                         
-                        st.toast("Documents submitted successfully!")
-                        time.sleep(1)
+                        flash("Documents submitted successfully!")
                         st.rerun()
                     else:
                         st.error("Please upload both documents to proceed.")
@@ -2431,7 +2525,7 @@ def view_interview_room():
             
             # Show Leaderboard
             st.markdown("### 🏆 Training Leaderboard")
-            all_cands = database.get_candidates()
+            all_cands = index.candidates
             leaderboard = []
             
             for c in all_cands:
@@ -2460,13 +2554,9 @@ def view_interview_room():
         # Logic: If experience < 2 years OR status is explicitly Aptitude Scheduled/Screening
         # And NOT if they are in later stages (which are handled above)
         
-        is_junior = False
-        try:
-            exp_val = float(str(user.get('years_experience', 0)).split()[0]) # Handle "2 years" string if present
-            if exp_val < 2:
-                is_junior = True
-        except:
-            pass # Default to False if parsing fails
+        # years_experience is already a number ("2 years" is parsed when the candidate is loaded)
+        exp_val = 0 if user.years_experience is None else user.years_experience
+        is_junior = isinstance(exp_val, (int, float)) and exp_val < 2
             
         should_show_aptitude = is_junior or user.get('status') in ['Screening', 'Aptitude Scheduled']
         
@@ -2483,8 +2573,11 @@ def view_interview_room():
                     st.info("Your interview rounds have not been scheduled by HR yet. Please check back later.")
                 return
     
-            scheduled_datetime_str = f"{user['aptitudeDate']} {user['aptitudeTime']}"
-            scheduled_dt = datetime.strptime(scheduled_datetime_str, "%Y-%m-%d %H:%M")
+            # Candidate parses both fields; a value that didn't parse (or a missing time) can't be combined
+            if not isinstance(user.aptitudeDate, date) or not isinstance(user.aptitudeTime, dt_time):
+                st.error(f"Your exam schedule is invalid ({user.get('aptitudeDate')} {user.get('aptitudeTime')}). Please contact HR.")
+                return
+            scheduled_dt = datetime.combine(user.aptitudeDate, user.aptitudeTime)
             now = datetime.now()
             
             if now < scheduled_dt:
@@ -2495,7 +2588,7 @@ def view_interview_room():
                 with st.container(border=True):
                     st.warning("Exam Locked")
                     st.markdown(f"### Starts in: {diff.days}d {hours}h {mins}m")
-                    st.write(f"Scheduled for: **{scheduled_datetime_str}**")
+                    st.write(f"Scheduled for: **{scheduled_dt.strftime('%Y-%m-%d %H:%M')}**")
                     if st.button("Refresh Timer"):
                         st.rerun()
                 return
@@ -2519,7 +2612,8 @@ def view_interview_room():
                      st.divider()
                      st.subheader("Detailed Review")
                      
-                     details = user.get('aptitude_details')
+                     # The exam itself lives outside the candidate document; only fetched for this review
+                     details = user.get('aptitude_details') or database.get_aptitude_details(user.get('aptitude_attempt_id'))
                      if details:
                          questions_data = details.get('questions', [])
                          answers_data = details.get('answers', {})
@@ -2579,10 +2673,11 @@ def view_interview_room():
     
                 # 2. Logic to handle the triggers immediately
                 if cheat_detected:
-                    user['status'] = 'Rejected'
-                    user['rejection_reason'] = 'Academic Dishonesty Detected (Tab Switching)'
-                    user['archived'] = True 
-                    database.save_candidate(user)
+                    patch_candidate(user, {
+                        'status': 'Rejected',
+                        'rejection_reason': 'Academic Dishonesty Detected (Tab Switching)',
+                        'archived': True,
+                    })
                     st.session_state.active_user = user # Update session
                     st.rerun()
     
@@ -2719,22 +2814,17 @@ def view_interview_room():
                         "answers": user_answers 
                     }
                     
-                    # Update Candidate in DB FIRST so status is correct for resend function
+                    # Update Candidate (saved together with the result email below)
                     user['aptitude_score'] = final_percentage
                     user['aptitude_details'] = details
                     user['status'] = 'Aptitude Completed'
-                    database.save_candidate(user)
                     
-                    # Resend Email (Passed/Failed) using helper
-                    email_sent, email_msg = resend_candidate_email(user)
-    
-                    user['email_status'] = "Sent" if email_sent else "Failed"
-                    user['email_error'] = email_msg if not email_sent else None
-                    database.save_candidate(user)
+                    # Save + queue the Passed/Failed email in one transaction
+                    resend_candidate_email(user)
                     
                     st.session_state.active_user = user
                     
-                    st.balloons()
+                    flash(None, "balloons")
                     st.rerun()
         else:
             # Fallback for other statuses (e.g. just waiting)
@@ -2745,11 +2835,45 @@ def view_interview_room():
 # --- MAIN APP ROUTING ---
 nav_choice = sidebar_nav()
 
-if nav_choice == "Candidate Portal":
-    view_candidate_portal()
-elif nav_choice == "HR Dashboard":
-    view_hr_dashboard()
-elif nav_choice == "VP Login":
-    view_vp_dashboard()
-elif nav_choice == "Candidate Login":
-    view_interview_room()
+# st.rerun()/st.stop() raise to end the script, so time the view in a finally block
+rerun_start = time.perf_counter()
+def current_actor(view):
+    """Who is acting in this rerun, as recorded on candidate_events."""
+    if view == "HR Dashboard" and st.session_state.hr_username:
+        return f"hr:{st.session_state.hr_username}"
+    if view == "VP Login" and st.session_state.vp_username:
+        return f"vp:{st.session_state.vp_username}"
+    if view == "Candidate Login" and st.session_state.active_user:
+        return f"candidate:{st.session_state.active_user['id']}"
+    return "candidate-portal" if view == "Candidate Portal" else "anonymous"
+
+database.set_actor(current_actor(nav_choice))
+
+# Messages queued by the previous run's button handlers, just before their st.rerun()
+show_flash_messages()
+
+try:
+    if nav_choice == "Candidate Portal":
+        view_candidate_portal()
+    elif nav_choice == "HR Dashboard":
+        view_hr_dashboard()
+    elif nav_choice == "VP Login":
+        view_vp_dashboard()
+    elif nav_choice == "Candidate Login":
+        view_interview_room()
+
+    if rerun_profile:
+        rerun_profile.view = nav_choice
+        profiling.render_panel(rerun_profile, is_admin=st.session_state.hr_username == "admin")
+except database.ConflictError as e:
+    # Someone else changed the same fields since this page loaded: nothing was saved
+    st.error(f"⚠️ {e}. Your change was not saved — reload to see the latest data and try again.")
+    # Drop the rejected in-memory edits, so the index (and the logged-in candidate) match the database again
+    st.session_state.candidate_index.discard_unsaved()
+    if st.button("🔄 Reload", key="conflict_reload"):
+        st.rerun()
+finally:
+    metrics.observe("streamlit_rerun_seconds", time.perf_counter() - rerun_start, "Streamlit script rerun duration", view=nav_choice)
+    if rerun_profile:
+        rerun_profile.view = nav_choice
+        profiling.end(rerun_profile)
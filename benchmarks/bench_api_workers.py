@@ -0,0 +1,107 @@
+"""
+Requests/sec of GET /api/candidates as the number of API worker processes grows.
+
+Usage:
+    python benchmarks/bench_api_workers.py --workers 1 2 4 --candidates 500 --duration 10
+
+Each run starts `uvicorn main:app --workers N` against a scratch database
+(HIREAI_DB_FILE), logs in once, then drives the endpoint from several client
+processes using keep-alive connections. Run it on a multi-core machine; the
+client processes need spare cores too.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def seed_database(db_file, count):
+    os.environ["HIREAI_DB_FILE"] = db_file
+    import database
+    database.DB_FILE = db_file
+    database.init_db()
+    database.bulk_save_candidates([
+        {"id": f"bench-{i}", "name": f"Candidate {i}", "email": f"c{i}@example.com",
+         "role": "Backend Engineer", "status": "Screening", "score": i % 100,
+         "date": "2026-01-01", "archived": False}
+        for i in range(count)
+    ])
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/candidates")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+def login(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    body = json.dumps({"username": "admin", "password": "admin123"})
+    conn.request("POST", "/api/login", body, {"Content-Type": "application/json"})
+    return json.loads(conn.getresponse().read())["token"]
+
+def client_loop(args):
+    port, token, duration = args
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Authorization": f"Bearer {token}"}
+    done = 0
+    end = time.time() + duration
+    while time.time() < end:
+        conn.request("GET", "/api/candidates", headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status == 200:
+            done += 1
+    return done
+
+def run(workers, port, clients, duration, db_file):
+    env = dict(os.environ, HIREAI_DB_FILE=db_file, API_WORKERS=str(workers))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        wait_until_up(port)
+        token = login(port)
+        with multiprocessing.Pool(clients) as pool:
+            counts = pool.map(client_loop, [(port, token, duration)] * clients)
+        return sum(counts) / duration
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--candidates", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        seed_database(db_file, args.candidates)
+
+        baseline = None
+        print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+        for n in args.workers:
+            rps = run(n, args.port, args.clients, args.duration, db_file)
+            baseline = baseline or rps
+            print(f"{n:>8} {rps:>10.1f} {rps / baseline:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Pipeline bulk actions: N candidates + their emails, one at a time vs one batch.
+
+Usage:
+    python benchmarks/bench_bulk_actions.py --candidates 300
+
+Times moving `--candidates` candidates from 'Offer Signed' to 'Offer Sent'
+and queueing each one's offer email:
+  * one save_candidate(c, email=...) per candidate, as each button click did
+    (one transaction each, followed in the UI by a rerun, usually after time.sleep(1)),
+  * one bulk_patch_candidates() call, as the Bulk Actions panel does.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["HIREAI_DB_FILE"] = os.path.join(tempfile.mkdtemp(prefix="hireai-bulk-"), "bulk.db")
+
+import database
+
+def make_candidates(prefix, n):
+    return [{
+        'id': f"{prefix}-{i:06d}", 'name': f"Candidate {i}", 'email': f"{prefix}{i}@bench.test",
+        'role': "Backend Engineer", 'status': 'Offer Signed', 'score': i % 100,
+    } for i in range(n)]
+
+def offer_email(c):
+    return {'to': c['email'], 'subject': "Your offer letter", 'body': f"Dear {c['name']}, ..."}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=300)
+    args = parser.parse_args()
+
+    database.init_db()
+    database.bulk_save_candidates(make_candidates("single", args.candidates) + make_candidates("batch", args.candidates))
+    single = [database.get_candidate(f"single-{i:06d}") for i in range(args.candidates)]
+    batch = [database.get_candidate(f"batch-{i:06d}") for i in range(args.candidates)]
+    changes = {'status': 'Offer Sent', 'offer_sent_date': "2026-01-15"}
+
+    t0 = time.perf_counter()
+    for c in single:
+        c.update(changes)
+        database.save_candidate(c, email=offer_email(c))
+    single_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    database.bulk_patch_candidates([(c['id'], changes, offer_email(c), c.version) for c in batch])
+    batch_s = time.perf_counter() - t0
+
+    assert database.get_outbox_stats().get('pending') == 2 * args.candidates
+    print(f"{args.candidates} candidates + emails, one transaction each: {single_s * 1000:8.1f} ms "
+          f"(+ {args.candidates} reruns, most after a time.sleep(1))")
+    print(f"{args.candidates} candidates + emails, one batch:            {batch_s * 1000:8.1f} ms (+ 1 rerun)")
+
+if __name__ == "__main__":
+    main()
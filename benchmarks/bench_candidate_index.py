@@ -0,0 +1,96 @@
+"""
+Per-rerun cost of building the HR / VP views from the candidate list.
+
+Usage:
+    python benchmarks/bench_candidate_index.py --candidates 100000 --changes 10
+
+Fills a throwaway database, then times what each Streamlit rerun pays:
+  * before: get_candidates() plus the list comprehensions the views ran
+    (active, archived, pipeline, the four stage lists, VP approvals, a lookup by id),
+  * after: CandidateIndex.refresh() after `--changes` writes from other sessions,
+    plus the same views read from its buckets,
+  * after, nothing changed: refresh() finds no new revs.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["HIREAI_DB_FILE"] = os.path.join(tempfile.mkdtemp(prefix="hireai-index-"), "index.db")
+
+import database
+from candidate_index import CandidateIndex
+
+STATUSES = ['Screening', 'Aptitude Scheduled', 'Aptitude Completed', 'Interview Scheduled', 'VP Approval',
+            'Offer Sent', 'Training', 'Employee Confirmed']
+SELECTED = ['VP Approval', 'Offer Signed', 'Offer Sent', 'Offer Accepted', 'Joining Scheduled', 'Selected', 'Training', 'Training Failed']
+
+def views_by_filtering(candidates, cid):
+    all_active = [c for c in candidates if not c.get('archived')]
+    pipeline = [c for c in all_active if c.get('status') != 'Employee Confirmed']
+    return (
+        [c for c in all_active if c.get('status') == 'Employee Confirmed'], pipeline,
+        [c for c in candidates if c.get('archived')],
+        [c for c in pipeline if c['status'] == 'Screening'],
+        [c for c in pipeline if c['status'] in ['Aptitude Scheduled', 'Aptitude Completed']],
+        [c for c in pipeline if c['status'] == 'Interview Scheduled'],
+        [c for c in pipeline if c['status'] in SELECTED],
+        [c for c in candidates if c.get('status') == 'VP Approval'],
+        next((c for c in candidates if c['id'] == cid), None),
+    )
+
+def views_by_index(index, cid):
+    return (
+        index.with_status('Employee Confirmed'), index.without_status('Employee Confirmed'), index.by_archived[True],
+        index.with_status('Screening'), index.with_status('Aptitude Scheduled', 'Aptitude Completed'),
+        index.with_status('Interview Scheduled'), index.with_status(*SELECTED),
+        index.by_status.get('VP Approval', []), index.by_id.get(cid),
+    )
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=100_000)
+    parser.add_argument("--changes", type=int, default=10, help="writes by other sessions between two reruns")
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    docs = [{
+        'id': f"bench-{i:08d}", 'name': f"Candidate {i}", 'email': f"c{i}@bench.test", 'role': "Backend Engineer",
+        'status': rng.choice(STATUSES), 'score': rng.randint(0, 100), 'access_key': f"K{i:07d}",
+        'archived': rng.random() < 0.1, 'recruiter': rng.choice(["alice", "bob", None]),
+    } for i in range(args.candidates)]
+    for lo in range(0, len(docs), 10_000):
+        database.bulk_save_candidates(docs[lo:lo + 10_000])
+    print(f"{len(docs):,} candidates, {args.changes} writes between reruns, {args.reruns} reruns")
+
+    index, load_s = timed(CandidateIndex.load)
+    before = after = idle = 0.0
+    for _ in range(args.reruns):
+        cid = rng.choice(docs)['id']
+        for doc in rng.sample(docs, args.changes):
+            database.patch_candidate(doc['id'], {'status': rng.choice(STATUSES)})
+        expected, s = timed(lambda: views_by_filtering(database.get_candidates(), cid))
+        before += s
+        got, s = timed(lambda: views_by_index(index.refresh(), cid))
+        after += s
+        # (the VP queue used to include archived candidates too; the index only buckets active ones)
+        assert [len(v) for v in got[:7]] == [len(v) for v in expected[:7]] and got[-1]['id'] == cid
+        _, s = timed(lambda: views_by_index(index.refresh(), cid))
+        idle += s
+
+    print(f"initial CandidateIndex.load(): {load_s:.3f}s")
+    print(f"per rerun, load + filter:       {before / args.reruns * 1000:9.1f} ms")
+    print(f"per rerun, index refresh:       {after / args.reruns * 1000:9.1f} ms")
+    print(f"per rerun, index (no changes):  {idle / args.reruns * 1000:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
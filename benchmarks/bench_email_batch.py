@@ -0,0 +1,52 @@
+"""
+Bulk notification throughput: one API call per email vs. batched personalizations.
+
+Usage:
+    python benchmarks/bench_email_batch.py --messages 200 --latency 0.25
+
+Uses email_service.MockTransport, which sleeps `latency` seconds per API call
+to stand in for the SendGrid round trip (set it to what you measure in
+production, including TLS setup for the unpooled case). No emails are sent.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FROM_EMAIL", "bench@hireai.local")
+
+import email_service
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.25, help="simulated seconds per API call")
+    args = parser.parse_args()
+
+    messages = [(f"candidate{i}@example.com", "Aptitude Assessment Scheduled - HireAI", f"Dear Candidate {i}, ...")
+                for i in range(args.messages)]
+
+    transport = email_service.MockTransport(latency=args.latency)
+    email_service.set_transport(transport)
+
+    start = time.perf_counter()
+    for to_email, subject, body in messages:
+        email_service.send_email(to_email, subject, body)
+    single = time.perf_counter() - start
+    single_calls = transport.calls
+
+    transport = email_service.MockTransport(latency=args.latency)
+    email_service.set_transport(transport)
+
+    start = time.perf_counter()
+    results = email_service.send_batch(messages)
+    batched = time.perf_counter() - start
+    assert all(ok for ok, _ in results)
+
+    print(f"{'mode':<10} {'api calls':>10} {'seconds':>10} {'emails/s':>10}")
+    print(f"{'single':<10} {single_calls:>10} {single:>10.2f} {args.messages / single:>10.1f}")
+    print(f"{'batched':<10} {transport.calls:>10} {batched:>10.2f} {args.messages / batched:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Candidate report generation over a large table.
+
+Usage:
+    python benchmarks/bench_reports.py --candidates 200000
+
+Fills a throwaway database with `--candidates` synthetic candidates spread
+over three years, then times reports.candidate_report for a 1-year range
+(indexed range query on candidate_summary + vectorized pandas). Target: under one second
+for 200k candidates. Then times the rollup-based analytics and writes each
+export format twice (chunked, then cached).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_scratch = tempfile.mkdtemp(prefix="hireai-reports-")
+os.environ["HIREAI_DB_FILE"] = os.path.join(_scratch, "reports.db")
+os.environ["HIREAI_EXPORT_DIR"] = os.path.join(_scratch, "exports")
+
+import database
+import reports
+
+STATUSES = ['Screening', 'Aptitude Scheduled', 'Aptitude Completed', 'Interview Scheduled', 'VP Approval',
+            'Offer Sent', 'Offer Accepted', 'Joining Scheduled', 'Training', 'Employee Confirmed', 'Rejected']
+
+def make_candidate(i, first_day):
+    status = random.choice(STATUSES)
+    c = {
+        'id': f"bench-{i}", 'name': f"Candidate {i}", 'email': f"c{i}@bench.test", 'role': "Backend Engineer",
+        'status': status, 'date': (first_day + timedelta(days=random.randrange(3 * 365))).isoformat(),
+        'score': random.randrange(100), 'years_experience': random.randrange(12), 'access_key': f"K{i:07d}",
+        'resume_text': "x" * 2000,
+    }
+    if status not in ('Screening', 'Aptitude Scheduled'):
+        c['aptitude_score'] = random.randrange(100)
+        c['round2Date'], c['interview_round'] = c['date'], random.choice([1, 2])
+    if status in ('Training', 'Employee Confirmed'):
+        c['training_progress'] = {f"m{j}": random.randrange(60, 100) for j in range(4)}
+        c['training_attempts'] = {f"m{j}": random.randrange(1, 3) for j in range(4)}
+    return c
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(42)
+    first_day = date.today() - timedelta(days=3 * 365)
+    print(f"Inserting {args.candidates:,} candidates...")
+    t0 = time.perf_counter()
+    for lo in range(0, args.candidates, 10_000):
+        database.bulk_save_candidates([make_candidate(i, first_day) for i in range(lo, min(lo + 10_000, args.candidates))])
+    print(f"  saved in {time.perf_counter() - t0:.1f}s (candidates + report summary)")
+
+    end = date.today()
+    start = end - timedelta(days=365)
+    timings = []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        df = reports.candidate_report(start, end, 4)
+        timings.append(time.perf_counter() - t0)
+
+    print(f"1-year report: {len(df):,} rows, best {min(timings):.3f}s, worst {max(timings):.3f}s over {args.runs} runs")
+
+    # Analytics read status_rollups only, so this should not grow with --candidates
+    t0 = time.perf_counter()
+    analytics = reports.hiring_analytics(start, end)
+    print(f"analytics     : {len(database.get_status_rollups(start, end)):,} rollup rows, {time.perf_counter() - t0:.3f}s")
+    assert analytics["funnel"]["Candidates"].sum() > 0
+
+    # Exports: first call writes the file in chunks, the second is served from the cache
+    for fmt in reports.EXPORT_FORMATS:
+        t0 = time.perf_counter()
+        path = reports.export_report(start, end, 4, fmt)
+        cold = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        assert reports.export_report(start, end, 4, fmt) == path
+        warm = time.perf_counter() - t0
+        print(f"export {fmt:8}: {os.path.getsize(path) / 1e6:6.1f} MB, written in {cold:.2f}s, cached {warm * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
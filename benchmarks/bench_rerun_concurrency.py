@@ -0,0 +1,68 @@
+"""
+Sessions one Streamlit process (one core) can serve when button handlers sleep vs flash.
+
+Usage:
+    python benchmarks/bench_rerun_concurrency.py --threads 32 --clicks 640 --think 20
+
+Streamlit runs each session's script on its own thread. A handler that calls
+time.sleep(1) before st.rerun() keeps that thread busy for a second without
+using any CPU. This script replays `--clicks` button clicks through a pool of
+`--threads` script threads (the threads one process can keep running). Each
+click does the real work of a typical handler: it patches one candidate and
+queues its email. Then it either sleeps for `--hold` seconds (the old
+toast + time.sleep) or queues a flash message and returns (the new way).
+
+Sessions per core = clicks/s the process sustains x `--think` (the seconds a
+user spends between two clicks). Page rendering is left out, so the flash figure
+is an upper bound set by the handler work alone.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["HIREAI_DB_FILE"] = os.path.join(tempfile.mkdtemp(prefix="hireai-reruns-"), "reruns.db")
+
+import database
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32, help="script threads one process keeps running")
+    parser.add_argument("--clicks", type=int, default=640)
+    parser.add_argument("--hold", type=float, default=1.0, help="seconds the old handlers slept before st.rerun()")
+    parser.add_argument("--think", type=float, default=20.0, help="seconds between two clicks of one user")
+    parser.add_argument("--candidates", type=int, default=1000)
+    args = parser.parse_args()
+
+    database.init_db()
+    database.bulk_save_candidates([{
+        'id': f"bench-{i:06d}", 'name': f"Candidate {i}", 'email': f"c{i}@bench.test",
+        'role': "Backend Engineer", 'status': 'Screening', 'score': i % 100,
+    } for i in range(args.candidates)])
+
+    local = threading.local()
+
+    def click(i, hold):
+        cid = f"bench-{i % args.candidates:06d}"
+        database.patch_candidate(cid, {'score': i % 100}, email={'to': f"{cid}@bench.test", 'subject': "Update", 'body': "..."})
+        if hold:
+            time.sleep(hold)  # before: keep the toast on screen
+        else:
+            local.flash = [("toast", "Email queued", None)]  # after: shown by the next run
+
+    print(f"{args.threads} script threads, {args.clicks} clicks, {args.think:.0f}s between clicks per user")
+    for label, hold in (("time.sleep before rerun", args.hold), ("flash message", 0)):
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            cpu0, t0 = time.process_time(), time.perf_counter()
+            list(pool.map(lambda i: click(i, hold), range(args.clicks)))
+            wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+        rate = args.clicks / wall
+        print(f"{label:24}: {rate:8.1f} clicks/s, CPU busy {cpu / wall:4.0%} "
+              f"-> ~{rate * args.think:,.0f} sessions per core")
+
+if __name__ == "__main__":
+    main()
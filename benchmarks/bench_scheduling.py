@@ -0,0 +1,73 @@
+"""
+Interview/exam scheduling throughput.
+
+Usage:
+    python benchmarks/bench_scheduling.py --candidates 1000 --existing 5000
+
+Builds scheduling.Scheduler over `--existing` already-booked events, then
+bulk-assigns `--candidates` exams and `--candidates` interviews (spread over
+5 recruiters), runs 10k conflict checks and verifies nothing overlaps.
+Pure in-memory: no database is touched.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scheduling
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=1000)
+    parser.add_argument("--existing", type=int, default=5000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    now = time.time()
+    recruiters = [f"recruiter{i}" for i in range(5)]
+    events = []
+    for i in range(args.existing):
+        start = now + random.randrange(0, 30 * 24 * 60) * 60
+        if i % 2:
+            events.append({'candidate_id': f"old{i}", 'kind': 'interview', 'event_at': start, 'recruiter': random.choice(recruiters)})
+        else:
+            events.append({'candidate_id': f"old{i}", 'kind': 'aptitude', 'event_at': start, 'recruiter': None})
+
+    t0 = time.perf_counter()
+    sched = scheduling.Scheduler(events, exam_minutes=20)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    exams = sched.bulk_assign_exams([f"exam{i}" for i in range(args.candidates)], now)
+    exam_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    per_recruiter = args.candidates // len(recruiters)
+    interviews = {}
+    for r in recruiters:
+        interviews.update(sched.bulk_assign_interviews(r, [f"{r}-int{i}" for i in range(per_recruiter)], now))
+    interview_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(10_000):
+        sched.interview_conflicts(random.choice(recruiters), now + random.randrange(0, 30 * 24 * 60) * 60)
+    check_time = time.perf_counter() - t0
+
+    # Nothing double-booked, no exam slot over capacity
+    for cid, start in interviews.items():
+        assert not sched.interview_conflicts(cid.split("-")[0], start, cid), cid
+    for cid, start in exams.items():
+        assert sched.exam_seats_taken(start) <= sched.exam_capacity, cid
+    assert len(exams) == args.candidates and len(interviews) == per_recruiter * len(recruiters)
+
+    print(f"{'step':<36} {'ms':>10}")
+    print(f"{'build index (' + str(args.existing) + ' events)':<36} {build * 1000:>10.2f}")
+    print(f"{'bulk assign ' + str(args.candidates) + ' exams':<36} {exam_time * 1000:>10.2f}")
+    print(f"{'bulk assign ' + str(len(interviews)) + ' interviews':<36} {interview_time * 1000:>10.2f}")
+    print(f"{'10k conflict checks':<36} {check_time * 1000:>10.2f}")
+
+if __name__ == "__main__":
+    main()
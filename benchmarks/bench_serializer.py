@@ -0,0 +1,86 @@
+"""
+JSON encode/decode throughput for candidate documents.
+
+Usage:
+    python benchmarks/bench_serializer.py --candidates 100000
+
+Times every installed serializer backend (msgspec, orjson, stdlib json) on
+`--candidates` typical candidate documents: encoding each row, decoding each
+row, and encoding the whole list in one call (an API response). Then fills a
+throwaway database and times the /api/candidates paths: get_candidates() plus
+re-encoding, against get_candidates_json() splicing the stored rows, and
+the memory held by the decoded documents as dicts vs models.Candidate.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["HIREAI_DB_FILE"] = os.path.join(tempfile.mkdtemp(prefix="hireai-serializer-"), "serializer.db")
+
+import database
+import serializer
+from models import Candidate
+
+def make_candidates(n):
+    return [{
+        'id': f"bench-{i:08d}", 'name': f"Candidate {i}", 'email': f"c{i}@bench.test", 'role': "Backend Engineer",
+        'status': "Screening", 'score': i % 100, 'technical': (i * 7) % 100, 'years_experience': i % 12,
+        'summary': "Solid backend experience with Python, SQL and distributed systems. " * 8,
+        'access_key': f"K{i:07d}", 'date': "2026-01-15", 'aptitude_score': None, 'aptitudeDate': None,
+        'aptitudeTime': None, 'round2Date': None, 'round2Time': None, 'round2Link': None, 'interview_round': 1,
+        'email_status': "Sent", 'email_error': None, 'archived': False, 'recruiter': None,
+        'documents_uploaded': False, 'documents': {}, 'training_progress': {'m1': 85, 'm2': 92},
+    } for i in range(n)]
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=100_000)
+    args = parser.parse_args()
+
+    docs = make_candidates(args.candidates)
+    n = len(docs)
+    print(f"{n:,} candidates, active backend: {serializer.BACKEND}")
+
+    for name in serializer.BACKENDS:
+        try:
+            dumps_bytes, loads, _, _ = serializer._load_backend(name)
+        except ImportError:
+            print(f"{name:8}: not installed")
+            continue
+        encoded, encode_s = timed(lambda: [dumps_bytes(d) for d in docs])
+        _, decode_s = timed(lambda: [loads(b) for b in encoded])
+        body, list_s = timed(lambda: dumps_bytes(docs))
+        mb = sum(map(len, encoded)) / 1e6
+        print(f"{name:8}: encode {n / encode_s:9,.0f}/s ({mb / encode_s:6.1f} MB/s)  "
+              f"decode {n / decode_s:9,.0f}/s ({mb / decode_s:6.1f} MB/s)  whole list {list_s:.3f}s")
+
+    for lo in range(0, n, 10_000):
+        database.bulk_save_candidates(docs[lo:lo + 10_000])
+    _, decode_s = timed(lambda: serializer.dumps_bytes(database.get_candidates()))
+    body, splice_s = timed(database.get_candidates_json)
+    assert len(serializer.loads(body)) == n
+    print(f"/api/candidates: decode + re-encode {decode_s:.3f}s, spliced rows {splice_s:.3f}s ({len(body) / 1e6:.1f} MB)")
+
+    # Process cache: the same rows held as plain dicts vs slotted Candidates (typed fields parsed once)
+    rows = [serializer.dumps(d) for d in docs]
+    for label, build in (("dict", serializer.loads), ("Candidate", lambda row: Candidate(serializer.loads(row), 1))):
+        held, build_s = timed(lambda: [build(row) for row in rows])
+        del held
+        tracemalloc.start()
+        held = [build(row) for row in rows]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del held
+        print(f"cache as {label:9}: {size / n:6.0f} bytes/candidate, decoded in {build_s:.3f}s")
+
+if __name__ == "__main__":
+    main()
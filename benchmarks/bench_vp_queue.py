@@ -0,0 +1,71 @@
+"""
+VP approval queue: loading a page of pending approvals and signing offers.
+
+Usage:
+    python benchmarks/bench_vp_queue.py --candidates 100000 --pending 5000 --sign 100
+
+Fills a throwaway database with `--candidates` candidates, `--pending` of them
+in 'VP Approval', then times:
+  * the old view: get_candidates(), filter on status, sort by score, top 5,
+  * get_candidate_queue(): one indexed page of 5, and a page deep in the queue,
+  * signing `--sign` offers one patch_candidate() (one transaction) at a time,
+    against one bulk_patch_candidates() call.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["HIREAI_DB_FILE"] = os.path.join(tempfile.mkdtemp(prefix="hireai-vp-"), "vp.db")
+
+import database
+
+SIGNED = {'status': 'Offer Signed', 'offer_signed_by': 'VP', 'offer_signed_date': "2026-01-15"}
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=100_000)
+    parser.add_argument("--pending", type=int, default=5_000)
+    parser.add_argument("--sign", type=int, default=100)
+    args = parser.parse_args()
+
+    database.init_db()
+    rng = random.Random(0)
+    docs = [{
+        'id': f"bench-{i:08d}", 'name': f"Candidate {i}", 'email': f"c{i}@bench.test", 'role': "Backend Engineer",
+        'status': 'VP Approval' if i < args.pending else 'Screening', 'score': rng.randint(0, 100),
+        'summary': "Solid backend experience with Python, SQL and distributed systems. " * 8,
+    } for i in range(args.candidates)]
+    for lo in range(0, len(docs), 10_000):
+        database.bulk_save_candidates(docs[lo:lo + 10_000])
+    print(f"{len(docs):,} candidates, {args.pending:,} pending VP approval")
+
+    def old_view():
+        pending = [c for c in database.get_candidates() if c.get('status') == 'VP Approval']
+        pending.sort(key=lambda x: x.get('score', 0), reverse=True)
+        return pending[:5]
+    old, old_s = timed(old_view)
+    (page, total), page_s = timed(lambda: database.get_candidate_queue('VP Approval', limit=5))
+    _, deep_s = timed(lambda: database.get_candidate_queue('VP Approval', limit=5, offset=args.pending - 5))
+    assert total == args.pending and [c['score'] for c in page] == [c['score'] for c in old]
+    print(f"top 5, load + filter + sort: {old_s * 1000:8.1f} ms")
+    print(f"top 5, indexed queue:        {page_s * 1000:8.1f} ms (last page {deep_s * 1000:.1f} ms)")
+
+    queue, _ = database.get_candidate_queue('VP Approval', limit=2 * args.sign)
+    one_by_one, batch = queue[:args.sign], queue[args.sign:]
+    _, single_s = timed(lambda: [database.patch_candidate(c['id'], SIGNED, expected_version=c.version) for c in one_by_one])
+    _, batch_s = timed(lambda: database.bulk_patch_candidates([(c['id'], SIGNED, None, c.version) for c in batch]))
+    assert database.get_candidate_queue('VP Approval')[1] == args.pending - 2 * args.sign
+    print(f"sign {args.sign} offers one at a time: {single_s * 1000:8.1f} ms")
+    print(f"sign {args.sign} offers in one batch:  {batch_s * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Offline end-to-end load test: submission -> screening -> aptitude invite -> email.
+
+Usage:
+    python benchmarks/load_test_email_flow.py --candidates 2000
+    python benchmarks/load_test_email_flow.py --candidates 2000 --http   # through mail_sink.py over HTTP
+
+Runs against a throwaway database with EMAIL_TRANSPORT=sink (or the real
+SendGrid transport pointed at a local mail_sink.py server with --http),
+drains the outbox with the normal dispatcher and then asserts that every
+candidate received exactly the expected emails. No SendGrid account needed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["HIREAI_DB_FILE"] = os.path.join(tempfile.mkdtemp(prefix="hireai-load-"), "load.db")
+os.environ.setdefault("FROM_EMAIL", "hr@hireai.local")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=2000)
+    parser.add_argument("--http", action="store_true", help="send through a local mail_sink.py HTTP server")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    if args.http:
+        os.environ["EMAIL_TRANSPORT"] = "sendgrid"
+        os.environ["SENDGRID_API_KEY"] = "load-test"
+        os.environ["SENDGRID_URL"] = f"http://127.0.0.1:{args.port}/v3/mail/send"
+    else:
+        os.environ["EMAIL_TRANSPORT"] = "sink"
+
+    import database
+    import email_outbox
+    import email_templates
+    import mail_sink
+
+    if args.http:
+        server = mail_sink.serve(port=args.port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def queue_status_email(c):
+        # Same steps as app.resend_candidate_email
+        template, _ = email_templates.for_candidate(c)
+        context = email_templates.candidate_context(c)
+        template.validate(context)
+        database.save_candidate(c, email={
+            'to': c['email'], 'template': template.name, 'context': context,
+            'idempotency_key': email_outbox.idempotency_key(c['id'], c['status'], template, context),
+            'dedupe_window': email_outbox.DEDUPE_WINDOW_SECONDS,
+        })
+
+    start = time.perf_counter()
+
+    # 1. Submission + screening (AI score faked)
+    candidates = []
+    for i in range(args.candidates):
+        c = {
+            'id': f"load-{i}", 'name': f"Candidate {i}", 'email': f"candidate{i}@load.test",
+            'role': "Backend Engineer", 'status': 'Screening', 'score': 40 + i % 60,
+            'access_key': f"LOAD{i:06d}",
+        }
+        queue_status_email(c)
+        candidates.append(c)
+
+    # 2. Shortlisted half gets an aptitude invite
+    shortlisted = [c for c in candidates if c['score'] >= 70]
+    for c in shortlisted:
+        c['status'] = 'Aptitude Scheduled'
+        c['aptitudeDate'], c['aptitudeTime'] = "2026-01-15", "10:00"
+        queue_status_email(c)
+    queued = time.perf_counter() - start
+
+    # 3. Drain the outbox
+    while email_outbox.dispatch_once():
+        pass
+    total = time.perf_counter() - start
+
+    # 4. Assert on delivered messages
+    expected = len(candidates) + len(shortlisted)
+    delivered = database.get_sink_messages(limit=expected * 2)
+    assert len(delivered) == expected, f"expected {expected} emails, sink has {len(delivered)}"
+    by_recipient = {}
+    for m in delivered:
+        by_recipient.setdefault(m['to_email'], []).append(m['subject'])
+    for c in shortlisted:
+        assert sorted(by_recipient[c['email']]) == ["Application Received: Backend Engineer", "Aptitude Assessment Scheduled - HireAI"], c['email']
+    assert database.get_outbox_stats() == {'sent': expected}, database.get_outbox_stats()
+
+    conn = database.get_connection()
+    latencies = sorted(r[0] for r in conn.execute("SELECT sent_at - created_at FROM email_outbox"))
+    conn.close()
+    stats = database.get_sink_stats()
+
+    print(f"transport         : {'http mail_sink' if args.http else 'in-process sink'}")
+    print(f"emails delivered  : {expected} ({len(candidates)} candidates, {len(shortlisted)} invites)")
+    print(f"queue time        : {queued:.2f}s")
+    print(f"end-to-end time   : {total:.2f}s ({expected / total:,.0f} emails/s)")
+    print(f"avg batch size    : {stats['avg_batch_size']:.0f}")
+    print(f"queue->sent p50   : {latencies[len(latencies) // 2]:.3f}s")
+    print(f"queue->sent p95   : {latencies[int(len(latencies) * 0.95)]:.3f}s")
+    print("all assertions passed")
+
+if __name__ == "__main__":
+    main()
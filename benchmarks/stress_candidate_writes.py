@@ -0,0 +1,126 @@
+"""
+Concurrency stress test for candidate writes (optimistic concurrency control).
+
+Usage:
+    python benchmarks/stress_candidate_writes.py --processes 4 --sessions 8 --candidates 3 --writes 200
+
+Every simulated session (threads inside several processes, like Streamlit
+sessions across workers) keeps its own copy of a few hot candidates and,
+without reloading first:
+  * bumps a counter field only it writes (must always merge, never conflict),
+  * sometimes changes the shared `status` field (may conflict: reload + retry),
+  * sometimes patches a field with patch_candidate(expected_version=...).
+At the end every per-session counter must equal the number of increments that
+session committed, i.e. no update was lost.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["HIREAI_DB_FILE"] = os.path.join(tempfile.mkdtemp(prefix="hireai-stress-"), "stress.db")
+
+STATUSES = ['Screening', 'Aptitude Scheduled', 'Aptitude Completed', 'Interview Scheduled', 'VP Approval']
+
+def run_session(session_id, candidate_ids, writes, results):
+    import database
+
+    rng = random.Random(session_id)
+    copies = {cid: database.get_candidate(cid) for cid in candidate_ids}
+    stats = {'session': session_id, 'increments': {}, 'merges': 0, 'conflicts': 0, 'writes': 0}
+    counter = f"s{session_id}"
+
+    for _ in range(writes):
+        cid = rng.choice(candidate_ids)
+        c = copies[cid]
+        action = rng.random()
+        while True:
+            base = c.version
+            try:
+                if action < 0.7:
+                    c[counter] = c.get(counter, 0) + 1
+                    database.save_candidate(c)
+                    stats['increments'][cid] = stats['increments'].get(cid, 0) + 1
+                elif action < 0.9:
+                    c['status'] = rng.choice(STATUSES)
+                    database.save_candidate(c)
+                else:
+                    fresh = database.patch_candidate(cid, {'notice_period': rng.choice(["Immediate", "1 Month"])}, expected_version=base)
+                    c.reset(fresh, fresh.version)
+                stats['writes'] += 1
+                if c.version != base + 1:
+                    stats['merges'] += 1
+                break
+            except database.ConflictError:
+                # Someone changed the same field: reload, re-apply, retry (what the UI asks the user to do)
+                stats['conflicts'] += 1
+                c = copies[cid] = database.get_candidate(cid)
+    results.put(stats)
+
+def run_process(first_session, sessions, candidate_ids, writes, results):
+    threads = [
+        threading.Thread(target=run_session, args=(first_session + i, candidate_ids, writes, results))
+        for i in range(sessions)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=8, help="sessions (threads) per process")
+    parser.add_argument("--candidates", type=int, default=3, help="hot candidates shared by every session")
+    parser.add_argument("--writes", type=int, default=200, help="writes per session")
+    args = parser.parse_args()
+
+    import database
+    candidate_ids = [f"hot-{i}" for i in range(args.candidates)]
+    database.bulk_save_candidates([
+        {'id': cid, 'name': f"Hot {cid}", 'email': f"{cid}@stress.test", 'role': "Backend Engineer",
+         'status': 'Screening', 'date': "2026-01-01", 'aptitude_details': [{'q': "x" * 200}] * 20}
+        for cid in candidate_ids
+    ])
+
+    results = multiprocessing.Queue()
+    start = time.perf_counter()
+    procs = [
+        multiprocessing.Process(target=run_process, args=(p * args.sessions, args.sessions, candidate_ids, args.writes, results))
+        for p in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    all_stats = [results.get() for _ in range(args.processes * args.sessions)]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    # No lost updates: every session's counter equals the increments it committed
+    lost = 0
+    for cid in candidate_ids:
+        stored = database.get_candidate(cid)
+        for stats in all_stats:
+            expected = stats['increments'].get(cid, 0)
+            actual = stored.get(f"s{stats['session']}", 0)
+            if actual != expected:
+                lost += 1
+                print(f"LOST UPDATE: {cid} s{stats['session']} = {actual}, committed {expected}")
+
+    writes = sum(s['writes'] for s in all_stats)
+    merges = sum(s['merges'] for s in all_stats)
+    conflicts = sum(s['conflicts'] for s in all_stats)
+    print(f"sessions          : {len(all_stats)} ({args.processes} processes x {args.sessions} threads) on {args.candidates} candidates")
+    print(f"committed writes  : {writes} in {elapsed:.2f}s ({writes / elapsed:,.0f} writes/s)")
+    print(f"merged (stale)    : {merges} ({merges / writes:.0%})")
+    print(f"conflicts retried : {conflicts}")
+    assert lost == 0, f"{lost} lost updates"
+    print("no lost updates")
+
+if __name__ == "__main__":
+    main()
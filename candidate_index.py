@@ -0,0 +1,137 @@
+import database
+
+# More changes than this since the last refresh: reloading everything is cheaper than patching
+MAX_INCREMENTAL_CHANGES = 2000
+
+class CandidateIndex:
+    """
+    The loaded candidates plus in-memory secondary indexes, built once per data version
+    (change feed rev) instead of re-filtering the whole list in every view on every rerun.
+
+    * by_id, by_access_key: candidate lookups
+    * by_archived[True/False]: archived / active candidates
+    * by_status, by_recruiter, by_role: buckets over the *active* candidates
+
+    refresh() applies the change feed since `rev`: only candidates written since are
+    reloaded, and updated in place, so references held elsewhere (e.g. the logged-in
+    candidate) stay current.
+    """
+
+    def __init__(self):
+        self.rev = 0
+        self.by_id = {}
+        self.by_access_key = {}
+        # field -> value -> {id: candidate}: O(1) to file or unfile one candidate
+        self._buckets = {'archived': {}, 'status': {}, 'recruiter': {}, 'role': {}}
+        self._indexed_keys = {}  # id -> keys it was filed under (the object may change in memory since)
+        self._views = {}
+        self._all = None
+
+    @classmethod
+    def load(cls):
+        index = cls()
+        # Read the rev before the rows, so a write in between is re-applied rather than missed
+        index.rev = database.get_latest_change_rev()
+        for c in database.get_candidates():
+            index._add(c)
+        return index
+
+    def refresh(self):
+        """Bring the index up to the latest data version; returns the index to use (possibly rebuilt)."""
+        changes = database.get_changes_since(self.rev, MAX_INCREMENTAL_CHANGES)
+        if not changes:
+            return self
+        if len(changes) == MAX_INCREMENTAL_CHANGES or changes[0]['rev'] != self.rev + 1:
+            return CandidateIndex.load()  # too many changes, or the feed was pruned past our rev
+        self.reload({ch['candidate_id'] for ch in changes})
+        self.rev = changes[-1]['rev']
+        return self
+
+    def reload(self, candidate_ids):
+        """Re-read these candidates from the database (dropping any that were deleted)."""
+        fresh = database.get_candidates_by_id(candidate_ids)
+        for cid in candidate_ids:
+            old, new = self.by_id.get(cid), fresh.get(cid)
+            if old is not None:
+                self._remove(cid)
+                if new is not None:
+                    old.reset(new, new.version)
+                    new = old
+            if new is not None:
+                self._add(new)
+
+    def discard_unsaved(self):
+        """Reload candidates changed in memory but never saved (e.g. the save raised ConflictError)."""
+        self.reload([cid for cid, c in self.by_id.items() if c.dirty])
+
+    # --- Views (lists materialized once per data version) ---
+    def _view(self, field):
+        view = self._views.get(field)
+        if view is None:
+            view = self._views[field] = {k: list(b.values()) for k, b in self._buckets[field].items()}
+        return view
+
+    @property
+    def by_archived(self):
+        view = self._view('archived')
+        view.setdefault(False, [])
+        view.setdefault(True, [])
+        return view
+
+    @property
+    def by_status(self):
+        return self._view('status')
+
+    @property
+    def by_recruiter(self):
+        return self._view('recruiter')
+
+    @property
+    def by_role(self):
+        return self._view('role')
+
+    @property
+    def candidates(self):
+        """Every candidate (archived included)."""
+        if self._all is None:
+            self._all = list(self.by_id.values())
+        return self._all
+
+    def with_status(self, *statuses):
+        """Active candidates in any of `statuses`."""
+        by_status = self.by_status
+        return [c for s in statuses for c in by_status.get(s, ())]
+
+    def without_status(self, *statuses):
+        """Active candidates in any status except `statuses`."""
+        return [c for s, bucket in self.by_status.items() if s not in statuses for c in bucket]
+
+    # --- Maintenance ---
+    @staticmethod
+    def _keys(c):
+        return {
+            'archived': bool(c.get('archived')), 'status': c.get('status'),
+            'recruiter': c.get('recruiter'), 'role': c.get('role'), 'access_key': c.get('access_key'),
+        }
+
+    def _add(self, c):
+        cid, keys = c['id'], self._keys(c)
+        self.by_id[cid] = c
+        self._indexed_keys[cid] = keys
+        if keys['access_key']:
+            self.by_access_key[keys['access_key']] = c
+        for field in ('archived',) if keys['archived'] else self._buckets:
+            self._buckets[field].setdefault(keys[field], {})[cid] = c
+        self._views, self._all = {}, None
+
+    def _remove(self, cid):
+        c = self.by_id.pop(cid)
+        keys = self._indexed_keys.pop(cid)
+        if keys['access_key'] and self.by_access_key.get(keys['access_key']) is c:
+            del self.by_access_key[keys['access_key']]
+        for field in ('archived',) if keys['archived'] else self._buckets:
+            bucket = self._buckets[field][keys[field]]
+            del bucket[cid]
+            if not bucket:
+                del self._buckets[field][keys[field]]
+        self._views, self._all = {}, None
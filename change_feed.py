@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import database
+
+class ChangeFeed:
+    """
+    Single in-process fan-out of candidate changes.
+
+    Every write in database.py appends a row to `candidate_changes`, whichever
+    process made it (Streamlit or API). One background thread tails that table
+    and pushes each change to the asyncio queue of every connected subscriber,
+    so N open dashboards cost one indexed query per poll instead of N full
+    `/api/candidates` fetches.
+    """
+
+    def __init__(self, poll_interval=0.5, queue_size=1000, keep_last=10000):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.keep_last = keep_last
+        self.last_rev = 0
+        self._subscribers = {}  # queue -> event loop
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the tailing thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self.last_rev = database.get_latest_change_rev()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="candidate-change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def subscribe(self):
+        """Register a subscriber. Must be called from inside the running event loop."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def queue_depth(self):
+        """Total changes waiting to be sent across all subscribers."""
+        with self._lock:
+            return sum(q.qsize() for q in self._subscribers)
+
+    def _run(self):
+        polls = 0
+        while not self._stop.wait(self.poll_interval):
+            try:
+                changes = database.get_changes_since(self.last_rev)
+                for change in changes:
+                    self.last_rev = change['rev']
+                    self._publish(change)
+
+                # Trim the table now and then so it stays a bounded ring
+                polls += 1
+                if polls % 1200 == 0:
+                    database.prune_candidate_changes(self.keep_last)
+            except Exception as e:
+                print(f"[Change Feed] Poll failed: {e}")
+
+    def _publish(self, change):
+        with self._lock:
+            targets = list(self._subscribers.items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, change)
+            except RuntimeError:
+                # Loop already closed; subscriber is gone
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _offer(queue, change):
+        # Runs on the subscriber's event loop
+        try:
+            queue.put_nowait(change)
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog and tell it to do one full reload
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"op": "resync"})
@@ -2,16 +2,72 @@ import sqlite3
 import json
 import os
 import uuid
+import time
+import hashlib
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+import metrics
+import profiling
+import serializer
+from models import Candidate
 
 # Use absolute path for DB to avoid Current Working Directory issues on some hosting panels
 DB_FOLDER = os.path.dirname(os.path.abspath(__file__))
-DB_FILE = os.path.join(DB_FOLDER, "hireai.db")
+# HIREAI_DB_FILE lets benchmarks / load tests point every process at a scratch database
+DB_FILE = os.environ.get("HIREAI_DB_FILE") or os.path.join(DB_FOLDER, "hireai.db")
+
+# Seconds a connection waits for another process's write lock before failing
+BUSY_TIMEOUT = 30
+
+# Who is making changes on this thread (recorded on candidate_events). Streamlit runs each session in its own thread.
+_actor = threading.local()
+
+def get_connection():
+    """
+    Open a connection to the shared database file.
+    Safe to use from several processes (Streamlit + multiple API workers):
+    the file runs in WAL mode so readers never block the single writer,
+    and writers queue on the lock for up to BUSY_TIMEOUT seconds.
+    """
+    conn = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT)
+    # WAL makes NORMAL durable across crashes of the app (not the OS) and avoids an fsync per commit
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+@contextmanager
+def write_transaction():
+    """
+    Serialized read-modify-write across processes.
+    BEGIN IMMEDIATE takes the write lock up front, so two workers can never both
+    read the same row and then fail (or clobber each other) when upgrading to write.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    try:
+        # A failed BEGIN (e.g. lock timeout) has nothing to roll back: let its error through
+        conn.execute("BEGIN IMMEDIATE")
+    except Exception:
+        conn.close()
+        raise
+    try:
+        yield conn.cursor()
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
 
 def init_db():
     """Initialize the SQLite database with users, candidates, and jobs tables."""
     # Timeout added to prevent locking
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     c = conn.cursor()
+
+    # WAL is persistent in the file: lets API workers and Streamlit read while one process writes
+    c.execute("PRAGMA journal_mode=WAL")
     
     # Users Table
     c.execute('''
@@ -60,6 +116,275 @@ def init_db():
     except sqlite3.OperationalError:
         c.execute("ALTER TABLE jobs ADD COLUMN min_experience INTEGER")
     
+    # Optimistic concurrency: every candidate write bumps its version (Migration)
+    try:
+        c.execute("SELECT version FROM candidates LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE candidates ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+    # Candidate Change Feed - one row per write, rev is a global sequence number
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_changes (
+            rev INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_id TEXT NOT NULL,
+            status TEXT,
+            op TEXT NOT NULL DEFAULT 'upsert',
+            changed_at REAL NOT NULL
+        )
+    ''')
+
+    # Version written and top-level fields changed, so a stale writer can tell whether it overlaps (Migration)
+    try:
+        c.execute("SELECT fields FROM candidate_changes LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE candidate_changes ADD COLUMN version INTEGER")
+        c.execute("ALTER TABLE candidate_changes ADD COLUMN fields TEXT")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_changes_candidate ON candidate_changes (candidate_id, version)")
+
+    # Question Bank - every aptitude question stored once, keyed by a hash of its content.
+    # Aptitude Attempts - one row per submitted exam (question hashes + answers); the candidate
+    # document only keeps `aptitude_attempt_id`, so exam payloads are read only when reviewed.
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'aptitude_attempts'")
+    split_exams = c.fetchone() is None
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS question_bank (
+            hash TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS aptitude_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_id TEXT NOT NULL,
+            questions TEXT NOT NULL,
+            answers TEXT NOT NULL,
+            score REAL,
+            created_at REAL NOT NULL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_attempts_candidate ON aptitude_attempts (candidate_id)")
+    if split_exams:
+        # Move exams embedded in existing candidate documents out (Migration)
+        rows = c.execute(
+            "SELECT id, json_extract(data, '$.aptitude_details'), json_extract(data, '$.aptitude_score') "
+            "FROM candidates WHERE json_type(data, '$.aptitude_details') = 'object'"
+        ).fetchall()
+        for candidate_id, details, score in rows:
+            attempt_id = _store_aptitude_details(c, candidate_id, serializer.loads(details), score)
+            c.execute(
+                "UPDATE candidates SET data = json_set(json_remove(data, '$.aptitude_details'), '$.aptitude_attempt_id', ?) WHERE id = ?",
+                (attempt_id, candidate_id)
+            )
+        c.execute("UPDATE candidates SET data = json_remove(data, '$.aptitude_details') WHERE json_type(data, '$.aptitude_details') IS NOT NULL")
+
+    # Email Outbox - durable queue drained by email_outbox.py
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_id TEXT,
+            to_email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            claimed_at REAL,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            sent_at REAL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON email_outbox (status, next_attempt_at)")
+
+    # Templated messages store the template name + JSON context and are rendered by the dispatcher (Migration)
+    try:
+        c.execute("SELECT template FROM email_outbox LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE email_outbox ADD COLUMN template TEXT")
+        c.execute("ALTER TABLE email_outbox ADD COLUMN context TEXT")
+
+    # Idempotency key (candidate id : status : template@version) used to suppress duplicate sends (Migration)
+    try:
+        c.execute("SELECT idempotency_key FROM email_outbox LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE email_outbox ADD COLUMN idempotency_key TEXT")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outbox_idempotency ON email_outbox (idempotency_key, created_at)")
+
+    # Recruiter passwords used to stay in the context of sent / dead-lettered rows (cleanup)
+    c.execute("UPDATE email_outbox SET context = NULL WHERE template = 'recruiter_access' AND status IN ('sent', 'dead') AND context IS NOT NULL")
+
+    # Metrics Snapshots - latest registry dump of each process, merged by /metrics
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS metrics_snapshots (
+            process_id TEXT PRIMARY KEY,
+            role TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            data TEXT NOT NULL
+        )
+    ''')
+
+    # Profiling Traces - opt-in per-rerun timings, downloadable by admins
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS profile_traces (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            view TEXT,
+            total_seconds REAL,
+            data TEXT NOT NULL
+        )
+    ''')
+
+    # Mail Sink - messages "delivered" by the offline transports (EMAIL_TRANSPORT=sink / mail_sink.py)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS mail_sink (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transport TEXT NOT NULL,
+            to_email TEXT NOT NULL,
+            subject TEXT,
+            body TEXT,
+            batch_size INTEGER NOT NULL,
+            call_seconds REAL NOT NULL,
+            received_at REAL NOT NULL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_mail_sink_to ON mail_sink (to_email)")
+
+    # Candidate Summary - narrow copy of the report fields, kept in sync by save_candidate.
+    # Reports range-seek on application date and never parse the JSON blobs.
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'candidate_summary'")
+    backfill_summary = c.fetchone() is None
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_summary (
+            id TEXT PRIMARY KEY,
+            date TEXT,
+            name TEXT,
+            email TEXT,
+            role TEXT,
+            status TEXT,
+            score,
+            years_experience,
+            recruiter TEXT,
+            aptitude_score,
+            aptitude_date TEXT,
+            round2_date TEXT,
+            interview_round INTEGER,
+            offer_signed_date TEXT,
+            access_key TEXT,
+            training_modules INTEGER NOT NULL DEFAULT 0,
+            training_total REAL NOT NULL DEFAULT 0,
+            training_attempts INTEGER NOT NULL DEFAULT 0,
+            archived INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_summary_date ON candidate_summary (date)")
+    if backfill_summary:
+        for row in c.execute("SELECT data FROM candidates").fetchall():
+            _sync_summary(c, serializer.loads(row[0]), track=False)
+    # Archived flag, so stage queues can skip archived candidates in the index (Migration)
+    try:
+        c.execute("SELECT archived FROM candidate_summary LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE candidate_summary ADD COLUMN archived INTEGER NOT NULL DEFAULT 0")
+        c.execute("UPDATE candidate_summary SET archived = 1 WHERE id IN (SELECT id FROM candidates WHERE json_extract(data, '$.archived'))")
+    # Stage queues (e.g. VP approvals): best score first, read a page at a time
+    c.execute("CREATE INDEX IF NOT EXISTS idx_summary_queue ON candidate_summary (status, score DESC, id) WHERE archived = 0")
+
+    # Candidate Events - append-only log of status transitions (who, from -> to, when).
+    # Written with every save that changes a status; rollups and time-in-stage are derived from it.
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'candidate_events'")
+    seed_events = c.fetchone() is None
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_id TEXT NOT NULL,
+            from_status TEXT NOT NULL,
+            to_status TEXT NOT NULL,
+            actor TEXT NOT NULL,
+            at REAL NOT NULL,
+            role TEXT NOT NULL,
+            recruiter TEXT NOT NULL,
+            score REAL,
+            aptitude_score REAL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_candidate ON candidate_events (candidate_id, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_time ON candidate_events (at)")
+    if seed_events:
+        # No history yet: every existing candidate entered its current status at (local) midnight of its application date
+        c.execute('''
+            INSERT INTO candidate_events (candidate_id, from_status, to_status, actor, at, role, recruiter, score, aptitude_score)
+            SELECT id, '', COALESCE(status, ''), 'backfill', CAST(strftime('%s', date, 'utc') AS REAL),
+                   COALESCE(role, ''), COALESCE(recruiter, 'Unassigned'), score, aptitude_score
+            FROM candidate_summary WHERE strftime('%s', date, 'utc') IS NOT NULL
+            ORDER BY date
+        ''')
+
+    # Status Rollups - candidate_events summed per day / role / recruiter, updated with every event.
+    # Analytics read these instead of the candidates, so they cost the same at any table size.
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'status_rollups'")
+    seed_rollups = c.fetchone() is None
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS status_rollups (
+            day TEXT NOT NULL,
+            role TEXT NOT NULL,
+            recruiter TEXT NOT NULL,
+            from_status TEXT NOT NULL,
+            to_status TEXT NOT NULL,
+            transitions INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            score_count INTEGER NOT NULL DEFAULT 0,
+            aptitude_sum REAL NOT NULL DEFAULT 0,
+            aptitude_count INTEGER NOT NULL DEFAULT 0,
+            stage_seconds_sum REAL NOT NULL DEFAULT 0,
+            stage_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, role, recruiter, from_status, to_status)
+        )
+    ''')
+    if seed_rollups:
+        _rebuild_status_rollups(c)
+
+    # Scheduled Events - one row per booked interview/exam, kept in sync by save_candidate.
+    # event_at / next_reminder_at are indexed so "what starts soon" and "which reminder is due" are range seeks.
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scheduled_events'")
+    backfill_events = c.fetchone() is None
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS scheduled_events (
+            candidate_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            event_at REAL NOT NULL,
+            recruiter TEXT,
+            next_reminder_at REAL,
+            PRIMARY KEY (candidate_id, kind)
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_at ON scheduled_events (event_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_reminder ON scheduled_events (next_reminder_at)")
+    if backfill_events:
+        for row in c.execute("SELECT data FROM candidates").fetchall():
+            _sync_schedule(c, serializer.loads(row[0]), check=False)
+
+    # Notifications - in-app messages for HR users (recipient '*' = everyone)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            message TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            seen INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_notifications_recipient ON notifications (recipient, seen, created_at)")
+
+    # API Tokens Table (shared by all API worker processes)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS api_tokens (
+            token TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_api_tokens_expires ON api_tokens (expires_at)")
+
     # Create default admin if not exists
     c.execute('SELECT * FROM users WHERE username = ?', ('admin',))
     if not c.fetchone():
@@ -70,7 +395,7 @@ def init_db():
 
 def create_user(username, password, email=""):
     """Create a new user. Returns True if successful, False if username exists."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     c = conn.cursor()
     try:
         c.execute("INSERT INTO users (username, password, email) VALUES (?, ?, ?)", (username, password, email))
@@ -83,7 +408,7 @@ def create_user(username, password, email=""):
 
 def get_users():
     """Retrieve all users."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
     c.execute("SELECT * FROM users")
@@ -93,7 +418,7 @@ def get_users():
 
 def update_user(username, email, password):
     """Update user email and password."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("UPDATE users SET email = ?, password = ? WHERE username = ?", (email, password, username))
     conn.commit()
@@ -101,73 +426,1047 @@ def update_user(username, email, password):
 
 def delete_user(username):
     """Delete a user."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("DELETE FROM users WHERE username = ?", (username,))
     conn.commit()
     conn.close()
 
+# --- CANDIDATE FUNCTIONS ---
+# Written by the email outbox behind everyone's back; a stale copy of these never counts as a conflict
+CONFLICT_EXEMPT_FIELDS = {'email_status', 'email_error'}
+
+class ConflictError(Exception):
+    """A write based on a stale candidate changed fields that someone else changed too."""
+
+    def __init__(self, candidate_id, fields):
+        self.candidate_id = candidate_id
+        self.fields = fields
+        super().__init__(f"Candidate {candidate_id} was changed by someone else ({', '.join(fields)})")
+
+class BookingConflictError(ConflictError):
+    """A booked interview/exam slot was taken by another session between the check and the save."""
+
+    def __init__(self, candidate_id, kind, event_at):
+        _, date_key, time_key = SCHEDULED_KINDS[kind]
+        super().__init__(candidate_id, [date_key, time_key])
+        self.args = (f"The {kind} slot at {datetime.fromtimestamp(event_at):%Y-%m-%d %H:%M} was just taken by another booking",)
+
 def get_candidates():
-    """Retrieve all candidates as a list of dictionaries."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    """Retrieve all candidates (models.Candidate, usable as dictionaries)."""
+    conn = get_connection()
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
-    c.execute("SELECT data FROM candidates")
+    c.execute("SELECT data, version FROM candidates")
     rows = c.fetchall()
     conn.close()
     
     results = []
+    decode_start = time.perf_counter()
+    nbytes = 0
     for row in rows:
         try:
-            results.append(json.loads(row['data']))
+            nbytes += len(row['data'])
+            results.append(Candidate(serializer.loads(row['data']), row['version']))
         except:
             continue
+    profiling.record_deserialized(nbytes, time.perf_counter() - decode_start)
     return results
 
-def save_candidate(candidate):
-    """Insert or Update a candidate."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+def get_candidates_by_id(candidate_ids):
+    """{id: Candidate} for the given ids; ids that no longer exist are left out."""
+    candidate_ids = list(candidate_ids)
+    conn = get_connection()
     c = conn.cursor()
-    
-    # Ensure ID exists
+    results = {}
+    decode_start = time.perf_counter()
+    nbytes = 0
+    for lo in range(0, len(candidate_ids), 500):
+        chunk = candidate_ids[lo:lo + 500]
+        c.execute(f"SELECT id, data, version FROM candidates WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        for cid, data, version in c.fetchall():
+            nbytes += len(data)
+            results[cid] = Candidate(serializer.loads(data), version)
+    conn.close()
+    profiling.record_deserialized(nbytes, time.perf_counter() - decode_start)
+    return results
+
+def get_candidate_queue(status, limit=5, offset=0):
+    """
+    One page of the active candidates in `status`, best score first, and how many there
+    are in total: (candidates, total). Reads the (status, score DESC) index on
+    candidate_summary, so only the page's documents are decoded.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM candidate_summary WHERE status = ? AND archived = 0", (status,))
+    total = c.fetchone()[0]
+    c.execute(
+        "SELECT id FROM candidate_summary WHERE status = ? AND archived = 0 ORDER BY score DESC, id LIMIT ? OFFSET ?",
+        (status, limit, offset)
+    )
+    ids = [row[0] for row in c.fetchall()]
+    conn.close()
+    found = get_candidates_by_id(ids)
+    return [found[cid] for cid in ids if cid in found], total
+
+def get_candidates_json():
+    """
+    Every candidate document as one JSON array (bytes) for the API, spliced together
+    from the stored rows without decoding them. Rows from older versions that may
+    hold NaN/Infinity (not valid JSON) are re-encoded.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT data FROM candidates")
+    rows = [r[0] for r in c.fetchall()]
+    conn.close()
+    for i, data in enumerate(rows):
+        if 'NaN' in data or 'Infinity' in data:
+            rows[i] = serializer.dumps(serializer.loads(data))
+    return ("[" + ",".join(rows) + "]").encode()
+
+def get_candidate(candidate_id):
+    """One candidate (models.Candidate) or None."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT data, version FROM candidates WHERE id = ?", (candidate_id,))
+    row = c.fetchone()
+    conn.close()
+    return Candidate(serializer.loads(row[0]), row[1]) if row else None
+
+def _record_change(c, candidate_id, status, op="upsert", version=None, fields=None):
+    """Append a row to the change feed using the caller's cursor (same transaction)."""
+    c.execute(
+        "INSERT INTO candidate_changes (candidate_id, status, op, changed_at, version, fields) VALUES (?, ?, ?, ?, ?, ?)",
+        (candidate_id, status, op, time.time(), version, serializer.dumps(fields) if fields is not None else None)
+    )
+
+def _fields_changed_since(c, candidate_id, base_version, version):
+    """Top-level fields written after `base_version`, or None if that history was pruned."""
+    c.execute("SELECT fields FROM candidate_changes WHERE candidate_id = ? AND version > ?", (candidate_id, base_version))
+    rows = c.fetchall()
+    if len(rows) < version - base_version or any(r[0] is None for r in rows):
+        return None
+    return set().union(*(serializer.loads(r[0]) for r in rows))
+
+def _check_conflict(c, candidate_id, base_version, version, mine):
+    """Raise ConflictError if fields in `mine` were also changed since `base_version`."""
+    theirs = _fields_changed_since(c, candidate_id, base_version, version)
+    overlap = set(mine) - CONFLICT_EXEMPT_FIELDS
+    if theirs is not None:
+        overlap &= theirs
+    if overlap:
+        metrics.inc("candidate_write_conflicts_total", help="Candidate writes rejected because a stale copy overlapped newer changes")
+        raise ConflictError(candidate_id, sorted(overlap))
+    metrics.inc("candidate_write_merges_total", help="Stale candidate writes merged onto newer versions (no overlapping fields)")
+
+_MISSING = object()
+
+def _write_candidate(c, candidate, actor=None):
+    """
+    Compare-and-swap write of a full candidate under the caller's write lock.
+    A Candidate whose version is stale is merged field by field onto the stored
+    document (only its dirty fields win), or rejected with ConflictError if another
+    writer changed the same fields. Plain dicts (API sync, new candidates) overwrite.
+    """
     if 'id' not in candidate:
         candidate['id'] = str(uuid.uuid4())
-    
+    c.execute("SELECT version, data FROM candidates WHERE id = ?", (candidate['id'],))
+    row = c.fetchone()
+    base_version = getattr(candidate, 'version', None)
+
+    doc = candidate.to_dict() if isinstance(candidate, Candidate) else candidate
+    if row is None:
+        current, version = {}, 1
+    else:
+        version, current = row[0], serializer.loads(row[1])
+        if base_version is not None and base_version != version:
+            _check_conflict(c, candidate['id'], base_version, version, candidate.dirty)
+            doc = dict(current)
+            for key in candidate.dirty:
+                if key in candidate:
+                    doc[key] = candidate[key]
+                else:
+                    doc.pop(key, None)
+        version += 1
+    if 'aptitude_details' in doc:
+        doc = _split_aptitude_details(c, candidate['id'], doc, doc.get('aptitude_attempt_id') or current.get('aptitude_attempt_id'))
+
+    fields = sorted(k for k in set(current) | set(doc) if current.get(k, _MISSING) != doc.get(k, _MISSING))
     c.execute(
-        "INSERT OR REPLACE INTO candidates (id, data) VALUES (?, ?)", 
-        (candidate['id'], json.dumps(candidate))
+        "INSERT OR REPLACE INTO candidates (id, data, version) VALUES (?, ?, ?)",
+        (candidate['id'], serializer.dumps(doc), version)
     )
-    conn.commit()
-    conn.close()
+    _record_change(c, candidate['id'], doc.get('status'), version=version, fields=fields)
+    _sync_summary(c, doc, actor=actor)
+    _sync_schedule(c, doc)
+    if isinstance(candidate, Candidate):
+        candidate.reset(doc, version)
+
+def _queue_candidate_email(c, candidate, email):
+    """Enqueue `email` for `candidate`; email['message_id'] is the outbox id or None if deduplicated."""
+    email['message_id'] = _enqueue_email(
+        c, email['to'], email.get('subject', ''), email.get('body', ''), candidate['id'],
+        email.get('template'), email.get('context'),
+        email.get('idempotency_key'), email.get('dedupe_window', 0)
+    )
+    if email['message_id']:
+        candidate['email_status'] = "Queued"
+        candidate['email_error'] = None
+
+def save_candidate(candidate, email=None, actor=None):
+    """
+    Insert or Update a candidate.
+    If `email` ({'to', 'template', 'context'} or {'to', 'subject', 'body'}) is given
+    it is queued in the outbox in the same transaction, so a state change and its
+    notification commit together. With 'idempotency_key' and 'dedupe_window' the
+    email is skipped if the same key was queued or sent within the window;
+    email['message_id'] is set to the new outbox id, or None when skipped.
+    A status change is logged to candidate_events as `actor` (default: set_actor for this thread).
+    A candidate loaded from get_candidates() is saved with compare-and-swap (see
+    _write_candidate): raises ConflictError, and queues nothing, on overlapping edits.
+    """
+    if 'id' not in candidate:
+        candidate['id'] = str(uuid.uuid4())
+    with write_transaction() as c:
+        if email:
+            # Enqueue under the write lock, so the duplicate check sees every committed send
+            _queue_candidate_email(c, candidate, email)
+        _write_candidate(c, candidate, actor)
     return candidate
 
-def bulk_save_candidates(candidates):
-    """Save a list of candidates (e.g. from React sync)."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
-    c = conn.cursor()
-    for cand in candidates:
-        if 'id' not in cand:
-            cand['id'] = str(uuid.uuid4())
+def _patch_candidate(c, candidate_id, changes, email=None, actor=None, expected_version=None):
+    """patch_candidate under the caller's write lock."""
+    changes = dict(changes)
+    c.execute("SELECT version, json_extract(data, '$.aptitude_attempt_id') FROM candidates WHERE id = ?", (candidate_id,))
+    row = c.fetchone()
+    if row is None:
+        return None
+    if expected_version is not None and expected_version != row[0]:
+        _check_conflict(c, candidate_id, expected_version, row[0], changes)
+    if email:
+        queued = {'id': candidate_id}
+        _queue_candidate_email(c, queued, email)
+        del queued['id']
+        changes.update(queued)  # email_status / email_error when something was queued
+    if 'aptitude_details' in changes:
+        changes = _split_aptitude_details(c, candidate_id, changes, row[1])
+        if 'aptitude_details' not in changes:  # split out (not a legacy non-dict payload)
+            changes.setdefault('aptitude_attempt_id', None)
+    if changes:
+        if any('"' in key for key in changes):
+            raise ValueError("patch_candidate: field names cannot contain '\"' (not expressible as a JSON path)")
+        paths = ", ".join("?, json(?)" for _ in changes)
+        params = [v for key, value in changes.items() for v in (f'$."{key}"', serializer.dumps(value))]
         c.execute(
-            "INSERT OR REPLACE INTO candidates (id, data) VALUES (?, ?)", 
-            (cand['id'], json.dumps(cand))
+            f"UPDATE candidates SET data = json_set(data, {paths}), version = version + 1 WHERE id = ? RETURNING data, version",
+            params + [candidate_id]
         )
-    conn.commit()
-    conn.close()
+    else:
+        c.execute("SELECT data, version FROM candidates WHERE id = ?", (candidate_id,))
+    data, version = c.fetchone()
+    candidate = Candidate(serializer.loads(data), version)
+    _record_change(c, candidate_id, candidate.get('status'), version=version, fields=sorted(changes))
+    _sync_summary(c, candidate, actor=actor)
+    _sync_schedule(c, candidate)
+    return candidate
+
+def patch_candidate(candidate_id, changes, email=None, actor=None, expected_version=None):
+    """
+    Update only the given top-level fields of a candidate with json_set, instead of
+    rewriting the whole document. Two sessions patching different fields of the same
+    candidate both keep their change. `email` and `actor` work like save_candidate's.
+    With `expected_version` (the version the caller's copy was loaded at), raises
+    ConflictError if any of these fields was changed by someone else since.
+    Returns the updated candidate (models.Candidate), or None if it does not exist.
+    """
+    with write_transaction() as c:
+        return _patch_candidate(c, candidate_id, changes, email, actor, expected_version)
+
+def bulk_patch_candidates(patches, actor=None):
+    """
+    Apply several patch_candidate calls in one transaction (one lock, one commit).
+    `patches` holds (candidate_id, changes, email, expected_version) tuples; email and
+    expected_version may be None. A ConflictError on any candidate rolls back the whole
+    batch, emails included. Returns the updated candidates, None for ids that don't exist.
+    """
+    with write_transaction() as c:
+        return [
+            _patch_candidate(c, candidate_id, changes, email, actor, expected_version)
+            for candidate_id, changes, email, expected_version in patches
+        ]
+
+def bulk_save_candidates(candidates, emails=None, actor=None):
+    """
+    Save a list of candidates (e.g. from React sync) in one transaction.
+    `emails` optionally holds one email dict (or None) per candidate, and `actor`
+    is recorded on status changes, exactly like save_candidate's arguments.
+    A ConflictError on any candidate rolls back the whole batch.
+    """
+    with write_transaction() as c:
+        for cand, email in zip(candidates, emails or [None] * len(candidates)):
+            if 'id' not in cand:
+                cand['id'] = str(uuid.uuid4())
+            if email:
+                _queue_candidate_email(c, cand, email)
+            _write_candidate(c, cand, actor)
 
 def login_user(username, password):
     """Authenticate user."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT 1 FROM users WHERE username = ? AND password = ?", (username, password))
     user = c.fetchone()
     conn.close()
     return user is not None
 
+# --- APTITUDE EXAM FUNCTIONS ---
+def _question_hash(question):
+    return hashlib.sha1(json.dumps(question, sort_keys=True).encode()).hexdigest()
+
+def _store_aptitude_details(c, candidate_id, details, score=None, attempt_id=None):
+    """
+    Write an exam ({'questions', 'answers'}) to aptitude_attempts / question_bank; returns the attempt id.
+    If `attempt_id` already holds this exact exam (a client re-sending the document it
+    loaded), that attempt is reused and nothing is written.
+    """
+    questions = [{k: v for k, v in q.items() if k != 'id'} for q in details.get('questions') or []]  # 'id' is just the position in this exam
+    hashes = [_question_hash(q) for q in questions]
+    answers = serializer.dumps(details.get('answers') or {})
+    if attempt_id is not None:
+        c.execute("SELECT questions, answers FROM aptitude_attempts WHERE id = ? AND candidate_id = ?", (attempt_id, candidate_id))
+        row = c.fetchone()
+        if row and serializer.loads(row[0]) == hashes and serializer.loads(row[1]) == serializer.loads(answers):
+            return attempt_id
+    c.executemany("INSERT OR IGNORE INTO question_bank (hash, data) VALUES (?, ?)",
+                  [(h, serializer.dumps(q)) for h, q in zip(hashes, questions)])
+    c.execute(
+        "INSERT INTO aptitude_attempts (candidate_id, questions, answers, score, created_at) VALUES (?, ?, ?, ?, ?)",
+        (candidate_id, serializer.dumps(hashes), answers, _number(score), time.time())
+    )
+    return c.lastrowid
+
+def _split_aptitude_details(c, candidate_id, doc, attempt_id=None):
+    """
+    Copy of `doc` with 'aptitude_details' moved out to its own tables and replaced by
+    'aptitude_attempt_id'. `attempt_id` is the candidate's current attempt, reused when unchanged.
+    """
+    details = doc['aptitude_details']
+    if details and not isinstance(details, dict):
+        return doc  # not an exam payload: stored as is
+    doc = dict(doc)
+    del doc['aptitude_details']
+    if details:
+        doc['aptitude_attempt_id'] = _store_aptitude_details(c, candidate_id, details, doc.get('aptitude_score'), attempt_id)
+    return doc
+
+def get_aptitude_details(attempt_id):
+    """
+    The exam behind a candidate's `aptitude_attempt_id`: {'questions': [...], 'answers': {...}}
+    in the shape it was submitted (question ids renumbered 1..n), or None.
+    """
+    if attempt_id is None:
+        return None
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT questions, answers FROM aptitude_attempts WHERE id = ?", (attempt_id,))
+    row = c.fetchone()
+    if row is None:
+        conn.close()
+        return None
+    hashes = serializer.loads(row[0])
+    bank = {}
+    for lo in range(0, len(hashes), 500):
+        chunk = hashes[lo:lo + 500]
+        c.execute(f"SELECT hash, data FROM question_bank WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+        bank.update((h, serializer.loads(data)) for h, data in c.fetchall())
+    conn.close()
+    return {
+        "questions": [dict(bank[h], id=i + 1) for i, h in enumerate(hashes) if h in bank],
+        "answers": serializer.loads(row[1]),
+    }
+
+# --- SCHEDULE / REMINDER FUNCTIONS ---
+# Reminders fire at these offsets (seconds) before an event: T-24h, T-1h, T-5m
+REMINDER_OFFSETS = (24 * 60 * 60, 60 * 60, 5 * 60)
+
+# kind -> (status that books it, date field, time field)
+SCHEDULED_KINDS = {
+    'interview': ('Interview Scheduled', 'round2Date', 'round2Time'),
+    'aptitude': ('Aptitude Scheduled', 'aptitudeDate', 'aptitudeTime'),
+}
+
+def _event_time(candidate, date_key, time_key):
+    """Epoch seconds of a 'YYYY-MM-DD' + 'HH:MM' pair (local time), or None."""
+    try:
+        return datetime.strptime(f"{candidate[date_key]} {candidate[time_key]}", "%Y-%m-%d %H:%M").timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _next_reminder_at(event_at, now):
+    """Fire time of the earliest reminder still ahead of `now`, or None."""
+    for offset in REMINDER_OFFSETS:
+        if event_at - offset > now:
+            return event_at - offset
+    return None
+
+# (interview_seconds, exam_seconds, exam_capacity) enforced on new bookings; None = not checked
+BOOKING_RULES = None
+
+def set_booking_rules(interview_seconds, exam_seconds, exam_capacity):
+    """Re-check new bookings under the write lock with the same limits the UI's Scheduler uses."""
+    global BOOKING_RULES
+    BOOKING_RULES = (interview_seconds, exam_seconds, exam_capacity)
+
+def _check_booking(c, candidate_id, kind, event_at, recruiter):
+    """
+    Raise BookingConflictError if the slot is no longer free. Runs under the write
+    lock, so no other session can book in between (the pre-save check in the UI
+    reads a snapshot and only serves to suggest other slots).
+    """
+    interview_seconds, exam_seconds, exam_capacity = BOOKING_RULES
+    if kind == 'interview':
+        if not recruiter:
+            return
+        c.execute(
+            """SELECT 1 FROM scheduled_events WHERE kind = 'interview' AND recruiter = ? AND candidate_id != ?
+               AND event_at > ? AND event_at < ? LIMIT 1""",
+            (recruiter, candidate_id, event_at - interview_seconds, event_at + interview_seconds)
+        )
+        taken = c.fetchone() is not None
+    else:
+        c.execute(
+            """SELECT COUNT(*) FROM scheduled_events WHERE kind = 'aptitude' AND candidate_id != ?
+               AND event_at > ? AND event_at < ?""",
+            (candidate_id, event_at - exam_seconds, event_at + exam_seconds)
+        )
+        taken = c.fetchone()[0] >= exam_capacity
+    if taken:
+        metrics.inc("booking_conflicts_total", help="Bookings rejected because the slot was taken meanwhile", kind=kind)
+        raise BookingConflictError(candidate_id, kind, event_at)
+
+def _sync_schedule(c, candidate, check=True):
+    """
+    Mirror the candidate's booked interview/exam into scheduled_events.
+    Reminders restart only when the event time actually changes. A new or moved
+    booking in the future is checked against BOOKING_RULES first (unless `check` is False).
+    """
+    now = time.time()
+    booked = []
+    for kind, (status, date_key, time_key) in SCHEDULED_KINDS.items():
+        event_at = _event_time(candidate, date_key, time_key) if candidate.get('status') == status else None
+        if event_at is None:
+            continue
+        booked.append(kind)
+        if check and BOOKING_RULES and event_at > now:
+            c.execute("SELECT event_at, recruiter FROM scheduled_events WHERE candidate_id = ? AND kind = ?", (candidate['id'], kind))
+            if c.fetchone() != (event_at, candidate.get('recruiter')):
+                _check_booking(c, candidate['id'], kind, event_at, candidate.get('recruiter'))
+        c.execute(
+            """INSERT INTO scheduled_events (candidate_id, kind, event_at, recruiter, next_reminder_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (candidate_id, kind) DO UPDATE SET
+                   recruiter = excluded.recruiter,
+                   next_reminder_at = CASE WHEN event_at = excluded.event_at THEN next_reminder_at ELSE excluded.next_reminder_at END,
+                   event_at = excluded.event_at""",
+            (candidate['id'], kind, event_at, candidate.get('recruiter'), _next_reminder_at(event_at, now))
+        )
+    placeholders = ','.join('?' * len(booked))
+    c.execute(
+        f"DELETE FROM scheduled_events WHERE candidate_id = ? AND kind NOT IN ({placeholders})",
+        [candidate['id']] + booked
+    )
+
+def get_upcoming_events(start, end, kind=None):
+    """Events with start <= event_at < end (index range scan), with the candidate's name and email."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    sql = """SELECT e.candidate_id, e.kind, e.event_at, e.recruiter,
+                    json_extract(cand.data, '$.name') AS name, json_extract(cand.data, '$.email') AS email
+             FROM scheduled_events e JOIN candidates cand ON cand.id = e.candidate_id
+             WHERE e.event_at >= ? AND e.event_at < ?"""
+    params = [start, end]
+    if kind:
+        sql += " AND e.kind = ?"
+        params.append(kind)
+    c.execute(sql + " ORDER BY e.event_at", params)
+    rows = c.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def get_next_reminder_at():
+    """Fire time of the next pending reminder (MIN over the index), or None."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT MIN(next_reminder_at) FROM scheduled_events")
+    row = c.fetchone()
+    conn.close()
+    return row[0]
+
+def claim_due_reminders(now, limit=100):
+    """
+    Atomically take every reminder due at `now` and advance each event to its
+    next offset. If several offsets are overdue (e.g. the process was down)
+    only the closest one is sent, so a stale "in 24 hours" never goes out.
+    Returns one dict per reminder with the event, the offset that fired and
+    the candidate's data.
+    """
+    with write_transaction() as c:
+        c.execute(
+            """SELECT e.candidate_id, e.kind, e.event_at, e.recruiter, cand.data
+               FROM scheduled_events e JOIN candidates cand ON cand.id = e.candidate_id
+               WHERE e.next_reminder_at <= ? ORDER BY e.next_reminder_at LIMIT ?""",
+            (now, limit)
+        )
+        due = []
+        for candidate_id, kind, event_at, recruiter, data in c.fetchall():
+            c.execute(
+                "UPDATE scheduled_events SET next_reminder_at = ? WHERE candidate_id = ? AND kind = ?",
+                (_next_reminder_at(event_at, now), candidate_id, kind)
+            )
+            if event_at <= now:
+                continue
+            offset = min(o for o in REMINDER_OFFSETS if event_at - o <= now)
+            due.append({
+                'candidate_id': candidate_id, 'kind': kind, 'event_at': event_at, 'recruiter': recruiter,
+                'offset': offset, 'candidate': serializer.loads(data),
+            })
+        return due
+
+def add_notifications(notifications):
+    """Insert in-app notifications [(recipient, message), ...] ('*' = every HR user)."""
+    now = time.time()
+    with write_transaction() as c:
+        c.executemany(
+            "INSERT INTO notifications (recipient, message, created_at) VALUES (?, ?, ?)",
+            [(recipient, message, now) for recipient, message in notifications]
+        )
+
+def get_notifications(username, since, limit=20):
+    """Unseen notifications for `username` (and broadcasts) created after `since`."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute(
+        """SELECT * FROM notifications
+           WHERE recipient IN (?, '*') AND seen = 0 AND created_at >= ?
+           ORDER BY created_at DESC LIMIT ?""",
+        (username, since, limit)
+    )
+    rows = c.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def mark_notifications_seen(ids):
+    """Dismiss notifications by id."""
+    if not ids:
+        return
+    placeholders = ','.join('?' * len(ids))
+    conn = get_connection()
+    conn.execute(f"UPDATE notifications SET seen = 1 WHERE id IN ({placeholders})", list(ids))
+    conn.commit()
+    conn.close()
+
+# --- REPORT FUNCTIONS ---
+SUMMARY_COLUMNS = [
+    'id', 'date', 'name', 'email', 'role', 'status', 'score', 'years_experience', 'recruiter',
+    'aptitude_score', 'aptitude_date', 'round2_date', 'interview_round', 'offer_signed_date', 'access_key',
+    'training_modules', 'training_total', 'training_attempts', 'archived',
+]
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+def _sync_summary(c, candidate, track=True, actor=None):
+    """
+    Mirror the candidate's report fields into candidate_summary (same transaction as the save).
+    When the status differs from the candidate's last event, the transition is appended to
+    candidate_events and added to status_rollups (unless `track` is False, for backfills).
+    """
+    status = candidate.get('status') or ''
+    if track:
+        c.execute("SELECT to_status, at FROM candidate_events WHERE candidate_id = ? ORDER BY id DESC LIMIT 1", (candidate['id'],))
+        last = c.fetchone()
+        if last is None or last[0] != status:
+            _record_transition(c, candidate, last, actor or get_actor())
+
+    progress = candidate.get('training_progress') or {}
+    attempts = candidate.get('training_attempts') or {}
+    c.execute(
+        f"INSERT OR REPLACE INTO candidate_summary ({', '.join(SUMMARY_COLUMNS)}) VALUES ({', '.join('?' * len(SUMMARY_COLUMNS))})",
+        (
+            candidate['id'], candidate.get('date'), candidate.get('name'), candidate.get('email'),
+            candidate.get('role'), candidate.get('status'), candidate.get('score'), candidate.get('years_experience'),
+            candidate.get('recruiter'), candidate.get('aptitude_score'), candidate.get('aptitudeDate'),
+            candidate.get('round2Date'), candidate.get('interview_round'), candidate.get('offer_signed_date'),
+            candidate.get('access_key'), len(progress), sum(progress.values()), sum(attempts.values()),
+            bool(candidate.get('archived')),
+        )
+    )
+
+def _record_transition(c, candidate, last, actor):
+    """Append the status change to candidate_events and add it to today's rollup row."""
+    now = time.time()
+    from_status, stage_seconds = (last[0], now - last[1]) if last else ('', None)
+    role, recruiter = candidate.get('role') or '', candidate.get('recruiter') or 'Unassigned'
+    score = _number(candidate.get('score'))
+    aptitude = _number(candidate.get('aptitude_score'))
+    c.execute(
+        "INSERT INTO candidate_events (candidate_id, from_status, to_status, actor, at, role, recruiter, score, aptitude_score) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (candidate['id'], from_status, candidate.get('status') or '', actor, now, role, recruiter, score, aptitude)
+    )
+    c.execute(
+        '''INSERT INTO status_rollups (day, role, recruiter, from_status, to_status, transitions,
+                                       score_sum, score_count, aptitude_sum, aptitude_count, stage_seconds_sum, stage_count)
+           VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT (day, role, recruiter, from_status, to_status) DO UPDATE SET
+               transitions = transitions + 1,
+               score_sum = score_sum + excluded.score_sum, score_count = score_count + excluded.score_count,
+               aptitude_sum = aptitude_sum + excluded.aptitude_sum, aptitude_count = aptitude_count + excluded.aptitude_count,
+               stage_seconds_sum = stage_seconds_sum + excluded.stage_seconds_sum, stage_count = stage_count + excluded.stage_count''',
+        (
+            datetime.fromtimestamp(now).strftime("%Y-%m-%d"), role, recruiter, from_status, candidate.get('status') or '',
+            score or 0, score is not None, aptitude or 0, aptitude is not None,
+            stage_seconds or 0, stage_seconds is not None,
+        )
+    )
+
+def _rebuild_status_rollups(c):
+    """Recompute status_rollups from candidate_events (time in stage = gap to the candidate's previous event)."""
+    c.execute("DELETE FROM status_rollups")
+    c.execute('''
+        INSERT INTO status_rollups (day, role, recruiter, from_status, to_status, transitions, score_sum, score_count,
+                                    aptitude_sum, aptitude_count, stage_seconds_sum, stage_count)
+        SELECT date(at, 'unixepoch', 'localtime'), role, recruiter, from_status, to_status, COUNT(*),
+               TOTAL(score), COUNT(score), TOTAL(aptitude_score), COUNT(aptitude_score), TOTAL(stage_seconds), COUNT(stage_seconds)
+        FROM (SELECT *, at - LAG(at) OVER (PARTITION BY candidate_id ORDER BY id) AS stage_seconds FROM candidate_events)
+        GROUP BY 1, 2, 3, 4, 5
+    ''')
+
+# Report column -> SQL expression over candidate_summary, with the report's display defaults
+REPORT_COLUMNS = {
+    'id': "id",
+    'name': "name",
+    'email': "email",
+    'role': "role",
+    'status': "status",
+    'date': "date",
+    'score': "COALESCE(score, 0)",
+    'years_experience': "COALESCE(years_experience, 0)",
+    'recruiter': "COALESCE(recruiter, 'Unassigned')",
+    'aptitude_score': "COALESCE(aptitude_score, 'N/A')",
+    'aptitude_date': "COALESCE(aptitude_date, 'N/A')",
+    'round2_date': "COALESCE(round2_date, 'N/A')",
+    'interview_round': "COALESCE(interview_round, 0)",
+    'offer_signed_date': "COALESCE(offer_signed_date, 'N/A')",
+    'access_key': "access_key",
+    'training_modules': "training_modules",
+    'training_total': "training_total",
+    'training_attempts': "training_attempts",
+}
+
+def _report_query():
+    select = ", ".join(REPORT_COLUMNS.values())
+    return f"SELECT {select} FROM candidate_summary WHERE date BETWEEN ? AND ? ORDER BY date"
+
+def get_report_rows(start_date, end_date):
+    """
+    Flat report rows for candidates whose application date ('YYYY-MM-DD') is in
+    [start_date, end_date], via a range seek on idx_summary_date.
+    Returns (column names, list of row tuples) ready for pandas.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(_report_query(), (str(start_date), str(end_date)))
+    rows = c.fetchall()
+    conn.close()
+    return list(REPORT_COLUMNS), rows
+
+def iter_report_rows(start_date, end_date, chunk_rows=10000):
+    """Same rows as get_report_rows, yielded in lists of at most `chunk_rows` from one open cursor."""
+    conn = get_connection()
+    try:
+        c = conn.cursor()
+        c.execute(_report_query(), (str(start_date), str(end_date)))
+        while True:
+            rows = c.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+# --- EVENT LOG FUNCTIONS ---
+def set_actor(actor):
+    """Name recorded on candidate_events for status changes made by this thread (e.g. the logged-in user)."""
+    _actor.name = actor
+
+def get_actor():
+    return getattr(_actor, 'name', None) or "system"
+
+def get_candidate_events(candidate_id):
+    """Status history of one candidate, oldest first (audit trail)."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute(
+        "SELECT id, from_status, to_status, actor, at FROM candidate_events WHERE candidate_id = ? ORDER BY id",
+        (candidate_id,)
+    )
+    rows = [dict(r) for r in c.fetchall()]
+    conn.close()
+    return rows
+
+def get_events_since(event_id, limit=500):
+    """Status transitions with id > `event_id`, oldest first (incremental sync for consumers of the log)."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute(
+        "SELECT id, candidate_id, from_status, to_status, actor, at FROM candidate_events WHERE id > ? ORDER BY id LIMIT ?",
+        (event_id, limit)
+    )
+    rows = [dict(r) for r in c.fetchall()]
+    conn.close()
+    return rows
+
+def get_events_between(start_ts, end_ts, limit=10000):
+    """Status transitions with start_ts <= at < end_ts (epoch seconds), oldest first."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute(
+        "SELECT id, candidate_id, from_status, to_status, actor, at FROM candidate_events WHERE at >= ? AND at < ? ORDER BY at LIMIT ?",
+        (start_ts, end_ts, limit)
+    )
+    rows = [dict(r) for r in c.fetchall()]
+    conn.close()
+    return rows
+
+def rebuild_status_rollups():
+    """Recompute every analytics rollup from the event log (e.g. after changing how rollups are derived)."""
+    with write_transaction() as c:
+        _rebuild_status_rollups(c)
+
+# --- ANALYTICS FUNCTIONS ---
+def get_status_rollups(start_date, end_date, role=None, recruiter=None):
+    """
+    status_rollups rows for days in [start_date, end_date] ('YYYY-MM-DD'), optionally
+    for one role / recruiter. Row count depends on days x roles x recruiters, not candidates.
+    """
+    query = "SELECT * FROM status_rollups WHERE day BETWEEN ? AND ?"
+    params = [str(start_date), str(end_date)]
+    if role:
+        query += " AND role = ?"
+        params.append(role)
+    if recruiter:
+        query += " AND recruiter = ?"
+        params.append(recruiter)
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute(query, params)
+    rows = [dict(r) for r in c.fetchall()]
+    conn.close()
+    return rows
+
+def get_rollup_dimensions():
+    """Distinct roles and recruiters seen in status_rollups (for analytics filters)."""
+    conn = get_connection()
+    c = conn.cursor()
+    roles = [r[0] for r in c.execute("SELECT DISTINCT role FROM status_rollups WHERE role != '' ORDER BY role")]
+    recruiters = [r[0] for r in c.execute("SELECT DISTINCT recruiter FROM status_rollups ORDER BY recruiter")]
+    conn.close()
+    return roles, recruiters
+
+# --- CHANGE FEED FUNCTIONS ---
+def get_changes_since(rev, limit=500):
+    """
+    Return change feed rows with rev > `rev`, oldest first. `fields` is the list
+    of top-level fields the write touched, or None when unknown (whole document).
+    """
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute(
+        "SELECT rev, candidate_id, status, op, changed_at, fields FROM candidate_changes WHERE rev > ? ORDER BY rev LIMIT ?",
+        (rev, limit)
+    )
+    rows = c.fetchall()
+    conn.close()
+    changes = [dict(row) for row in rows]
+    for change in changes:
+        if change['fields'] is not None:
+            change['fields'] = serializer.loads(change['fields'])
+    return changes
+
+def get_latest_change_rev():
+    """Return the newest change feed rev (0 if nothing has been written yet)."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT MAX(rev) FROM candidate_changes")
+    row = c.fetchone()
+    conn.close()
+    return row[0] or 0
+
+def prune_candidate_changes(keep_last=10000):
+    """Trim the change feed so it only holds the newest `keep_last` rows."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "DELETE FROM candidate_changes WHERE rev <= (SELECT MAX(rev) FROM candidate_changes) - ?",
+        (keep_last,)
+    )
+    conn.commit()
+    conn.close()
+
+# --- API TOKEN FUNCTIONS ---
+def save_token(token, username, expires_at):
+    """Persist an API token with its expiry (unix timestamp)."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "INSERT OR REPLACE INTO api_tokens (token, username, expires_at) VALUES (?, ?, ?)",
+        (token, username, expires_at)
+    )
+    conn.commit()
+    conn.close()
+
+def get_token(token):
+    """Look up a single API token by primary key. Returns a dict or None."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("SELECT token, username, expires_at FROM api_tokens WHERE token = ?", (token,))
+    row = c.fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def delete_token(token):
+    """Revoke an API token."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("DELETE FROM api_tokens WHERE token = ?", (token,))
+    conn.commit()
+    conn.close()
+
+def purge_expired_tokens(now):
+    """Delete all tokens that expired before `now`. Returns the number removed."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("DELETE FROM api_tokens WHERE expires_at <= ?", (now,))
+    removed = c.rowcount
+    conn.commit()
+    conn.close()
+    return removed
+
+# --- EMAIL OUTBOX FUNCTIONS ---
+def _enqueue_email(c, to_email, subject, body, candidate_id=None, template=None, context=None,
+                   idempotency_key=None, dedupe_window=0):
+    """
+    Insert one outbox row and return its id. Returns None (nothing inserted) when
+    a message with the same idempotency key was created within `dedupe_window`
+    seconds and has not been dead-lettered. The check is part of the INSERT, so
+    it is atomic and uses idx_outbox_idempotency.
+    """
+    now = time.time()
+    c.execute(
+        """INSERT INTO email_outbox (candidate_id, to_email, subject, body, template, context, idempotency_key, status, next_attempt_at, created_at)
+           SELECT ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?
+           WHERE ? IS NULL OR NOT EXISTS (
+               SELECT 1 FROM email_outbox
+               WHERE idempotency_key = ? AND created_at > ? AND status != 'dead'
+           )""",
+        (candidate_id, to_email, subject, body, template,
+         serializer.dumps(context) if context is not None else None, idempotency_key, now, now,
+         idempotency_key if dedupe_window > 0 else None, idempotency_key, now - dedupe_window)
+    )
+    return c.lastrowid if c.rowcount else None
+
+def enqueue_email(to_email, subject='', body='', candidate_id=None, template=None, context=None,
+                  idempotency_key=None, dedupe_window=0):
+    """
+    Queue an email that is not tied to a candidate state change (e.g. recruiter credentials).
+    Pass either subject/body or a template name and its context.
+    Returns the outbox id, or None if suppressed as a duplicate.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    message_id = _enqueue_email(c, to_email, subject, body, candidate_id, template, context,
+                                idempotency_key, dedupe_window)
+    conn.commit()
+    conn.close()
+    return message_id
+
+def claim_outbox_batch(limit=20, stale_after=300):
+    """
+    Atomically claim up to `limit` due messages for sending.
+    Rows stuck in 'sending' for `stale_after` seconds (dispatcher died) are reclaimed.
+    """
+    now = time.time()
+    with write_transaction() as c:
+        c.execute(
+            """SELECT id FROM email_outbox
+               WHERE (status = 'pending' AND next_attempt_at <= ?)
+                  OR (status = 'sending' AND claimed_at <= ?)
+               ORDER BY next_attempt_at LIMIT ?""",
+            (now, now - stale_after, limit)
+        )
+        ids = [row[0] for row in c.fetchall()]
+        if not ids:
+            return []
+        placeholders = ','.join('?' * len(ids))
+        c.execute(f"UPDATE email_outbox SET status = 'sending', claimed_at = ? WHERE id IN ({placeholders})", [now] + ids)
+        c.execute(
+            f"SELECT id, candidate_id, to_email, subject, body, template, context, attempts FROM email_outbox WHERE id IN ({placeholders}) ORDER BY id",
+            ids
+        )
+        cols = [d[0] for d in c.description]
+        return [dict(zip(cols, row)) for row in c.fetchall()]
+
+def complete_outbox_messages(results):
+    """
+    Record send results for a batch in one transaction. Each result is a dict with
+    id, candidate_id, outcome ('sent' / 'retry' / 'dead'), error, next_attempt_at
+    and secret. A secret message (its context holds a password or access key)
+    has its context cleared once it is sent or dead-lettered.
+    The candidate's email_status/email_error are updated in place with json_set so
+    concurrent edits to other fields are not overwritten.
+    """
+    now = time.time()
+    with write_transaction() as c:
+        for r in results:
+            if r['outcome'] == 'sent':
+                c.execute("UPDATE email_outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, last_error = NULL WHERE id = ?", (now, r['id']))
+            elif r['outcome'] == 'retry':
+                c.execute("UPDATE email_outbox SET status = 'pending', attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?", (r['next_attempt_at'], r['error'], r['id']))
+            else:
+                c.execute("UPDATE email_outbox SET status = 'dead', attempts = attempts + 1, last_error = ? WHERE id = ?", (r['error'], r['id']))
+            if r.get('secret') and r['outcome'] in ('sent', 'dead'):
+                c.execute("UPDATE email_outbox SET context = NULL WHERE id = ?", (r['id'],))
+
+            if r['candidate_id'] and r['outcome'] in ('sent', 'dead'):
+                email_status = "Sent" if r['outcome'] == 'sent' else "Failed"
+                c.execute(
+                    """UPDATE candidates SET data = json_set(data, '$.email_status', ?, '$.email_error', ?), version = version + 1
+                       WHERE id = ? RETURNING json_extract(data, '$.status'), version""",
+                    (email_status, r['error'] if r['outcome'] == 'dead' else None, r['candidate_id'])
+                )
+                row = c.fetchone()
+                if row:
+                    _record_change(c, r['candidate_id'], row[0], version=row[1], fields=['email_error', 'email_status'])
+
+def get_outbox_stats():
+    """Message counts per outbox status."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status")
+    rows = c.fetchall()
+    conn.close()
+    return {status: count for status, count in rows}
+
+def get_dead_letters(limit=100):
+    """Most recent messages that exhausted their retries."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("SELECT * FROM email_outbox WHERE status = 'dead' ORDER BY id DESC LIMIT ?", (limit,))
+    rows = c.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+# --- MAIL SINK FUNCTIONS ---
+def record_sink_messages(transport, messages, call_seconds=0.0):
+    """Store one delivered batch [(to, subject, body), ...] in the mail sink."""
+    now = time.time()
+    with write_transaction() as c:
+        c.executemany(
+            "INSERT INTO mail_sink (transport, to_email, subject, body, batch_size, call_seconds, received_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(transport, to, subject, body, len(messages), call_seconds, now) for to, subject, body in messages]
+        )
+
+def get_sink_messages(to_email=None, limit=1000):
+    """Most recent sink messages, optionally for one recipient."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    if to_email:
+        c.execute("SELECT * FROM mail_sink WHERE to_email = ? ORDER BY id DESC LIMIT ?", (to_email, limit))
+    else:
+        c.execute("SELECT * FROM mail_sink ORDER BY id DESC LIMIT ?", (limit,))
+    rows = c.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def get_sink_stats():
+    """Message count and delivery timing recorded by the mail sink."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*), MIN(received_at), MAX(received_at), AVG(batch_size), AVG(call_seconds) FROM mail_sink")
+    messages, first, last, avg_batch, avg_call = c.fetchone()
+    conn.close()
+    return {'messages': messages, 'first_at': first, 'last_at': last, 'avg_batch_size': avg_batch, 'avg_call_seconds': avg_call}
+
+def clear_mail_sink():
+    """Delete every sink message (start of a load test)."""
+    conn = get_connection()
+    conn.execute("DELETE FROM mail_sink")
+    conn.commit()
+    conn.close()
+
+# --- METRICS SNAPSHOT FUNCTIONS ---
+def save_metrics_snapshot(process_id, role, data):
+    """Store the latest metrics snapshot (JSON text) for one process."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "INSERT OR REPLACE INTO metrics_snapshots (process_id, role, updated_at, data) VALUES (?, ?, ?, ?)",
+        (process_id, role, time.time(), data)
+    )
+    conn.commit()
+    conn.close()
+
+def get_metrics_snapshots(since):
+    """Return snapshots written after `since`, dropping older (dead process) rows."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("DELETE FROM metrics_snapshots WHERE updated_at < ?", (since,))
+    conn.commit()
+    c.execute("SELECT process_id, role, updated_at, data FROM metrics_snapshots")
+    rows = c.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+# --- PROFILING TRACE FUNCTIONS ---
+def save_profile_trace(view, total_seconds, data, keep_last=5000):
+    """Append one rerun trace (JSON text) and trim the log to the newest `keep_last`."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "INSERT INTO profile_traces (created_at, view, total_seconds, data) VALUES (?, ?, ?, ?)",
+        (time.time(), view, total_seconds, data)
+    )
+    c.execute("DELETE FROM profile_traces WHERE id <= ?", (c.lastrowid - keep_last,))
+    conn.commit()
+    conn.close()
+
+def get_profile_traces(limit=5000):
+    """Return the newest traces, oldest first."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("SELECT * FROM (SELECT * FROM profile_traces ORDER BY id DESC LIMIT ?) ORDER BY id", (limit,))
+    rows = c.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
 # --- JOB MANAGEMENT FUNCTIONS ---
 def get_jobs():
     """Retrieve all job descriptions."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
     c.execute("SELECT * FROM jobs ORDER BY created_at DESC")
@@ -177,7 +1476,7 @@ def get_jobs():
 
 def save_job(title, description, skills=None, min_experience=0):
     """Create a new job posting with skills and experience."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     c = conn.cursor()
     job_id = str(uuid.uuid4())
     
@@ -194,7 +1493,7 @@ def save_job(title, description, skills=None, min_experience=0):
 
 def update_job(job_id, title, description, skills=None, min_experience=0):
     """Update an existing job posting."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     c = conn.cursor()
     
     # Convert list of skills to comma-separated string if needed
@@ -210,7 +1509,7 @@ def update_job(job_id, title, description, skills=None, min_experience=0):
 
 def delete_job(job_id):
     """Delete a job posting."""
-    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
     conn.commit()
@@ -220,14 +1519,40 @@ def bulk_delete_candidates(candidate_ids):
     """Delete multiple candidates by ID."""
     if not candidate_ids:
         return
-    conn = sqlite3.connect(DB_FILE, timeout=30)
-    c = conn.cursor()
     # Create placeholders for the list
     placeholders = ','.join('?' * len(candidate_ids))
     sql = f"DELETE FROM candidates WHERE id IN ({placeholders})"
-    c.execute(sql, candidate_ids)
-    conn.commit()
-    conn.close()
+    with write_transaction() as c:
+        c.execute(sql, candidate_ids)
+        c.execute(f"DELETE FROM scheduled_events WHERE candidate_id IN ({placeholders})", candidate_ids)
+        c.execute(f"DELETE FROM candidate_summary WHERE id IN ({placeholders})", candidate_ids)
+        c.execute(f"DELETE FROM aptitude_attempts WHERE candidate_id IN ({placeholders})", candidate_ids)
+        for cid in candidate_ids:
+            _record_change(c, cid, None, op="delete")
+
+# Latency histogram (db_call_seconds{function=...}) for every public query function.
+# Classes, connection helpers, generators, the actor setter and the metrics snapshot store itself are left unwrapped.
+_UNINSTRUMENTED = {'get_connection', 'write_transaction', 'iter_report_rows', 'set_actor', 'get_actor', 'set_booking_rules', 'save_metrics_snapshot', 'get_metrics_snapshots', 'save_profile_trace', 'get_profile_traces'}
+def _instrument(fn):
+    name = fn.__name__
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe("db_call_seconds", elapsed, "Latency of database.* functions", function=name)
+            profiling.record_db_call(name, elapsed)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = fn.__doc__
+    wrapper.__wrapped__ = fn
+    return wrapper
+
+for _name, _fn in list(globals().items()):
+    if callable(_fn) and not isinstance(_fn, type) and getattr(_fn, '__module__', None) == __name__ and not _name.startswith('_') and _name not in _UNINSTRUMENTED:
+        globals()[_name] = _instrument(_fn)
 
 # Init DB when imported to ensure file exists immediately
 init_db()
\ No newline at end of file
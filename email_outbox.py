@@ -0,0 +1,156 @@
+import os
+import json
+import sqlite3
+import hashlib
+import time
+import threading
+import database
+import email_service
+import email_templates
+import metrics
+
+# Retry policy: 30s, 60s, 120s, ... capped at 1h; dead-lettered after MAX_ATTEMPTS
+MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", 5))
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 60 * 60
+POLL_INTERVAL = 2
+
+# Attempts at recording a batch's results before giving up (the rows are then reclaimed later)
+COMPLETE_RETRIES = 3
+
+# Messages claimed (and sent in one API call) per dispatch
+BATCH_SIZE = 200
+
+# The same candidate/status/template email is not queued twice within this window (unless forced)
+DEDUPE_WINDOW_SECONDS = int(os.environ.get("EMAIL_DEDUPE_WINDOW_SECONDS", 15 * 60))
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+_wake = threading.Event()
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number `attempts` (1-based)."""
+    return min(BASE_BACKOFF_SECONDS * (2 ** (attempts - 1)), MAX_BACKOFF_SECONDS)
+
+def is_retryable(message):
+    """Missing credentials or a broken template will not fix themselves, so they are not retried."""
+    return not message.startswith(("Mock Mode", "Template Error"))
+
+def idempotency_key(candidate_id, status, template, context):
+    """
+    Key shared by every identical send of one status email, e.g.
+    'abc123:Offer Sent:offer_sent@1:9f2c41d07a3e'. The trailing context digest
+    lets a real change (a rescheduled interview) through while repeats are dropped.
+    """
+    digest = hashlib.sha1(json.dumps(context, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+    return f"{candidate_id}:{status}:{template.key}:{digest}"
+
+def dispatch_once(limit=BATCH_SIZE):
+    """Claim and send one batch of due messages. Returns how many were processed."""
+    batch = database.claim_outbox_batch(limit)
+    if not batch:
+        return 0
+
+    for msg in batch:
+        template = email_templates.TEMPLATES.get(msg['template'])
+        msg['secret'] = bool(template and template.secret)
+
+    try:
+        results = _render_and_send(batch)
+    except Exception as e:
+        # e.g. bad email config: the claimed rows are retried with backoff (and dead-lettered
+        # at MAX_ATTEMPTS) instead of sitting in 'sending' until they are reclaimed
+        print(f"[Email Outbox] Sending a batch of {len(batch)} failed: {e}")
+        results = {msg['id']: (False, f"Dispatch Error: {e}") for msg in batch}
+
+    completed = []
+    now = time.time()
+    for msg in batch:
+        sent, result = results[msg['id']]
+        attempts = msg['attempts'] + 1
+        if sent:
+            outcome = 'sent'
+        elif is_retryable(result) and attempts < MAX_ATTEMPTS:
+            outcome = 'retry'
+        else:
+            outcome = 'dead'
+            print(f"[Email Outbox] Dead-lettered message {msg['id']} to {msg['to_email']}: {result}")
+        completed.append({
+            'id': msg['id'],
+            'candidate_id': msg['candidate_id'],
+            'outcome': outcome,
+            'error': None if sent else result,
+            'next_attempt_at': now + backoff_delay(attempts),
+            'secret': msg['secret'],
+        })
+        metrics.inc("outbox_messages_total", help="Outbox messages processed, by result", result=outcome)
+
+    # The emails are out: a locked database must not leave them in 'sending' to be sent again
+    for retry in range(COMPLETE_RETRIES):
+        try:
+            database.complete_outbox_messages(completed)
+            break
+        except sqlite3.OperationalError as e:
+            if retry == COMPLETE_RETRIES - 1:
+                raise
+            print(f"[Email Outbox] Recording send results failed ({e}), retrying")
+            time.sleep(backoff_delay(retry + 1) / BASE_BACKOFF_SECONDS)
+    return len(batch)
+
+def _render_and_send(batch):
+    """Renders and sends the claimed messages. Returns {id: (sent, result)}."""
+    # Templated messages are rendered here, from the same registry the UI validated against
+    outgoing, results = [], {}
+    for msg in batch:
+        if msg['template']:
+            try:
+                msg['subject'], msg['body'] = email_templates.render(msg['template'], json.loads(msg['context'] or "{}"))
+            except ValueError as e:  # TemplateError or a corrupt context
+                results[msg['id']] = (False, f"Template Error: {e}")
+                continue
+        outgoing.append(msg)
+
+    # One SendGrid call for the whole batch (personalizations)
+    sent_results = email_service.send_batch(
+        [(m['to_email'], m['subject'], m['body']) for m in outgoing],
+        secret=[m['secret'] for m in outgoing],
+    )
+    for msg, result in zip(outgoing, sent_results):
+        results[msg['id']] = result
+    return results
+
+def run_forever():
+    """Drain the outbox until the process exits."""
+    while True:
+        try:
+            processed = dispatch_once()
+            stats = database.get_outbox_stats()
+            metrics.set_gauge("outbox_queue_depth", stats.get('pending', 0), "Emails waiting in the outbox")
+            metrics.set_gauge("outbox_dead_letters", stats.get('dead', 0), "Emails that exhausted their retries")
+        except Exception as e:
+            print(f"[Email Outbox] Dispatch failed: {e}")
+            processed = 0
+
+        # A full batch means more may be due right away
+        if not processed:
+            _wake.wait(POLL_INTERVAL)
+            _wake.clear()
+
+def wake():
+    """Nudge the dispatcher in this process so a freshly queued email goes out immediately."""
+    _wake.set()
+
+def start_dispatcher():
+    """Start the background dispatcher thread once per process (safe to call on every rerun)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher and _dispatcher.is_alive():
+            return
+        _dispatcher = threading.Thread(target=run_forever, name="email-outbox", daemon=True)
+        _dispatcher.start()
+
+if __name__ == "__main__":
+    # Standalone dispatcher process: python email_outbox.py
+    database.init_db()
+    print("HireAI email dispatcher running...")
+    run_forever()
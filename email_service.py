@@ -1,105 +1,340 @@
 import os
+import abc
 import streamlit as st
 import json
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import time
+import threading
+import urllib3
+import metrics
+import database
+
+SENDGRID_URL = "https://api.sendgrid.com/v3/mail/send"
+
+# SendGrid accepts up to 1000 personalizations (recipients) per API call
+MAX_PERSONALIZATIONS = 1000
+
+# Config is re-read at most this often instead of on every message
+CONFIG_TTL_SECONDS = 60
+
+# Placeholder in the shared content that each personalization substitutes with its own body
+BODY_PLACEHOLDER = "-hireai-body-"
+
+# SendGrid rejects a personalization whose substitutions exceed 10,000 bytes;
+# longer bodies are sent on their own, as the message content itself
+MAX_SUBSTITUTION_BYTES = 10_000
+
+# Stored in place of bodies that carry credentials (passwords, access keys)
+REDACTED_BODY = "[redacted: contains credentials]"
+
+# Errors that apply to the whole request (auth, rate limit), so resending one by one won't help
+BATCH_WIDE_STATUSES = {401, 403, 429}
 
 def get_config(key, default=None):
     """
     Helper to get config from Streamlit secrets (priority) or Environment variables.
     """
     # 1. Check Streamlit Secrets (Best for Cloud)
-    if hasattr(st, "secrets") and key in st.secrets:
-        return st.secrets[key]
-    
+    try:
+        if hasattr(st, "secrets") and key in st.secrets:
+            return st.secrets[key]
+    except Exception:
+        pass  # no secrets.toml (e.g. the standalone `python email_outbox.py` worker)
+
     # 2. Check Environment Variables (Best for Local .env)
     return os.environ.get(key, default)
 
+_config_lock = threading.Lock()
+_config_cache = {"loaded_at": 0.0, "values": None}
+
+def get_email_config():
+    """Cached (api_key, from_email, transport_name, sendgrid_url); refreshed every CONFIG_TTL_SECONDS."""
+    with _config_lock:
+        now = time.time()
+        if _config_cache["values"] is None or now - _config_cache["loaded_at"] > CONFIG_TTL_SECONDS:
+            _config_cache["values"] = (
+                get_config("SENDGRID_API_KEY"),
+                get_config("FROM_EMAIL"),
+                (get_config("EMAIL_TRANSPORT", "sendgrid") or "sendgrid").lower(),
+                get_config("SENDGRID_URL", SENDGRID_URL),
+            )
+            _config_cache["loaded_at"] = now
+        return _config_cache["values"]
+
+class Transport(abc.ABC):
+    """
+    Email delivery backend. send_batch(from_email, [(to, subject, body), ...])
+    delivers the messages in one call and returns (status_code, response_body)
+    with SendGrid semantics (2xx = accepted). Register new backends with
+    register_transport() and select them with EMAIL_TRANSPORT.
+    Transports that keep what they send set stores_bodies; credential bodies
+    are redacted before they reach them.
+    """
+
+    name = "base"
+    stores_bodies = False
+
+    @abc.abstractmethod
+    def send_batch(self, from_email, messages):
+        """Delivers [(to, subject, body), ...] in one call. Returns (status_code, response_body)."""
+
+    def send(self, from_email, to, subject, body):
+        """Delivers a single message. Same return value as send_batch()."""
+        return self.send_batch(from_email, [(to, subject, body)])
+
+class SendGridTransport(Transport):
+    """
+    Long-lived SendGrid v3 client.
+    urllib3.PoolManager is thread-safe and keeps TLS connections alive, so
+    consecutive sends (from any thread) skip the handshake. `url` can point at
+    a local mail_sink.py server for offline runs.
+    """
+
+    name = "sendgrid"
+
+    def __init__(self, api_key, url=SENDGRID_URL, pool_size=10, timeout=15):
+        self.api_key = api_key
+        self.url = url
+        self.http = urllib3.PoolManager(
+            maxsize=pool_size,
+            block=False,
+            retries=False,
+            timeout=urllib3.Timeout(total=timeout),
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+        )
+
+    def send_batch(self, from_email, messages):
+        """
+        Sends [(to, subject, body), ...] in ONE API call using personalizations.
+        Bodies differ per recipient, so the shared content is a placeholder that
+        each personalization substitutes. Returns (status_code, response_body).
+        """
+        return self._post({
+            "from": {"email": from_email},
+            "content": [{"type": "text/plain", "value": BODY_PLACEHOLDER}],
+            "personalizations": [
+                {"to": [{"email": to}], "subject": subject, "substitutions": {BODY_PLACEHOLDER: body}}
+                for to, subject, body in messages
+            ],
+        })
+
+    def send(self, from_email, to, subject, body):
+        """One message with the body as the content itself (no substitution size limit)."""
+        return self._post({
+            "from": {"email": from_email},
+            "content": [{"type": "text/plain", "value": body}],
+            "personalizations": [{"to": [{"email": to}], "subject": subject}],
+        })
+
+    def _post(self, payload):
+        resp = self.http.request("POST", self.url, body=json.dumps(payload).encode("utf-8"))
+        return resp.status, resp.data
+
+class MockTransport(Transport):
+    """
+    In-process stand-in for SendGrid (EMAIL_TRANSPORT=mock). Records every
+    message and sleeps `latency` per API call to mimic the network round trip,
+    which makes it suitable for benchmarking batch vs. single sends.
+    """
+
+    name = "mock"
+    stores_bodies = True
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.calls = 0
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_batch(self, from_email, messages):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            self.sent.extend(messages)
+        return 202, b""
+
+class SinkTransport(Transport):
+    """
+    Offline delivery (EMAIL_TRANSPORT=sink): every message is written to the
+    mail_sink table with its batch size and call time, so load tests can
+    assert on exactly what would have been sent.
+    """
+
+    name = "sink"
+    stores_bodies = True
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def send_batch(self, from_email, messages):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        database.record_sink_messages(self.name, messages, time.perf_counter() - started)
+        return 202, b""
+
+# name -> factory(api_key, sendgrid_url)
+TRANSPORTS = {
+    "sendgrid": lambda api_key, url: SendGridTransport(api_key, url),
+    "mock": lambda api_key, url: MockTransport(float(os.environ.get("EMAIL_MOCK_LATENCY", 0.05))),
+    "sink": lambda api_key, url: SinkTransport(float(os.environ.get("EMAIL_MOCK_LATENCY", 0))),
+}
+
+def register_transport(name, factory):
+    """Make a transport selectable with EMAIL_TRANSPORT=name. factory(api_key, sendgrid_url) -> Transport."""
+    TRANSPORTS[name.lower()] = factory
+
+_transport_lock = threading.Lock()
+_transport = None
+_transport_key = None
+
+def get_transport():
+    """
+    Returns the shared transport, rebuilding it only if the configuration changed.
+    A transport installed with set_transport() is kept as-is.
+    """
+    global _transport, _transport_key
+    api_key, _, transport_name, url = get_email_config()
+    key = (transport_name, api_key, url)
+    with _transport_lock:
+        if _transport_key and _transport_key[0] == "custom":
+            return _transport
+        if _transport is None or _transport_key != key:
+            factory = TRANSPORTS.get(transport_name)
+            if factory is None:
+                print(f"[Email] Unknown EMAIL_TRANSPORT '{transport_name}', using sendgrid")
+                factory = TRANSPORTS["sendgrid"]
+            _transport = factory(api_key, url)
+            _transport_key = key
+        return _transport
+
+def set_transport(transport):
+    """Install a specific transport (benchmarks / load tests); None restores the configured one."""
+    global _transport, _transport_key
+    with _transport_lock:
+        _transport = transport
+        _transport_key = ("custom", id(transport)) if transport is not None else None
+
+def _record_send(outcome, started, count=1):
+    """Records SendGrid latency (per API call) and outcome (per message)."""
+    metrics.observe("email_send_seconds", time.perf_counter() - started, "SendGrid send latency", outcome=outcome)
+    metrics.inc("email_send_total", count, help="Emails attempted, by outcome", outcome=outcome)
+
+def _clean_error(status, response_body):
+    """Extract the human-readable message from a SendGrid error response."""
+    clean_error = f"Failed with status: {status}"
+    try:
+        # Decode bytes to string if needed
+        body_content = response_body
+        if isinstance(body_content, bytes):
+            body_content = body_content.decode('utf-8')
+
+        # Parse JSON
+        error_json = json.loads(body_content)
+
+        # Extract the specific message from SendGrid's error format
+        if "errors" in error_json and isinstance(error_json["errors"], list):
+            first_error = error_json["errors"][0]
+            if "message" in first_error:
+                clean_error = first_error["message"]
+            else:
+                 clean_error = str(error_json)
+        else:
+            clean_error = str(body_content)
+    except Exception as parse_err:
+        print(f"Error parsing SendGrid error response: {parse_err}")
+    return clean_error
+
 def send_email(to_email, subject, body):
     """
     Sends an email using SendGrid API.
     Returns tuple: (success: bool, message: str)
     """
-    # 1. Load config
-    api_key = get_config("SENDGRID_API_KEY")
-    from_email = get_config("FROM_EMAIL")
+    return send_batch([(to_email, subject, body)])[0]
+
+def send_batch(messages, secret=None):
+    """
+    Sends many emails [(to, subject, body), ...] with as few API calls as
+    possible (up to MAX_PERSONALIZATIONS recipients per call). `secret` flags
+    (one per message) mark bodies with credentials, which transports that
+    store messages only ever see redacted.
+    Returns one (success: bool, message: str) per input message, in order.
+    """
+    if not messages:
+        return []
+    started = time.perf_counter()
 
-    # Debugging: Print to console to ensure the correct email is being picked up
-    if from_email:
-        print(f"[Email Service] Attempting to send from: {from_email}")
-    else:
-        print(f"[Email Service] FROM_EMAIL is missing in configuration.")
+    # 1. Load config (cached)
+    api_key, from_email, transport_name, _ = get_email_config()
+    transport = get_transport()
 
-    # 2. Mock Mode (No credentials)
-    if not api_key or not from_email:
-        print(f"\n[MOCK EMAIL SERVICE - SENDGRID]")
-        print(f"To: {to_email}")
-        print(f"Subject: {subject}")
-        return False, "Mock Mode (Credentials missing in .env or secrets.toml)"
+    # 2. Mock Mode (No credentials, real transport): nothing is sent or stored, only who it was for
+    if isinstance(transport, SendGridTransport) and (not api_key or not from_email):
+        for to, subject, _ in messages:
+            print(f"[MOCK EMAIL SERVICE - SENDGRID] Not sent to {to}: {subject}")
+        _record_send("mock", started, len(messages))
+        return [(False, "Mock Mode (Credentials missing in .env or secrets.toml)")] * len(messages)
+    from_email = from_email or "hireai@localhost"
 
-    try:
-        # 3. Construct Message
-        message = Mail(
-            from_email=from_email,
-            to_emails=to_email,
-            subject=subject,
-            plain_text_content=body
-        )
-        
-        # 4. Send via API
-        sg = SendGridAPIClient(api_key)
-        response = sg.send(message)
-        
-        # Check for 2xx status code
-        if 200 <= response.status_code < 300:
-            return True, "Email Sent Successfully"
+    if transport.stores_bodies and secret:
+        messages = [(to, subject, REDACTED_BODY if is_secret else body)
+                    for (to, subject, body), is_secret in zip(messages, secret)]
+
+    # 3. Bodies too large for a substitution go out one per call; the rest are batched
+    results = [None] * len(messages)
+    batched = []
+    for i, (to, subject, body) in enumerate(messages):
+        if len(body.encode("utf-8")) > MAX_SUBSTITUTION_BYTES:
+            results[i] = _send_chunk(transport, from_email, [messages[i]])[0]
         else:
-            return False, f"Failed with status: {response.status_code}"
+            batched.append(i)
 
+    for lo in range(0, len(batched), MAX_PERSONALIZATIONS):
+        positions = batched[lo:lo + MAX_PERSONALIZATIONS]
+        chunk_results = _send_chunk(transport, from_email, [messages[i] for i in positions])
+        for i, result in zip(positions, chunk_results):
+            results[i] = result
+
+    return results
+
+def _send_chunk(transport, from_email, chunk):
+    """
+    One API call for `chunk`; returns one result per message. When SendGrid
+    rejects a batch with a 4xx (one bad address or body fails the whole
+    request), the messages are resent one per call so only the bad one fails.
+    """
+    chunk_started = time.perf_counter()
+    try:
+        if len(chunk) == 1:
+            status, response_body = transport.send(from_email, *chunk[0])
+        else:
+            status, response_body = transport.send_batch(from_email, chunk)
     except Exception as e:
         print(f"Full SendGrid Exception: {e}")
-        
-        clean_error = "Email failed to send."
-        
-        # Handle SendGrid specific error bodies (often bytes)
-        if hasattr(e, 'body'):
-            try:
-                # Decode bytes to string if needed
-                body_content = e.body
-                if isinstance(body_content, bytes):
-                    body_content = body_content.decode('utf-8')
-                
-                # Parse JSON
-                error_json = json.loads(body_content)
-                
-                # Extract the specific message from SendGrid's error format
-                if "errors" in error_json and isinstance(error_json["errors"], list):
-                    first_error = error_json["errors"][0]
-                    if "message" in first_error:
-                        clean_error = first_error["message"]
-                    else:
-                         clean_error = str(error_json)
-                else:
-                    clean_error = str(body_content)
-                    
-            except Exception as parse_err:
-                print(f"Error parsing SendGrid error response: {parse_err}")
-                clean_error = str(e)
-        else:
-             clean_error = str(e)
-        
-        # --- FALLBACK LOGIC ---
-        # If the error is due to unverified Sender Identity, we treat it as a "Soft Fail".
-        # We print the email to console and return True so the user flow continues.
-        if "Sender Identity" in clean_error or "verified" in clean_error or "403" in str(e):
-            print(f"\n{'='*40}")
-            print(f"[/!\\ SIMULATION MODE] SendGrid Sender Identity Invalid")
-            print(f"Actual email could not be sent. Printing to console:")
-            print(f"{'='*40}")
-            print(f"To: {to_email}")
-            print(f"Subject: {subject}")
-            print(f"Body:\n{body}")
-            print(f"{'='*40}\n")
-            return True, "Simulated (Sender Identity Invalid - Check Console)"
-
-        return False, f"SendGrid Error: {clean_error}"
+        _record_send("error", chunk_started, len(chunk))
+        return [(False, f"SendGrid Error: {e}")] * len(chunk)
+
+    # Check for 2xx status code
+    if 200 <= status < 300:
+        _record_send("sent", chunk_started, len(chunk))
+        return [(True, "Email Sent Successfully")] * len(chunk)
+
+    clean_error = _clean_error(status, response_body)
+
+    # --- FALLBACK LOGIC ---
+    # If the error is due to unverified Sender Identity, we treat it as a "Soft Fail"
+    # and return True so the user flow continues. Nothing is delivered or stored.
+    if "Sender Identity" in clean_error or "verified" in clean_error or status == 403:
+        print(f"[/!\\ SIMULATION MODE] SendGrid Sender Identity Invalid: {len(chunk)} message(s) not sent")
+        _record_send("simulated", chunk_started, len(chunk))
+        return [(True, "Simulated (Sender Identity Invalid - Not Sent)")] * len(chunk)
+
+    if len(chunk) > 1 and 400 <= status < 500 and status not in BATCH_WIDE_STATUSES:
+        print(f"[Email] Batch of {len(chunk)} rejected ({status}: {clean_error}); resending one message per call")
+        _record_send("rejected", chunk_started, 0)
+        return [result for message in chunk for result in _send_chunk(transport, from_email, [message])]
+
+    _record_send("failed", chunk_started, len(chunk))
+    return [(False, f"SendGrid Error: {clean_error}")] * len(chunk)
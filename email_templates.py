@@ -0,0 +1,319 @@
+import string
+
+_formatter = string.Formatter()
+
+# Placeholders that carry login credentials; emails using them are never stored in the mail sink
+SECRET_FIELDS = frozenset({"password", "access_key"})
+
+class TemplateError(ValueError):
+    """Unknown template, malformed template text, or a context missing required fields."""
+
+class EmailTemplate:
+    """
+    A subject/body pair parsed once at import. Rendering is a single
+    str.format_map per part; the placeholder set is known up front so
+    contexts can be validated before anything is queued.
+    """
+
+    def __init__(self, name, subject, body, version=1):
+        self.name = name
+        self.version = version
+        self.subject = subject
+        self.body = body
+        self.fields = frozenset(_fields(subject) | _fields(body))
+        self.secret = bool(self.fields & SECRET_FIELDS)
+
+    @property
+    def key(self):
+        """Identifier stored with queued emails, e.g. 'offer_sent@1'."""
+        return f"{self.name}@{self.version}"
+
+    def validate(self, context):
+        missing = sorted(f for f in self.fields if context.get(f) is None)
+        if missing:
+            raise TemplateError(f"Template '{self.name}' is missing: {', '.join(missing)}")
+
+    def render(self, context):
+        """Returns (subject, body). Raises TemplateError on an incomplete context."""
+        self.validate(context)
+        return self.subject.format_map(context), self.body.format_map(context)
+
+def _fields(text):
+    """Placeholder names in a str.format template (only plain {name} fields are allowed)."""
+    names = set()
+    try:
+        parsed = list(_formatter.parse(text))
+    except ValueError as e:
+        raise TemplateError(f"Malformed template: {e}") from e
+    for _, field, spec, conversion in parsed:
+        if field is None:
+            continue
+        if not field.isidentifier() or spec or conversion:
+            raise TemplateError(f"Unsupported placeholder '{{{field}}}'")
+        names.add(field)
+    return names
+
+# --- TEMPLATES ---
+# Bump a template's version whenever its wording changes (queued emails record it)
+_TEMPLATES = [
+    EmailTemplate("application_received", "Application Received: {role}", """
+Dear {name},
+
+Thank you for applying for the position of {role} at HireAI.
+
+Your application has been received and screened by our AI system.
+To track your status or take assessments, please login to the Candidate Portal.
+
+Your Access Key: {access_key}
+
+Best regards,
+HireAI Recruiting Team
+"""),
+    EmailTemplate("aptitude_scheduled", "Aptitude Assessment Scheduled - HireAI", """
+Dear {name},
+
+You have been shortlisted for the Aptitude Assessment for the {role} position.
+
+Date: {aptitude_date}
+Time: {aptitude_time}
+
+Please login to the Candidate Portal using your Access Key: {access_key}
+
+Best regards,
+HireAI Recruiting Team
+"""),
+    EmailTemplate("aptitude_passed", "Aptitude Test Passed - HireAI",
+                  "Dear {name},\n\nCongratulations! You have passed the aptitude assessment with a score of {score}%.\n\nOur team will review your profile and schedule the final interview shortly.\n\nBest regards,\nHireAI Recruiting Team"),
+    EmailTemplate("aptitude_failed", "Application Update - HireAI",
+                  "Dear {name},\n\nThank you for completing the aptitude assessment.\n\nUnfortunately, your score of {score}% did not meet the required threshold for this role.\n\nWe encourage you to apply again after 6 months.\n\nBest regards,\nHireAI Recruiting Team"),
+    EmailTemplate("interview_scheduled", "{round_name} Interview - HireAI", """
+Dear {name},
+
+We are pleased to invite you to the {round_name} Interview for the {role} position.
+
+Date: {interview_date}
+Time: {interview_time}
+Meeting Link: {meeting_link}
+
+Please join the link at the scheduled time.
+
+Best regards,
+HireAI Recruiting Team
+"""),
+    EmailTemplate("offer_sent", "Official Offer Letter - HireAI", """
+Dear {name},
+
+We are pleased to offer you the position of {role} at HireAI!
+
+Your offer letter has been approved and signed.
+
+Please login to the Candidate Portal to view and accept your offer.
+You have 3 days to accept this offer.
+
+Access Key: {access_key}
+
+Best regards,
+HireAI HR Team
+"""),
+    EmailTemplate("offer_accepted", "Offer Acceptance Confirmed - HireAI", """
+Dear {name},
+
+Thank you for accepting our offer! We are thrilled to have you join us.
+
+Please login to the candidate portal and submit the following documents for verification:
+1. Valid Government ID Proof (Passport/Aadhaar/Driver's License)
+2. Current Address Proof
+
+Once verified, we will issue your formal Joining Letter.
+
+Best regards,
+HireAI HR Team
+"""),
+    EmailTemplate("selected", "Congratulations! You have been Selected - HireAI", """
+Dear {name},
+
+Congratulations! We are pleased to inform you that you have cleared the final interview round for the position of {role}.
+
+We are currently preparing your formal offer. A confirmation letter will be shared with you shortly.
+
+Action Required:
+Please login to the candidate portal and submit the following documents for verification:
+1. Valid Government ID Proof (Passport/Aadhaar/Driver's License)
+2. Current Address Proof
+
+Once verified, we will issue your formal Joining Letter.
+
+Best regards,
+HireAI HR Team
+"""),
+    EmailTemplate("joining_scheduled", "Official Joining Letter - HireAI", """
+Dear {name},
+
+We are delighted to formally offer you the position of {role} at HireAI!
+
+We have verified your documents and everything looks in order.
+
+**Joining Date:** {joining_date}
+
+Please arrive at our office by 9:30 AM on your joining date for orientation.
+We are excited to have you onboard.
+
+Welcome to the family!
+
+Best regards,
+HireAI HR Team
+"""),
+    EmailTemplate("training", "Welcome to HireAI - Training Portal Access", """
+Dear {name},
+
+Welcome aboard! We are excited to have you start your journey with us.
+
+Your Employee ID has been generated. Please use this to access the Training Portal.
+You must complete the mandatory training modules to finalize your onboarding.
+
+**New Employee ID:** {access_key}
+
+Please login to the Candidate Portal using this new ID.
+
+Best regards,
+HireAI HR Team
+"""),
+    EmailTemplate("employee_confirmed", "Training Completed - You are officially Hired!", """
+Dear {name},
+
+Congratulations on successfully completing the mandatory training!
+
+You are now officially a permanent employee of HireAI.
+We wish you a successful career with us.
+
+Best regards,
+HireAI HR Team
+"""),
+    EmailTemplate("rejected", "Update on your Application - HireAI", """
+Dear {name},
+
+Thank you for giving us the opportunity to get to know you during the {round_name} of interviews for the {role} position.
+
+We appreciate the time and effort you put into the process. However, after careful consideration, we have decided to move forward with other candidates who more closely match our current requirements for this specific role.
+
+We encourage you to apply again after 6 months as our needs and roles continue to evolve.
+
+We wish you the very best in your future endeavors.
+
+Best regards,
+HireAI Recruiting Team
+"""),
+    EmailTemplate("interview_reminder", "Reminder: {round_name} Interview {when} - HireAI", """
+Dear {name},
+
+This is a reminder that your {round_name} Interview for the {role} position starts {when}.
+
+Date: {interview_date}
+Time: {interview_time}
+Meeting Link: {meeting_link}
+
+Best regards,
+HireAI Recruiting Team
+"""),
+    EmailTemplate("aptitude_reminder", "Reminder: Aptitude Assessment {when} - HireAI", """
+Dear {name},
+
+This is a reminder that your Aptitude Assessment for the {role} position starts {when}.
+
+Date: {aptitude_date}
+Time: {aptitude_time}
+
+Please login to the Candidate Portal using your Access Key: {access_key}
+
+Best regards,
+HireAI Recruiting Team
+"""),
+    EmailTemplate("recruiter_access", "HireAI Recruiter Access", """
+Hello {username},
+
+You have been granted recruiter access to the HireAI platform.
+
+Username: {username}
+Password: {password}
+
+Please login securely at the HR Portal.
+
+Best regards,
+HireAI Admin
+"""),
+]
+
+TEMPLATES = {t.name: t for t in _TEMPLATES}
+
+# Candidate status -> template name. 'Aptitude Completed' depends on the score (see for_candidate).
+STATUS_TEMPLATES = {
+    'Screening': "application_received",
+    'Aptitude Scheduled': "aptitude_scheduled",
+    'Interview Scheduled': "interview_scheduled",
+    'Offer Sent': "offer_sent",
+    'Offer Accepted': "offer_accepted",
+    'Selected': "selected",
+    'Joining Scheduled': "joining_scheduled",
+    'Training': "training",
+    'Employee Confirmed': "employee_confirmed",
+    'Rejected': "rejected",
+}
+
+# Statuses that deliberately send nothing
+NO_EMAIL = {
+    'VP Approval': "No email for VP Approval stage.",
+    'Offer Signed': "No email for Offer Signed stage.",
+}
+
+PASS_SCORE = 50
+
+def get(name):
+    """Template by name (O(1)). Raises TemplateError if it does not exist."""
+    template = TEMPLATES.get(name)
+    if template is None:
+        raise TemplateError(f"Unknown email template '{name}'")
+    return template
+
+def for_candidate(c):
+    """
+    Template for the candidate's current status.
+    Returns: (template, None), or (None, reason) when the status has no email.
+    """
+    status = c.get('status', 'Screening')
+    if status == 'Aptitude Completed':
+        return get("aptitude_passed" if c.get('aptitude_score', 0) >= PASS_SCORE else "aptitude_failed"), None
+    name = STATUS_TEMPLATES.get(status)
+    if name is None:
+        return None, NO_EMAIL.get(status, "No email template found for current status.")
+    return get(name), None
+
+def candidate_context(c):
+    """Render context for candidate templates (same fallbacks the UI has always shown)."""
+    round_name = "First Round" if c.get('interview_round', 1) == 1 else "Second Round"
+    return {
+        'name': c.get('name'),
+        'role': c.get('role'),
+        'access_key': c.get('access_key', 'N/A'),
+        'aptitude_date': c.get('aptitudeDate', 'TBD'),
+        'aptitude_time': c.get('aptitudeTime', 'TBD'),
+        'score': c.get('aptitude_score', 0),
+        'round_name': round_name,
+        'interview_date': c.get('round2Date', 'TBD'),
+        'interview_time': c.get('round2Time', 'TBD'),
+        'meeting_link': c.get('round2Link', '#'),
+        'joining_date': c.get('joining_date', 'To Be Discussed'),
+    }
+
+def render(name, context):
+    """Render template `name` with `context`. Returns (subject, body)."""
+    return get(name).render(context)
+
+def render_candidate(c):
+    """
+    Renders the email for the candidate's current status.
+    Returns: (subject, body), or (None, reason) when the status has no email.
+    """
+    template, reason = for_candidate(c)
+    if template is None:
+        return None, reason
+    return template.render(candidate_context(c))
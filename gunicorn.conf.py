@@ -0,0 +1,19 @@
+# Gunicorn settings for running the FastAPI backend (main.py) with several workers:
+#   gunicorn main:app -c gunicorn.conf.py
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('API_PORT', '8000')}"
+try:
+    workers = int(os.environ.get("API_WORKERS", multiprocessing.cpu_count()))
+except ValueError:  # same fallback as token_store.api_workers()
+    workers = 1
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Each worker opens its own SQLite connections; nothing is shared through fork
+preload_app = False
+graceful_timeout = 20
+keepalive = 5
+
+# Workers read this to pick the shared (SQLite) token store
+os.environ["API_WORKERS"] = str(workers)
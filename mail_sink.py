@@ -0,0 +1,84 @@
+"""
+Local stand-in for the SendGrid v3 mail/send endpoint.
+
+    python mail_sink.py --port 8025
+    SENDGRID_URL=http://127.0.0.1:8025/v3/mail/send SENDGRID_API_KEY=test FROM_EMAIL=hr@hireai.local streamlit run app.py
+
+Every personalization in a request is expanded to (to, subject, body) and
+recorded in the mail_sink table, so the real HTTP transport (pooling,
+batching, error handling) can be exercised offline. --fail-every N answers
+every Nth request with a 500 to exercise outbox retries.
+"""
+import argparse
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import database
+
+def expand(payload):
+    """SendGrid v3 payload -> [(to, subject, body), ...] (one per recipient)."""
+    content = payload.get("content") or [{"value": ""}]
+    template_body = content[0].get("value", "")
+    messages = []
+    for p in payload.get("personalizations", []):
+        body = template_body
+        for placeholder, value in (p.get("substitutions") or {}).items():
+            body = body.replace(placeholder, value)
+        subject = p.get("subject", payload.get("subject"))
+        for recipient in p.get("to", []):
+            messages.append((recipient["email"], subject, body))
+    return messages
+
+class SinkHandler(BaseHTTPRequestHandler):
+    fail_every = 0
+    latency = 0.0
+    _requests = 0
+    _lock = threading.Lock()
+
+    def do_POST(self):
+        started = time.perf_counter()
+        with SinkHandler._lock:
+            SinkHandler._requests += 1
+            request_no = SinkHandler._requests
+
+        if self.fail_every and request_no % self.fail_every == 0:
+            return self._reply(500, {"errors": [{"message": "mail_sink: injected failure"}]})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            messages = expand(json.loads(self.rfile.read(length)))
+        except (ValueError, KeyError, TypeError) as e:
+            return self._reply(400, {"errors": [{"message": f"mail_sink: bad payload ({e})"}]})
+
+        if self.latency:
+            time.sleep(self.latency)
+        database.record_sink_messages("http-sink", messages, time.perf_counter() - started)
+        self._reply(202, None)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate a load test
+
+def serve(host="127.0.0.1", port=8025, fail_every=0, latency=0.0):
+    SinkHandler.fail_every = fail_every
+    SinkHandler.latency = latency
+    server = ThreadingHTTPServer((host, port), SinkHandler)
+    print(f"HireAI mail sink listening on http://{host}:{port}/v3/mail/send")
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to sleep per request")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.fail_every, args.latency).serve_forever()
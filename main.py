@@ -1,16 +1,27 @@
 
 import os
-import uuid
+import asyncio
 from fastapi import FastAPI, Request, HTTPException, Header
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse, JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List, Any, Dict
 from pydantic import BaseModel
 import uvicorn
 import database
+import token_store
+import change_feed
+import metrics
+import serializer
 
-app = FastAPI()
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by serializer (msgspec/orjson when installed)."""
+
+    def render(self, content):
+        return serializer.dumps_bytes(content)
+
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Enable CORS
 app.add_middleware(
@@ -24,6 +35,12 @@ app.add_middleware(
 @app.on_event("startup")
 def startup_event():
     database.init_db()
+    feed.start()
+    metrics.start_flusher("api")
+
+@app.on_event("shutdown")
+def shutdown_event():
+    feed.stop()
 
 # Models for Request Bodies
 class LoginRequest(BaseModel):
@@ -34,8 +51,19 @@ class UserCreateRequest(BaseModel):
     username: str
     password: str
 
-# Mock Auth Token storage
-active_tokens = set()
+# Single in-process fan-out of candidate writes to SSE clients
+feed = change_feed.ChangeFeed()
+
+# Bounded, expiring API token store (TTL / size / backend configured via env)
+tokens = token_store.create_token_store()
+
+def check_token(authorization):
+    """Validates a 'Bearer <token>' header. Returns the username or raises 401."""
+    token = (authorization or "").replace("Bearer ", "")
+    username = tokens.validate(token)
+    if not username:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return username
 
 # NOTE: We use 'def' instead of 'async def' for routes that call the synchronous database module.
 # This ensures FastAPI runs them in a thread pool, preventing the event loop from blocking.
@@ -47,8 +75,7 @@ def login(data: LoginRequest):
     # HARDCODED AUTHENTICATION (Bypassing Database)
     # This prevents DB locking issues from affecting access to the portal.
     if data.username == "admin" and data.password == "admin123":
-        token = str(uuid.uuid4())
-        active_tokens.add(token)
+        token = tokens.issue(data.username)
         print(f"Login successful for {data.username}.")
         return {"status": "success", "token": token, "username": data.username}
     
@@ -62,26 +89,131 @@ def create_user(data: UserCreateRequest, authorization: Optional[str] = Header(N
 
 @app.get("/api/candidates")
 def get_candidates(authorization: Optional[str] = Header(None)):
-    token = (authorization or "").replace("Bearer ", "")
-    return database.get_candidates()
-
-@app.post("/api/candidates")
-def update_candidates(request: Request, candidate_data: Any = None):
-    pass
+    check_token(authorization)
+    # Stored documents are already JSON: splice them instead of decoding and re-encoding 100k dicts
+    return Response(content=database.get_candidates_json(), media_type="application/json")
 
 @app.post("/api/candidates")
 async def update_candidates_async(request: Request, authorization: Optional[str] = Header(None)):
+    # Local cache hit is O(1); only unknown tokens fall through to a single PK lookup
+    username = check_token(authorization)
     try:
-        data = await request.json()
+        data = serializer.loads(await request.body())
         if isinstance(data, list):
-            database.bulk_save_candidates(data)
+            database.bulk_save_candidates(data, actor=f"api:{username}")
         else:
-            database.save_candidate(data)
+            database.save_candidate(data, actor=f"api:{username}")
         return {"status": "success"}
     except Exception as e:
         print(f"Error updating candidates: {e}")
         raise HTTPException(status_code=500, detail="Failed to save data")
 
+def format_sse(event, data, event_id=None):
+    """Formats one Server-Sent Events message."""
+    msg = f"id: {event_id}\n" if event_id is not None else ""
+    return msg + f"event: {event}\ndata: {serializer.dumps(data)}\n\n"
+
+@app.get("/api/candidates/stream")
+async def stream_candidate_changes(
+    request: Request,
+    token: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Pushes candidate changes as Server-Sent Events: {id, status, rev, op}.
+    EventSource cannot set headers, so the token may also be passed as ?token=.
+    Reconnecting clients send Last-Event-ID and receive the missed changes first.
+    """
+    check_token(authorization or f"Bearer {token or ''}")
+
+    try:
+        last_rev = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_rev = None
+
+    async def event_stream():
+        nonlocal last_rev
+        # Subscribe before replaying so nothing written in between is lost
+        queue = feed.subscribe()
+        try:
+            if last_rev is not None:
+                backlog_limit = 500
+                backlog = await run_in_threadpool(database.get_changes_since, last_rev, backlog_limit)
+                if len(backlog) >= backlog_limit:
+                    # Too far behind - cheaper for the client to reload once
+                    yield format_sse("resync", {})
+                    last_rev = await run_in_threadpool(database.get_latest_change_rev)
+                else:
+                    for change in backlog:
+                        last_rev = change['rev']
+                        yield format_sse("candidate", {
+                            "id": change['candidate_id'], "status": change['status'],
+                            "rev": change['rev'], "op": change['op']
+                        }, change['rev'])
+
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    change = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if change.get('op') == 'resync':
+                    yield format_sse("resync", {})
+                    continue
+                if last_rev is not None and change['rev'] <= last_rev:
+                    continue
+                last_rev = change['rev']
+                yield format_sse("candidate", {
+                    "id": change['candidate_id'], "status": change['status'],
+                    "rev": change['rev'], "op": change['op']
+                }, change['rev'])
+        finally:
+            feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/candidates/events")
+def get_candidate_events(since: int = 0, limit: int = 500, authorization: Optional[str] = Header(None)):
+    """Status transitions after event id `since` (pass the last id you saw to sync incrementally)."""
+    check_token(authorization)
+    events = database.get_events_since(since, min(limit, 5000))
+    return {"events": events, "next": events[-1]['id'] if events else since}
+
+@app.get("/api/candidates/{candidate_id}")
+def get_candidate(candidate_id: str, authorization: Optional[str] = Header(None)):
+    """One candidate document (live updates fetch candidates created by other sessions)."""
+    check_token(authorization)
+    candidate = database.get_candidate(candidate_id)
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    return candidate.to_dict()
+
+@app.get("/api/candidates/{candidate_id}/aptitude")
+def get_candidate_aptitude(candidate_id: str, authorization: Optional[str] = Header(None)):
+    """The candidate's submitted aptitude exam (questions + answers), kept out of /api/candidates."""
+    check_token(authorization)
+    candidate = database.get_candidate(candidate_id)
+    details = database.get_aptitude_details(candidate.get('aptitude_attempt_id')) if candidate else None
+    if details is None:
+        raise HTTPException(status_code=404, detail="No aptitude exam for this candidate")
+    return details
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint: this worker merged with Streamlit and the other workers."""
+    metrics.set_gauge("token_store_size", len(tokens), "Tokens cached in this process")
+    metrics.set_gauge("change_feed_subscribers", feed.subscriber_count(), "Open SSE connections")
+    metrics.set_gauge("change_feed_queue_depth", feed.queue_depth(), "Changes waiting in SSE subscriber queues")
+    return PlainTextResponse(metrics.render("api"), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def read_index():
     return FileResponse("index.html")
@@ -91,5 +223,11 @@ app.mount("/", StaticFiles(directory=".", html=True), name="static")
 if __name__ == "__main__":
     # If run directly (not via uvicorn command line), we also init db
     database.init_db()
-    print("HireAI Server running...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = token_store.api_workers()
+    port = token_store.env_int("API_PORT", 8000)
+    print(f"HireAI Server running with {workers} worker(s)...")
+    if workers > 1:
+        # Multiple workers need an import string so each process can load the app itself
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
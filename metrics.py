@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import socket
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds (covers fast SQLite reads up to slow AI calls)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Seconds between two snapshot writes of a live process
+FLUSH_INTERVAL = 10
+
+# A process that missed three flushes has gone away; its snapshot is deleted
+SNAPSHOT_MAX_AGE = 3 * FLUSH_INTERVAL
+
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+class Registry:
+    """
+    Thread-safe in-process metric registry (counters, gauges, histograms).
+    Series are keyed by (name, sorted label items) so updates are dict lookups.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}  # key -> [bucket_bounds, bucket_counts, sum, count]
+        self.help = {}
+
+    def inc(self, name, value=1, help=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            if help:
+                self.help.setdefault(name, help)
+
+    def set_gauge(self, name, value, help=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = value
+            if help:
+                self.help.setdefault(name, help)
+
+    def observe(self, name, value, help=None, buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = [tuple(buckets), [0] * len(buckets), 0.0, 0]
+                self.histograms[key] = series
+            idx = bisect_left(series[0], value)
+            if idx < len(series[1]):
+                series[1][idx] += 1
+            series[2] += value
+            series[3] += 1
+            if help:
+                self.help.setdefault(name, help)
+
+    def snapshot(self):
+        """JSON-serializable copy of every series."""
+        with self._lock:
+            return {
+                "counters": [[n, list(l), v] for (n, l), v in self.counters.items()],
+                "gauges": [[n, list(l), v] for (n, l), v in self.gauges.items()],
+                "histograms": [[n, list(l), list(s[0]), list(s[1]), s[2], s[3]] for (n, l), s in self.histograms.items()],
+                "help": dict(self.help),
+            }
+
+REGISTRY = Registry()
+
+# --- Module-level shortcuts (what the rest of the app calls) ---
+def inc(name, value=1, help=None, **labels):
+    REGISTRY.inc(name, value, help, **labels)
+
+def set_gauge(name, value, help=None, **labels):
+    REGISTRY.set_gauge(name, value, help, **labels)
+
+def observe(name, value, help=None, **labels):
+    REGISTRY.observe(name, value, help, **labels)
+
+@contextmanager
+def timer(name, help=None, **labels):
+    """Times the enclosed block into histogram `name` (seconds)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - start, help, **labels)
+
+# --- Cross-process sharing ---
+# Streamlit and every API worker are separate processes, so each one periodically
+# writes its registry snapshot to SQLite and /metrics merges all of them.
+_flusher = None
+_flusher_lock = threading.Lock()
+
+def flush(role):
+    """Persist this process's snapshot (role: 'streamlit' / 'api')."""
+    import database  # local import: database.py imports this module
+    database.save_metrics_snapshot(PROCESS_ID, role, json.dumps(REGISTRY.snapshot()))
+
+def start_flusher(role, interval=FLUSH_INTERVAL):
+    """Start the background snapshot thread once per process (safe to call on every rerun)."""
+    global _flusher
+    with _flusher_lock:
+        if _flusher and _flusher.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    flush(role)
+                except Exception as e:
+                    print(f"[Metrics] Snapshot flush failed: {e}")
+
+        _flusher = threading.Thread(target=run, name="metrics-flusher", daemon=True)
+        _flusher.start()
+
+def _merge(snapshots):
+    """
+    Counters and histograms are summed across processes. Gauges are a current
+    value, not a total, so the most recently flushed snapshot wins (pass the
+    snapshots oldest first).
+    """
+    counters, gauges, histograms, help_text = {}, {}, {}, {}
+    for snap in snapshots:
+        help_text.update(snap.get("help", {}))
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(tuple(x) for x in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snap["gauges"]:
+            key = (name, tuple(tuple(x) for x in labels))
+            gauges[key] = value
+        for name, labels, bounds, counts, total, count in snap["histograms"]:
+            key = (name, tuple(tuple(x) for x in labels))
+            merged = histograms.get(key)
+            if merged is None or merged[0] != bounds:
+                histograms[key] = [bounds, list(counts), total, count]
+            else:
+                merged[1] = [a + b for a, b in zip(merged[1], counts)]
+                merged[2] += total
+                merged[3] += count
+    return counters, gauges, histograms, help_text
+
+def _escape(value):
+    """Label value escaping from the Prometheus text format: backslash, quote, newline."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(labels, extra=None):
+    items = list(labels) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+def render(role):
+    """
+    Prometheus text exposition of this process merged with every other
+    process's latest snapshot.
+    """
+    import database
+    flush(role)
+    rows = database.get_metrics_snapshots(time.time() - SNAPSHOT_MAX_AGE)
+    rows.sort(key=lambda r: r['updated_at'])
+    counters, gauges, histograms, help_text = _merge(json.loads(r['data']) for r in rows)
+
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name not in seen:
+            seen.add(name)
+            if name in help_text:
+                lines.append(f"# HELP {name} {help_text[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter")
+        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    for (name, labels), value in sorted(gauges.items()):
+        header(name, "gauge")
+        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    for (name, labels), (bounds, counts, total, count) in sorted(histograms.items()):
+        header(name, "histogram")
+        cumulative = 0
+        for bound, c in zip(bounds, counts):
+            cumulative += c
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {total}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,330 @@
+import sys
+from enum import Enum
+from collections.abc import MutableMapping
+from datetime import date, time
+
+class CandidateStatus(str, Enum):
+    """Pipeline status. Members are the stored strings, so `c['status'] == 'Screening'` keeps working."""
+    SCREENING = 'Screening'
+    APTITUDE_SCHEDULED = 'Aptitude Scheduled'
+    APTITUDE_COMPLETED = 'Aptitude Completed'
+    INTERVIEW_SCHEDULED = 'Interview Scheduled'
+    VP_APPROVAL = 'VP Approval'
+    OFFER_SIGNED = 'Offer Signed'
+    OFFER_SENT = 'Offer Sent'
+    OFFER_ACCEPTED = 'Offer Accepted'
+    OFFER_EXPIRED = 'Offer Expired'
+    OFFER_DECLINED = 'Candidate Declined Offer'
+    SELECTED = 'Selected'
+    JOINING_SCHEDULED = 'Joining Scheduled'
+    TRAINING = 'Training'
+    TRAINING_FAILED = 'Training Failed'
+    EMPLOYEE_CONFIRMED = 'Employee Confirmed'
+    REJECTED = 'Rejected'
+
+    # Behave exactly like the plain string (f-strings, str(), dict keys, SQLite parameters)
+    __str__ = str.__str__
+    __format__ = str.__format__
+    __hash__ = str.__hash__
+
+# --- FIELD CODECS ---
+# Each typed field is parsed once when a document is loaded and formatted back to its
+# stored form on item access / to_dict(). Values that don't parse are kept as they are.
+def _parse_status(raw):
+    return CandidateStatus._value2member_map_.get(raw, raw) if type(raw) is str else raw
+
+def _parse_date(raw):
+    if type(raw) is str and len(raw) == 10:
+        try:
+            return date.fromisoformat(raw)
+        except ValueError:
+            pass
+    return raw
+
+def _format_date(value):
+    return value.isoformat() if type(value) is date else value
+
+def _parse_time(raw):
+    if type(raw) is str and len(raw) == 5:  # HH:MM, as written by the UI
+        try:
+            return time.fromisoformat(raw)
+        except ValueError:
+            pass
+    return raw
+
+def _format_time(value):
+    return value.strftime("%H:%M") if type(value) is time else value
+
+class _IntFromText(int):
+    """An int parsed from text such as "2 years": computes as the number, `raw` keeps the text."""
+
+    def __new__(cls, value, raw):
+        self = super().__new__(cls, value)
+        self.raw = raw
+        return self
+
+class _FloatFromText(float):
+    """A float parsed from text such as "2.5 years": computes as the number, `raw` keeps the text."""
+
+    def __new__(cls, value, raw):
+        self = super().__new__(cls, value)
+        self.raw = raw
+        return self
+
+def _parse_number(raw):
+    """
+    Numbers stay numbers; strings like "2" or "2 years" become 2 (what the UI used to
+    re-parse on every use). The number remembers its text, so the stored form is kept.
+    """
+    if type(raw) is str:
+        try:
+            value = float(raw.split()[0])
+        except (ValueError, IndexError):
+            return raw
+        return _IntFromText(value, raw) if value.is_integer() else _FloatFromText(value, raw)
+    return raw
+
+def _format_number(value):
+    return getattr(value, 'raw', value)
+
+def _intern(raw):
+    """Low-cardinality strings (role, recruiter, ...) share one object across all candidates."""
+    return sys.intern(raw) if type(raw) is str else raw
+
+PARSERS = {
+    'status': _parse_status,
+    'role': _intern,
+    'recruiter': _intern,
+    'email_status': _intern,
+    'years_experience': _parse_number,
+    'date': _parse_date,
+    'aptitudeDate': _parse_date,
+    'aptitudeTime': _parse_time,
+    'round2Date': _parse_date,
+    'round2Time': _parse_time,
+    'offer_sent_date': _parse_date,
+    'offer_signed_date': _parse_date,
+    'joining_date': _parse_date,
+}
+FORMATTERS = {
+    'years_experience': _format_number,
+    'date': _format_date,
+    'aptitudeDate': _format_date,
+    'aptitudeTime': _format_time,
+    'round2Date': _format_date,
+    'round2Time': _format_time,
+    'offer_sent_date': _format_date,
+    'offer_signed_date': _format_date,
+    'joining_date': _format_date,
+}
+
+# Fields every candidate document may carry; anything else goes to `extra`
+FIELDS = (
+    'id', 'name', 'email', 'role', 'status', 'score', 'technical', 'years_experience', 'summary',
+    'access_key', 'date', 'recruiter', 'archived', 'email_status', 'email_error',
+    'aptitude_score', 'aptitude_attempt_id', 'aptitudeDate', 'aptitudeTime',
+    'round2Date', 'round2Time', 'round2Link', 'interview_round', 'rejection_reason',
+    'documents_uploaded', 'documents', 'offer_sent_date', 'offer_signed_date', 'offer_signed_by',
+    'notice_period', 'joining_date', 'training_progress', 'training_attempts', 'training_history',
+    'hr_training_resets', 'training_force_update',
+)
+# One bit per field in Candidate._present (unset slots would need an exception per lookup)
+_BITS = {name: 1 << i for i, name in enumerate(FIELDS)}
+_BIT_ITEMS = tuple(_BITS.items())
+_DECODE = {name: (bit, PARSERS.get(name)) for name, bit in _BITS.items()}
+_get_slot = object.__getattribute__
+_set_slot = object.__setattr__
+
+class Candidate:
+    """
+    A candidate document as loaded from the database, decoded once into slots.
+
+    Attributes are typed: `c.status` is a CandidateStatus, `c.date` / `c.round2Date` are
+    datetime.date, `c.round2Time` a datetime.time and `c.years_experience` a number (absent
+    fields read as None). Item access (`c['date']`, `c.get(...)`, `dict(c)`) keeps the stored
+    JSON form, so code written against plain dicts works unchanged. Fields outside FIELDS
+    are kept in a side dict.
+
+    Also remembers the stored `version` and which fields were set since (`dirty`), so a
+    save from a stale copy can be merged instead of overwriting other sessions' changes.
+    """
+    __slots__ = FIELDS + ('version', '_present', '_extra', '_dirty')
+
+    def __init__(self, data=(), version=None):
+        _set_slot(self, 'version', version)
+        _set_slot(self, '_dirty', None)
+        self._load(data if type(data) is dict else dict(data))
+
+    def _load(self, data):
+        present, extra = 0, None
+        for key, value in data.items():
+            field = _DECODE.get(key)
+            if field is None:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+                continue
+            bit, parse = field
+            _set_slot(self, key, value if parse is None else parse(value))
+            present |= bit
+        _set_slot(self, '_present', present)
+        _set_slot(self, '_extra', extra)
+
+    @property
+    def dirty(self):
+        """Top-level fields set or deleted since the candidate was loaded or saved."""
+        return self._dirty if self._dirty is not None else set()
+
+    def _set_field(self, key, value):
+        dirty = self._dirty
+        if dirty is None:
+            dirty = set()
+            _set_slot(self, '_dirty', dirty)
+        dirty.add(key)
+        bit = _BITS.get(key)
+        if bit is None:
+            if self._extra is None:
+                _set_slot(self, '_extra', {})
+            self._extra[key] = value
+            return
+        parse = PARSERS.get(key)
+        _set_slot(self, key, value if parse is None else parse(value))
+        _set_slot(self, '_present', self._present | bit)
+
+    def __getattr__(self, name):
+        # Only reached when a slot is unset
+        if name in _BITS:
+            return None
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in _BITS:
+            self._set_field(name, value)
+        else:
+            _set_slot(self, name, value)
+
+    # --- Mapping interface (stored form) ---
+    def __getitem__(self, key):
+        bit = _BITS.get(key)
+        if bit is None:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+        if not self._present & bit:
+            raise KeyError(key)
+        fmt = FORMATTERS.get(key)
+        value = _get_slot(self, key)
+        return value if fmt is None else fmt(value)
+
+    def get(self, key, default=None):
+        bit = _BITS.get(key)
+        if bit is None:
+            return default if self._extra is None else self._extra.get(key, default)
+        if not self._present & bit:
+            return default
+        fmt = FORMATTERS.get(key)
+        value = _get_slot(self, key)
+        return value if fmt is None else fmt(value)
+
+    def __contains__(self, key):
+        bit = _BITS.get(key)
+        if bit is None:
+            return self._extra is not None and key in self._extra
+        return bool(self._present & bit)
+
+    def __setitem__(self, key, value):
+        self._set_field(key, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._set_field(key, None)
+        bit = _BITS.get(key)
+        if bit is None:
+            del self._extra[key]
+        else:
+            object.__delattr__(self, key)
+            _set_slot(self, '_present', self._present & ~bit)
+
+    def __iter__(self):
+        present = self._present
+        for key, bit in _BIT_ITEMS:
+            if present & bit:
+                yield key
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self):
+        return bin(self._present).count("1") + len(self._extra or ())
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[k] for k in self]
+
+    def items(self):
+        return list(self.to_dict().items())
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self._set_field(key, value)
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self):
+        return self.to_dict()
+
+    def __eq__(self, other):
+        if isinstance(other, (Candidate, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def to_dict(self):
+        """The stored JSON document."""
+        doc, present = {}, self._present
+        for key, bit in _BIT_ITEMS:
+            if present & bit:
+                fmt = FORMATTERS.get(key)
+                value = _get_slot(self, key)
+                doc[key] = value if fmt is None else fmt(value)
+        if self._extra:
+            doc.update(self._extra)
+        return doc
+
+    def reset(self, data, version):
+        """Replace the contents with what was just stored (nothing dirty)."""
+        if data is not self:
+            for key in list(self):
+                if key in _BITS:
+                    object.__delattr__(self, key)
+            self._load(data if type(data) is dict else dict(data))
+        _set_slot(self, 'version', version)
+        _set_slot(self, '_dirty', None)
+
+    def __reduce__(self):
+        # Rebuild through __init__ (pickle/deepcopy, e.g. Streamlit session state), then restore `dirty`
+        return (self.__class__, (self.to_dict(), self.version), self._dirty)
+
+    def __setstate__(self, dirty):
+        _set_slot(self, '_dirty', set(dirty) if dirty else None)
+
+    def __repr__(self):
+        return f"Candidate({self.to_dict()!r}, version={self.version})"
+
+# dict-like for isinstance checks (pandas, json helpers); the methods above are its own
+MutableMapping.register(Candidate)
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Widgets counted per rerun (patched on st.* and DeltaGenerator while profiling is on)
+WIDGET_FUNCTIONS = [
+    "button", "download_button", "link_button", "form_submit_button", "checkbox", "radio",
+    "selectbox", "multiselect", "text_input", "text_area", "number_input", "date_input",
+    "time_input", "file_uploader",
+]
+
+# Streamlit runs each session's script in its own thread
+_local = threading.local()
+_widgets_patched = False
+_patch_lock = threading.Lock()
+
+class RerunProfile:
+    """Everything measured during one Streamlit script run."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.total_seconds = 0.0
+        self.view = None
+        self.phases = {}          # phase name -> seconds
+        self.db_calls = {}        # database function -> [count, seconds]
+        self.bytes_deserialized = 0
+        self.json_seconds = 0.0
+        self.widgets = 0
+
+    def as_dict(self):
+        return {
+            "started_at": self.started_at,
+            "view": self.view,
+            "total_seconds": round(self.total_seconds, 6),
+            "phases": {k: round(v, 6) for k, v in self.phases.items()},
+            "db_calls": {k: {"count": c, "seconds": round(s, 6)} for k, (c, s) in self.db_calls.items()},
+            "db_call_count": sum(c for c, _ in self.db_calls.values()),
+            "bytes_deserialized": self.bytes_deserialized,
+            "json_seconds": round(self.json_seconds, 6),
+            "widgets": self.widgets,
+        }
+
+def is_enabled(allow_query=False):
+    """
+    On when HIREAI_PROFILE=1, or when the page URL carries ?profile=1 and the
+    caller allows it (an admin session): anonymous visitors cannot turn it on.
+    """
+    if os.environ.get("HIREAI_PROFILE") == "1":
+        return True
+    if not allow_query:
+        return False
+    try:
+        import streamlit as st
+        return st.query_params.get("profile") == "1"
+    except Exception:
+        return False
+
+def current():
+    return getattr(_local, "profile", None)
+
+def start_rerun(allow_query=False):
+    """
+    Call at the top of every script run. Returns a RerunProfile when profiling is on, else None.
+    `allow_query` lets ?profile=1 turn it on (pass True for admin sessions only).
+    """
+    _local.profile = None
+    return begin() if is_enabled(allow_query) else None
+
+def begin():
+    """Start profiling this script run."""
+    _patch_widgets()
+    profile = RerunProfile()
+    _local.profile = profile
+    return profile
+
+def end(profile):
+    """Finish the run and append it to the persisted trace log."""
+    profile.total_seconds = time.perf_counter() - profile._t0
+    _local.profile = None
+    try:
+        import database
+        database.save_profile_trace(profile.view, profile.total_seconds, json.dumps(profile.as_dict()))
+    except Exception as e:
+        print(f"[Profiling] Could not persist trace: {e}")
+
+@contextmanager
+def phase(name):
+    """Adds the wall time of the enclosed block to phase `name` (no-op when not profiling)."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.phases[name] = profile.phases.get(name, 0.0) + (time.perf_counter() - start)
+
+def profiled(fn):
+    """Decorator: records the function's wall time as a phase named after it."""
+    def wrapper(*args, **kwargs):
+        if current() is None:
+            return fn(*args, **kwargs)
+        with phase(fn.__name__):
+            return fn(*args, **kwargs)
+    wrapper.__name__ = fn.__name__
+    wrapper.__doc__ = fn.__doc__
+    wrapper.__wrapped__ = fn
+    return wrapper
+
+# --- Hooks called from database.py ---
+def record_db_call(name, seconds):
+    profile = current()
+    if profile is not None:
+        entry = profile.db_calls.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+def record_deserialized(nbytes, seconds):
+    profile = current()
+    if profile is not None:
+        profile.bytes_deserialized += nbytes
+        profile.json_seconds += seconds
+
+def _patch_widgets():
+    global _widgets_patched
+    with _patch_lock:
+        if _widgets_patched:
+            return
+        import streamlit as st
+        from streamlit.delta_generator import DeltaGenerator
+
+        def counting(original):
+            def wrapper(*args, **kwargs):
+                profile = current()
+                if profile is not None:
+                    profile.widgets += 1
+                return original(*args, **kwargs)
+            wrapper.__name__ = getattr(original, "__name__", "widget")
+            wrapper.__wrapped__ = original
+            return wrapper
+
+        for name in WIDGET_FUNCTIONS:
+            # st.button is bound to the main DeltaGenerator at import time, so patch both
+            for owner in (st, DeltaGenerator):
+                original = getattr(owner, name, None)
+                if original is not None:
+                    setattr(owner, name, counting(original))
+        _widgets_patched = True
+
+def render_panel(profile, is_admin=False):
+    """Collapsible timing panel for the current run (shows numbers up to this point)."""
+    import streamlit as st
+    import pandas as pd
+
+    data = profile.as_dict()
+    elapsed = time.perf_counter() - profile._t0
+    with st.expander(f"⏱️ Profiling: {elapsed * 1000:.0f} ms so far", expanded=False):
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("DB Calls", data["db_call_count"])
+        c2.metric("DB Time", f"{sum(s for _, s in profile.db_calls.values()) * 1000:.1f} ms")
+        c3.metric("Deserialized", f"{data['bytes_deserialized'] / 1024:.1f} KB")
+        c4.metric("Widgets", data["widgets"])
+
+        st.markdown("**Wall time by phase**")
+        phases = [{"Phase": k, "ms": round(v * 1000, 2)} for k, v in profile.phases.items()]
+        phases.append({"Phase": "json decode", "ms": round(profile.json_seconds * 1000, 2)})
+        st.dataframe(pd.DataFrame(phases), use_container_width=True, hide_index=True)
+
+        if profile.db_calls:
+            st.markdown("**Database calls**")
+            st.dataframe(pd.DataFrame([
+                {"Function": k, "Calls": c, "ms": round(s * 1000, 2)} for k, (c, s) in profile.db_calls.items()
+            ]), use_container_width=True, hide_index=True)
+
+        if is_admin:
+            import database
+            traces = database.get_profile_traces()
+            st.download_button(
+                "📥 Download Trace Log (JSONL)",
+                data="\n".join(t['data'] for t in traces).encode('utf-8'),
+                file_name="hireai_profile_traces.jsonl",
+                mime="application/x-ndjson",
+                key="dl_profile_traces",
+            )
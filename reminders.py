@@ -0,0 +1,78 @@
+import time
+import threading
+from datetime import datetime
+import database
+import email_outbox
+import email_templates
+import metrics
+
+# Upper bound on how long the scheduler sleeps (picks up events booked by other processes)
+POLL_INTERVAL = 30
+
+WHEN = {24 * 60 * 60: "in 24 hours", 60 * 60: "in 1 hour", 5 * 60: "in 5 minutes"}
+
+TEMPLATES = {'interview': "interview_reminder", 'aptitude': "aptitude_reminder"}
+EVENT_NAMES = {'interview': "Interview", 'aptitude': "Aptitude exam"}
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_wake = threading.Event()
+
+def fire_due(now=None):
+    """Send every reminder that is due: an email to the candidate and a notification for HR."""
+    now = now or time.time()
+    due = database.claim_due_reminders(now)
+    if not due:
+        return 0
+
+    notifications = []
+    for r in due:
+        c = r['candidate']
+        when = WHEN.get(r['offset'], "soon")
+        if c.get('email'):
+            context = dict(email_templates.candidate_context(c), when=when)
+            database.enqueue_email(
+                c['email'], candidate_id=r['candidate_id'], template=TEMPLATES[r['kind']], context=context,
+                idempotency_key=f"reminder:{r['candidate_id']}:{r['kind']}:{r['event_at']:.0f}:{r['offset']}",
+                dedupe_window=r['offset'],
+            )
+        starts = datetime.fromtimestamp(r['event_at']).strftime("%Y-%m-%d %H:%M")
+        notifications.append((r['recruiter'] or '*', f"{EVENT_NAMES[r['kind']]} with {c.get('name', 'a candidate')} starts {when} ({starts})"))
+        metrics.inc("reminders_sent_total", help="Interview/exam reminders fired, by kind and offset", kind=r['kind'], offset=when)
+
+    database.add_notifications(notifications)
+    email_outbox.wake()
+    return len(due)
+
+def run_forever():
+    """Sleep until the next reminder is due (or POLL_INTERVAL), fire, repeat."""
+    while True:
+        try:
+            fire_due()
+            next_at = database.get_next_reminder_at()
+        except Exception as e:
+            print(f"[Reminders] Scheduler failed: {e}")
+            next_at = None
+
+        delay = POLL_INTERVAL if next_at is None else min(max(next_at - time.time(), 0.5), POLL_INTERVAL)
+        _wake.wait(delay)
+        _wake.clear()
+
+def wake():
+    """Re-check the next due time now (call after booking an event in this process)."""
+    _wake.set()
+
+def start_scheduler():
+    """Start the background reminder thread once per process (safe to call on every rerun)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler and _scheduler.is_alive():
+            return
+        _scheduler = threading.Thread(target=run_forever, name="reminders", daemon=True)
+        _scheduler.start()
+
+if __name__ == "__main__":
+    # Standalone scheduler process: python reminders.py
+    database.init_db()
+    print("HireAI reminder scheduler running...")
+    run_forever()
@@ -0,0 +1,229 @@
+import os
+import gzip
+import glob
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+import database
+
+APTITUDE_PASS_SCORE = 50
+TRAINING_PASS_AVERAGE = 80
+OFFER_SENT_STATUSES = ['Offer Sent', 'Offer Signed', 'Offer Accepted', 'Joining Scheduled', 'Employee Confirmed']
+
+# Pipeline order for the funnel (statuses outside it, e.g. Rejected, are shown as outcomes)
+FUNNEL_STAGES = [
+    'Screening', 'Aptitude Scheduled', 'Aptitude Completed', 'Interview Scheduled', 'VP Approval',
+    'Offer Signed', 'Offer Sent', 'Offer Accepted', 'Joining Scheduled', 'Training', 'Employee Confirmed',
+]
+
+# Exports are written here and reused until the candidate data changes
+EXPORT_DIR = os.environ.get("HIREAI_EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "hireai-exports")
+EXPORT_MAX_AGE_SECONDS = 60 * 60
+EXPORT_CHUNK_ROWS = 10000
+
+# Format key (also the file extension) -> (label, MIME type)
+EXPORT_FORMATS = {
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+    "csv.gz": ("CSV (gzip)", "application/gzip"),
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def candidate_report(start_date, end_date, training_module_count):
+    """
+    Candidate report for applications dated start_date..end_date (inclusive).
+    Rows come from one indexed range query; every derived column is computed
+    column-wise, never per row in Python. Returns an empty DataFrame if nothing matches.
+    """
+    columns, rows = database.get_report_rows(start_date, end_date)
+    return _build_report(pd.DataFrame.from_records(rows, columns=columns), training_module_count)
+
+def _build_report(raw, training_module_count):
+    """Report rows for the raw report columns (no rows in, the report's columns with no rows out)."""
+    # Same rule as before: rows whose date does not parse are left out
+    raw = raw[pd.to_datetime(raw['date'], format="%Y-%m-%d", errors="coerce").notna()].reset_index(drop=True)
+
+    apt_score = pd.to_numeric(raw['aptitude_score'], errors="coerce")  # 'N/A' -> NaN
+    has_apt = apt_score.notna()
+    interview_round = raw['interview_round']
+    trained = raw['training_modules'] > 0
+    train_avg = (raw['training_total'] / training_module_count).where(trained, 0.0) if training_module_count else pd.Series(0.0, index=raw.index)
+    joined = raw['status'] == 'Employee Confirmed'
+
+    return pd.DataFrame({
+        "Candidate ID": raw['id'],
+        "Name": raw['name'],
+        "Email": raw['email'],
+        "Role": raw['role'],
+        "Current Status": raw['status'],
+        "Application Date": raw['date'],
+        "AI Screening Score": raw['score'],
+        "Experience (Years)": raw['years_experience'],
+        "Recruiter": raw['recruiter'],
+
+        # Aptitude
+        "Aptitude Score": raw['aptitude_score'],
+        "Aptitude Status": np.select([~has_apt, apt_score >= APTITUDE_PASS_SCORE], ["Pending", "Passed"], "Failed"),
+        "Aptitude Date": raw['aptitude_date'],
+
+        # Interview (round 1's date is overwritten once round 2 is booked)
+        "Round 1 Date": np.select([interview_round == 1, interview_round >= 2], [raw['round2_date'], "Completed"], "N/A"),
+        "Round 2 Date": raw['round2_date'].where(interview_round >= 2, 'N/A'),
+
+        # Offer
+        "Offer Sent": np.where(raw['status'].isin(OFFER_SENT_STATUSES), "Yes", "No"),
+        "Offer Signed Date": raw['offer_signed_date'],
+
+        # Training
+        "Training Status": np.select([train_avg >= TRAINING_PASS_AVERAGE, trained], ["Completed", "In Progress"], "Not Started"),
+        "Training Avg Score": train_avg.map("{:.1f}%".format),
+        "Training Attempts": raw['training_attempts'],
+
+        # Joining
+        "Joined Company": np.where(joined, "Yes", "No"),
+        "Employee ID": raw['access_key'].where(joined, 'N/A'),
+    })
+
+# --- ANALYTICS ---
+def hiring_analytics(start_date, end_date, role=None, recruiter=None):
+    """
+    Funnel, conversion, throughput, time-in-stage and score frames for the date range,
+    built from status_rollups only. Returns None if nothing happened in the range.
+    """
+    rollups = pd.DataFrame(database.get_status_rollups(start_date, end_date, role, recruiter))
+    if rollups.empty:
+        return None
+
+    # 1. Funnel: candidates entering each stage during the range
+    entered = rollups.groupby('to_status')['transitions'].sum()
+    funnel = pd.DataFrame({"Stage": FUNNEL_STAGES, "Candidates": entered.reindex(FUNNEL_STAGES, fill_value=0).values})
+
+    # 2. Conversion between consecutive stages (flow-based: stages can be skipped, so >100% is possible)
+    counts = funnel["Candidates"].to_numpy()
+    conversion = pd.DataFrame({
+        "Step": [f"{a} → {b}" for a, b in zip(FUNNEL_STAGES, FUNNEL_STAGES[1:])],
+        "Conversion (%)": np.round(np.divide(counts[1:] * 100.0, counts[:-1], out=np.zeros(len(counts) - 1), where=counts[:-1] > 0), 1),
+    })
+
+    # 3. Throughput: status changes per day and target status
+    throughput = rollups.groupby(['day', 'to_status'], as_index=False)['transitions'].sum()
+    throughput.columns = ["Day", "Status", "Transitions"]
+
+    # 4. Average days spent in a stage before leaving it
+    timed = rollups[rollups['from_status'] != ''].groupby('from_status')[['stage_seconds_sum', 'stage_count']].sum()
+    timed = timed[timed['stage_count'] > 0]
+    time_in_stage = pd.DataFrame({
+        "Stage": timed.index,
+        "Avg Days": (timed['stage_seconds_sum'] / timed['stage_count'] / 86400).round(2).values,
+    })
+
+    # 5. Average scores of candidates entering each stage
+    sums = rollups.groupby('to_status')[['score_sum', 'score_count', 'aptitude_sum', 'aptitude_count']].sum()
+    scores = pd.DataFrame({
+        "Stage": sums.index,
+        "Avg AI Score": (sums['score_sum'] / sums['score_count'].where(sums['score_count'] > 0)).round(1).values,
+        "Avg Aptitude Score": (sums['aptitude_sum'] / sums['aptitude_count'].where(sums['aptitude_count'] > 0)).round(1).values,
+    })
+
+    return {
+        "funnel": funnel, "conversion": conversion, "throughput": throughput,
+        "time_in_stage": time_in_stage, "scores": scores, "rejected": int(entered.get('Rejected', 0)),
+    }
+
+# --- EXPORTS ---
+def iter_report_chunks(start_date, end_date, training_module_count, chunk_rows=EXPORT_CHUNK_ROWS):
+    """candidate_report in DataFrames of at most `chunk_rows` rows, read from one cursor."""
+    columns = list(database.REPORT_COLUMNS)
+    empty = True
+    for rows in database.iter_report_rows(start_date, end_date, chunk_rows):
+        chunk = _build_report(pd.DataFrame.from_records(rows, columns=columns), training_module_count)
+        if not chunk.empty:
+            empty = False
+            yield chunk
+    if empty:
+        # Nothing matched: one empty chunk so every format still gets its header / schema
+        yield _build_report(pd.DataFrame(columns=columns), training_module_count)
+
+def export_report(start_date, end_date, training_module_count, fmt):
+    """
+    Write the report for the date range to a file in EXPORT_DIR and return its path.
+    The file name carries the data version (latest change feed rev), so an identical
+    export is served from disk until a candidate is saved or deleted.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    version = database.get_latest_change_rev()
+    path = os.path.join(EXPORT_DIR, f"candidate_report_{start_date}_{end_date}_m{training_module_count}_v{version}.{fmt}")
+    if os.path.exists(path):
+        return path
+
+    _prune_exports()
+    # 1. Write chunk by chunk to a private temp file...
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        WRITERS[fmt](tmp, iter_report_chunks(start_date, end_date, training_module_count))
+        # 2. ...then publish it atomically, so readers never see a half-written export
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+def _prune_exports():
+    """Drop exports older than EXPORT_MAX_AGE_SECONDS (stale versions are never requested again)."""
+    cutoff = time.time() - EXPORT_MAX_AGE_SECONDS
+    for old in glob.glob(os.path.join(EXPORT_DIR, "candidate_report_*")):
+        try:
+            if os.path.getmtime(old) < cutoff:
+                os.remove(old)
+        except OSError:
+            pass  # another process got there first
+
+def _write_csv_gz(path, chunks):
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=header)
+            header = False
+
+# Parquet needs one schema for every row group: these are numeric, everything else is text
+PARQUET_NUMERIC_COLUMNS = {"AI Screening Score": "float64", "Experience (Years)": "float64", "Training Attempts": "int64"}
+
+def _write_parquet(path, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = pa.schema([(c, pa.type_for_alias(PARQUET_NUMERIC_COLUMNS.get(c, "string"))) for c in chunk.columns])
+                writer = pq.ParquetWriter(path, schema, compression="zstd")
+            arrays = []
+            for field in writer.schema:
+                col = chunk[field.name]
+                if field.name not in PARQUET_NUMERIC_COLUMNS:
+                    col = col.where(col.isna(), col.astype(str))  # e.g. Aptitude Score: 72 / 'N/A'
+                arrays.append(pa.array(col, type=field.type, from_pandas=True))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _write_xlsx(path, chunks):
+    from openpyxl import Workbook
+
+    # write_only streams rows to disk instead of holding every cell object in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Candidates")
+    header = True
+    for chunk in chunks:
+        if header:
+            ws.append(list(chunk.columns))
+            header = False
+        for row in chunk.itertuples(index=False):
+            ws.append(list(row))
+    wb.save(path)
+
+WRITERS = {"parquet": _write_parquet, "csv.gz": _write_csv_gz, "xlsx": _write_xlsx}
@@ -1,5 +1,13 @@
 #!/bin/bash
 echo "Installing dependencies..."
 pip install -r requirements.txt
+
+# Optional: start the FastAPI backend alongside Streamlit (RUN_API=1).
+# API_WORKERS controls the number of worker processes (default: CPU count).
+if [ "$RUN_API" = "1" ]; then
+    echo "Starting HireAI API (workers: ${API_WORKERS:-auto})..."
+    gunicorn main:app -c gunicorn.conf.py &
+fi
+
 echo "Starting HireAI..."
 streamlit run app.py --server.port=8501 --server.address=0.0.0.0
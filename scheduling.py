@@ -0,0 +1,187 @@
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+import database
+
+# Interview length and exam-room capacity (exam length comes from APTITUDE_TEST_DURATION_MINUTES)
+INTERVIEW_MINUTES = int(os.environ.get("INTERVIEW_DURATION_MINUTES", 60))
+EXAM_SLOT_CAPACITY = int(os.environ.get("EXAM_SLOT_CAPACITY", 25))
+
+# Suggestions and bulk assignment use this grid inside working hours (Monday to Friday)
+SLOT_MINUTES = 30
+WORKDAY_START_HOUR = 9
+WORKDAY_END_HOUR = 18
+WORKDAYS = range(0, 5)  # datetime.weekday(): Monday = 0
+SEARCH_DAYS = 60
+
+class IntervalIndex:
+    """
+    Half-open intervals [start, end) kept sorted by start, one per owner.
+    No interval is longer than `max_length`, so everything overlapping [s, e)
+    starts in (s - max_length, e): two bisects plus the matches, O(log n + k).
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.items = []  # (start, end, owner), same order as starts
+        self.owner_start = {}
+        self.max_length = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, start, end, owner):
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.items.insert(i, (start, end, owner))
+        self.owner_start[owner] = start
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, owner):
+        start = self.owner_start.pop(owner, None)
+        if start is None:
+            return False
+        i = bisect_left(self.starts, start)
+        while self.items[i][2] != owner:
+            i += 1
+        del self.starts[i]
+        del self.items[i]
+        return True
+
+    def overlapping(self, start, end, exclude=None):
+        """Owners of intervals overlapping [start, end)."""
+        lo = bisect_left(self.starts, start - self.max_length)
+        hi = bisect_left(self.starts, end)
+        return [o for s, e, o in self.items[lo:hi] if e > start and s < end and o != exclude]
+
+class Scheduler:
+    """
+    Interval indexes over every booked interview (one per recruiter) and
+    aptitude exam (one shared index, EXAM_SLOT_CAPACITY seats per slot),
+    built from scheduled_events. Times are epoch seconds.
+    """
+
+    def __init__(self, events, exam_minutes, interview_minutes=INTERVIEW_MINUTES, exam_capacity=EXAM_SLOT_CAPACITY):
+        self.interview_seconds = interview_minutes * 60
+        self.exam_seconds = exam_minutes * 60
+        self.exam_capacity = exam_capacity
+        self.recruiters = defaultdict(IntervalIndex)
+        self.exams = IntervalIndex()
+        for e in events:
+            if e['kind'] == 'interview' and e.get('recruiter'):
+                self.recruiters[e['recruiter']].add(e['event_at'], e['event_at'] + self.interview_seconds, e['candidate_id'])
+            elif e['kind'] == 'aptitude':
+                self.exams.add(e['event_at'], e['event_at'] + self.exam_seconds, e['candidate_id'])
+
+    @classmethod
+    def from_database(cls, exam_minutes, now=None):
+        """Index every event from a day ago onwards (older ones cannot conflict with new bookings)."""
+        now = now or time.time()
+        return cls(database.get_upcoming_events(now - 24 * 60 * 60, float("inf")), exam_minutes)
+
+    # --- Conflict checks ---
+    def interview_conflicts(self, recruiter, start, candidate_id=None):
+        """Candidate ids whose interview with `recruiter` overlaps one starting at `start`."""
+        if recruiter not in self.recruiters:
+            return []
+        return self.recruiters[recruiter].overlapping(start, start + self.interview_seconds, exclude=candidate_id)
+
+    def exam_seats_taken(self, start, candidate_id=None):
+        return len(self.exams.overlapping(start, start + self.exam_seconds, exclude=candidate_id))
+
+    def exam_is_full(self, start, candidate_id=None):
+        return self.exam_seats_taken(start, candidate_id) >= self.exam_capacity
+
+    # --- Suggestions ---
+    def _slots(self, not_before, length):
+        """
+        Slot starts on the SLOT_MINUTES grid from `not_before` on, for bookings of
+        `length` seconds that start and end inside working hours on a workday.
+        """
+        dt = datetime.fromtimestamp(not_before).replace(second=0, microsecond=0)
+        extra = -dt.minute % SLOT_MINUTES
+        dt += timedelta(minutes=extra)
+        end = dt + timedelta(days=SEARCH_DAYS)
+        while dt < end:
+            if dt.hour < WORKDAY_START_HOUR:
+                dt = dt.replace(hour=WORKDAY_START_HOUR, minute=0)
+            if dt.weekday() not in WORKDAYS or dt + timedelta(seconds=length) > dt.replace(hour=WORKDAY_END_HOUR, minute=0):
+                dt = (dt + timedelta(days=1)).replace(hour=WORKDAY_START_HOUR, minute=0)
+                continue
+            yield dt.timestamp()
+            dt += timedelta(minutes=SLOT_MINUTES)
+
+    def suggest_interview(self, recruiter, not_before, count=3, candidate_id=None):
+        """Earliest `count` free interview starts for `recruiter`."""
+        free = []
+        for slot in self._slots(not_before, self.interview_seconds):
+            if not self.interview_conflicts(recruiter, slot, candidate_id):
+                free.append(slot)
+                if len(free) == count:
+                    break
+        return free
+
+    def suggest_exam(self, not_before, count=3, candidate_id=None):
+        """Earliest `count` exam slots with a free seat."""
+        free = []
+        for slot in self._slots(not_before, self.exam_seconds):
+            if not self.exam_is_full(slot, candidate_id):
+                free.append(slot)
+                if len(free) == count:
+                    break
+        return free
+
+    # --- Booking ---
+    def book_interview(self, recruiter, start, candidate_id):
+        index = self.recruiters[recruiter]
+        index.remove(candidate_id)
+        index.add(start, start + self.interview_seconds, candidate_id)
+
+    def book_exam(self, start, candidate_id):
+        self.exams.remove(candidate_id)
+        self.exams.add(start, start + self.exam_seconds, candidate_id)
+
+    def bulk_assign_exams(self, candidate_ids, not_before):
+        """
+        Seat every candidate in the earliest exam slots with room, filling each
+        slot to capacity before moving on. Returns {candidate_id: start}.
+        """
+        assigned = {}
+        pending = list(candidate_ids)
+        for slot in self._slots(not_before, self.exam_seconds):
+            if not pending:
+                break
+            room = self.exam_capacity - self.exam_seats_taken(slot)
+            for cid in pending[:max(room, 0)]:
+                self.book_exam(slot, cid)
+                assigned[cid] = slot
+            pending = pending[max(room, 0):]
+        return assigned
+
+    def bulk_assign_interviews(self, recruiter, candidate_ids, not_before):
+        """Give each candidate the recruiter's next free interview slot. Returns {candidate_id: start}."""
+        assigned = {}
+        pending = iter(candidate_ids)
+        cid = next(pending, None)
+        for slot in self._slots(not_before, self.interview_seconds):
+            if cid is None:
+                break
+            if not self.interview_conflicts(recruiter, slot):
+                self.book_interview(recruiter, slot, cid)
+                assigned[cid] = slot
+                cid = next(pending, None)
+        return assigned
+
+def as_date_time(ts):
+    """Epoch seconds -> ('YYYY-MM-DD', 'HH:MM') as stored on candidates."""
+    dt = datetime.fromtimestamp(ts)
+    return dt.strftime("%Y-%m-%d"), dt.strftime("%H:%M")
+
+def to_timestamp(date_value, time_value):
+    """st.date_input / st.time_input values -> epoch seconds."""
+    return datetime.combine(date_value, time_value).timestamp()
+
+def describe(ts):
+    return datetime.fromtimestamp(ts).strftime("%a %d %b, %H:%M")
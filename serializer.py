@@ -0,0 +1,61 @@
+import os
+import json
+
+# JSON encode/decode for candidate storage and API responses.
+# Uses the fastest installed backend: msgspec, then orjson, then the stdlib json module
+# (benchmarks/bench_serializer.py). HIREAI_JSON_BACKEND=msgspec|orjson|json picks one explicitly.
+BACKENDS = ("msgspec", "orjson", "json")
+
+def _default(obj):
+    """Encode objects that know their JSON form (models.Candidate)."""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+def _load_backend(name):
+    """(dumps_bytes, loads, encode errors, decode errors) for `name`; ImportError if not installed."""
+    if name == "orjson":
+        import orjson
+        # Non-string keys (e.g. exam answers keyed by question index) become strings, like the stdlib
+        return (lambda obj: orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)), orjson.loads, (TypeError,), (ValueError,)
+    if name == "msgspec":
+        import msgspec
+        encoder, decoder = msgspec.json.Encoder(enc_hook=_default), msgspec.json.Decoder()
+        return encoder.encode, decoder.decode, (TypeError, OverflowError, msgspec.EncodeError), (ValueError, msgspec.DecodeError)
+    if name == "json":
+        return (lambda obj: json.dumps(obj, default=_default).encode()), json.loads, (), ()
+    raise ValueError(f"Unknown JSON backend: {name}")
+
+def _select_backend():
+    """First installed backend; serializer.BACKEND tells which one was picked."""
+    wanted = os.environ.get("HIREAI_JSON_BACKEND", "").strip().lower()
+    for name in ([wanted] if wanted else BACKENDS):
+        try:
+            return (name,) + _load_backend(name)
+        except ImportError:
+            if wanted:
+                print(f"HIREAI_JSON_BACKEND '{wanted}' is not installed, using the stdlib json module")
+    return ("json",) + _load_backend("json")
+
+BACKEND, _dumps_bytes, _loads, _ENCODE_ERRORS, _DECODE_ERRORS = _select_backend()
+
+def dumps_bytes(obj):
+    """Compact UTF-8 JSON as bytes (HTTP bodies)."""
+    try:
+        return _dumps_bytes(obj)
+    except _ENCODE_ERRORS:
+        # e.g. ints beyond 64 bits: the stdlib handles them, or raises the usual TypeError
+        return json.dumps(obj, default=_default).encode()
+
+def dumps(obj):
+    """JSON as str (SQLite TEXT columns, so json_extract/json_set keep working)."""
+    return dumps_bytes(obj).decode()
+
+def loads(data):
+    """Parse JSON from str or bytes."""
+    try:
+        return _loads(data)
+    except _DECODE_ERRORS:
+        # Rows written by older versions may hold NaN/Infinity, which only the stdlib accepts
+        return json.loads(data)
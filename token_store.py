@@ -0,0 +1,129 @@
+import os
+import time
+import uuid
+import heapq
+import threading
+from collections import OrderedDict
+import database
+import metrics
+
+DEFAULT_TTL_SECONDS = 8 * 60 * 60
+DEFAULT_MAX_SIZE = 10000
+
+class TokenStore:
+    """
+    Bounded, expiring store for API session tokens.
+
+    Tokens live in an ordered dict (token -> (username, expires_at)) kept in
+    least-recently-used order, so validation is a single O(1) lookup and the
+    entry to evict is at the front. A heap of (expires_at, token) finds expired
+    entries wherever they sit in that order. With backend="sqlite" every token
+    is also written to the shared `api_tokens` table, letting any worker
+    process validate it.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_size=DEFAULT_MAX_SIZE, backend="memory"):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.backend = backend
+        self._tokens = OrderedDict()
+        self._expiries = []  # heap of (expires_at, token); entries of removed tokens are skipped
+        self._lock = threading.Lock()
+
+    def issue(self, username):
+        """Create a new token for `username` and return it."""
+        token = str(uuid.uuid4())
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+
+        with self._lock:
+            self._remember(token, username, expires_at, now)
+
+        if self.backend == "sqlite":
+            database.save_token(token, username, expires_at)
+            # Logins are rare, so this is a cheap place to keep the table small
+            database.purge_expired_tokens(now)
+        return token
+
+    def validate(self, token):
+        """Returns the username for a live token, or None if unknown/expired."""
+        if not token:
+            return None
+        now = time.time()
+
+        # 1. Local cache (O(1))
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is not None:
+                if entry[1] > now:
+                    self._tokens.move_to_end(token)
+                    metrics.inc("token_cache_total", help="API token lookups served from the local cache", result="hit")
+                    return entry[0]
+                del self._tokens[token]
+        metrics.inc("token_cache_total", help="API token lookups served from the local cache", result="miss")
+
+        if self.backend != "sqlite":
+            return None
+
+        # 2. Shared table (token issued by another worker, or evicted locally)
+        row = database.get_token(token)
+        if not row or row['expires_at'] <= now:
+            return None
+
+        with self._lock:
+            self._remember(token, row['username'], row['expires_at'], now)
+        return row['username']
+
+    def revoke(self, token):
+        """Invalidate a token in this process and in the shared table."""
+        with self._lock:
+            self._tokens.pop(token, None)
+        if self.backend == "sqlite":
+            database.delete_token(token)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _remember(self, token, username, expires_at, now):
+        # Caller must hold self._lock
+        self._tokens[token] = (username, expires_at)
+        self._tokens.move_to_end(token)
+        heapq.heappush(self._expiries, (expires_at, token))
+
+        # Drop expired entries first, then evict the least recently used live ones
+        while self._expiries and self._expiries[0][0] <= now:
+            expiry, expired = heapq.heappop(self._expiries)
+            entry = self._tokens.get(expired)
+            if entry is not None and entry[1] == expiry:
+                del self._tokens[expired]
+        while len(self._tokens) > self.max_size:
+            self._tokens.popitem(last=False)
+
+        # Evicted and revoked tokens leave stale heap entries: rebuild once they dominate
+        if len(self._expiries) > 2 * max(len(self._tokens), self.max_size):
+            self._expiries = [(entry[1], t) for t, entry in self._tokens.items()]
+            heapq.heapify(self._expiries)
+
+def env_int(name, default):
+    """Integer environment setting; `default` when unset or not a number."""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        print(f"[Config] {name}={os.environ.get(name)!r} is not a number, using {default}")
+        return default
+
+def api_workers():
+    """API worker processes (API_WORKERS, default 1)."""
+    return env_int("API_WORKERS", 1)
+
+def create_token_store():
+    """Builds a TokenStore from environment configuration."""
+    ttl = env_int("TOKEN_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+    max_size = env_int("TOKEN_STORE_MAX_SIZE", DEFAULT_MAX_SIZE)
+    # Several API workers can only agree on tokens through the shared table
+    default_backend = "sqlite" if api_workers() > 1 else "memory"
+    backend = os.environ.get("TOKEN_STORE_BACKEND", default_backend).lower()
+    if backend not in ("memory", "sqlite"):
+        print(f"[Token Store] Unknown backend '{backend}', falling back to memory.")
+        backend = "memory"
+    return TokenStore(ttl_seconds=ttl, max_size=max_size, backend=backend)